@@ -0,0 +1,68 @@
+"""Benchmark the wall time of a rolling origin backtest with an increasing number of worker processes.
+
+A synthetic dataset of calendar features and a seasonal target is written to a temporary datalake and a random forest
+is backtested on `--folds` sliding window folds. With enough cores the wall time of all folds approaches the time of
+`folds / workers` folds.
+
+    python -m benchmarks.bench_backtest --rows 500000 --folds 50 --workers 1 4 8
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import polars as pl
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES, calendar_features
+from ml_cookie_cutter.ml.backtest import aggregate_folds, run_backtest
+from ml_cookie_cutter.ml.datasets import dataset_directory
+from ml_cookie_cutter.ml.experiment import parse_overrides
+from ml_cookie_cutter.orchestration.timeseries_example import BacktestConfig
+
+DATASET = "bench_backtest"
+
+
+def write_dataset(datalake: Path, rows: int):
+    directory = dataset_directory("timeseries", DATASET, datalake)
+    directory.mkdir(parents=True)
+    minutes = np.arange(rows)
+    seasonal = np.sin(2 * np.pi * minutes / (60 * 24)) + np.sin(2 * np.pi * minutes / (60 * 24 * 7))
+    target = seasonal + np.random.default_rng(0).normal(0, 0.1, rows)
+    df = pl.DataFrame(
+        {"Datetime": pl.Series(minutes * 60_000_000).cast(pl.Datetime("us")), "Global_active_power": target}
+    )
+    df.with_columns(calendar_features()).write_parquet(directory / "0000.parquet")
+
+
+def run(rows: int, folds: int, workers: List[int], n_estimators: int):
+    horizon = rows // (2 * folds)
+    config = BacktestConfig(window="sliding", train_rows=rows // 2, horizon=horizon)
+    spec = parse_overrides([f"dataset={DATASET}", "model=random_forest", f"n_estimators={n_estimators}"])
+    print(f"{rows} rows, {len(config.folds(rows))} folds of {rows // 2} train and {horizon} test rows")
+    print(f"{os.cpu_count()} cores, features {CALENDAR_FEATURES}")
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(Path(tmp), rows)
+        baseline = None
+        for count in workers:
+            start = time.perf_counter()
+            results = run_backtest("timeseries", spec, config, workers=count, datalake=Path(tmp))
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            fit = sum(result.fit_seconds for result in results)
+            print(
+                f"{count:>3} workers {seconds:8.2f} s ({baseline / seconds:4.1f}x) | fits {fit:8.2f} s"
+                f" | MAE {aggregate_folds(results)['mae_mean']:.4f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--folds", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--n-estimators", type=int, default=10)
+    args = parser.parse_args()
+    run(args.rows, args.folds, args.workers, args.n_estimators)
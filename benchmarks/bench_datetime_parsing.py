@@ -0,0 +1,62 @@
+"""Compare parsing the Datetime of the raw timeseries from concatenated strings and from separate date and time.
+
+Runs on the raw household power consumption dataset when it is checked out, otherwise on synthetic readings in the
+same format and of the same size (one reading per minute).
+
+    python -m benchmarks.bench_datetime_parsing --repeat 5
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+import numpy as np
+import polars as pl
+
+from ml_cookie_cutter.data.raw import RawDataset, lfs_pointer_oid
+from ml_cookie_cutter.orchestration.timeseries_example import date_time_to_datetime
+
+FULL_DATASET_ROWS = 2_075_259
+
+
+def raw_date_time(rows: int) -> pl.DataFrame:
+    dataset = RawDataset("timeseries-example")
+    if lfs_pointer_oid(dataset.asset_path) is None:
+        return pl.read_csv(dataset.asset_path, columns=["Date", "Time"], **dataset.pl_read_kwargs)
+    print(f"{dataset.asset_path} is a git-lfs pointer, using {rows} synthetic readings")
+    start = datetime(2006, 12, 16, 17, 24)
+    readings = pl.datetime_range(start, start + timedelta(minutes=rows - 1), "1m", eager=True)
+    return pl.DataFrame({"Date": readings.dt.strftime("%-d/%-m/%Y"), "Time": readings.dt.strftime("%H:%M:%S")})
+
+
+def concatenated(df: pl.DataFrame) -> pl.DataFrame:
+    return df.select((pl.col("Date") + " " + pl.col("Time")).str.to_datetime(format="%d/%m/%Y %H:%M:%S"))
+
+
+def separate(df: pl.DataFrame) -> pl.DataFrame:
+    return df.select(date_time_to_datetime(df.schema).alias("Date"))
+
+
+def run(rows: int, repeat: int):
+    df = raw_date_time(rows)
+    parsers: Dict[str, Callable[[pl.DataFrame], pl.DataFrame]] = {"concatenated": concatenated, "separate": separate}
+    assert concatenated(df).frame_equal(separate(df))
+
+    seconds = {}
+    for name, parse in parsers.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parse(df)
+            timings.append(time.perf_counter() - start)
+        seconds[name] = float(np.median(timings))
+        print(f"{name:<13} {df.height} rows | median {seconds[name] * 1000:8.1f} ms")
+    print(f"speed-up {seconds['concatenated'] / seconds['separate']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=FULL_DATASET_ROWS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,61 @@
+"""Benchmark the compiled forest predictor against scikit-learn on scoring batches of increasing size.
+
+The forest is fitted on synthetic calendar features, by default with the size of the deployed timeseries forest.
+Predictions of both are checked to be bit identical.
+
+    python -m benchmarks.bench_forest --rows 1 100 10000 1000000 --n-estimators 20 --max-depth 10
+"""
+import argparse
+import time
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES
+from ml_cookie_cutter.ml.forest import compile_forest
+
+
+def calendar_rows(rng: np.random.Generator, rows: int) -> np.ndarray:
+    upper = np.array([7, 31, 366, 24, 60])
+    return (rng.random((rows, len(CALENDAR_FEATURES))) * upper).astype(np.int64).astype(np.float64)
+
+
+def best_seconds(predict: Callable[[], np.ndarray], repeat: int) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def run(rows: List[int], n_estimators: int, max_depth: Optional[int], repeat: int):
+    rng = np.random.default_rng(0)
+    features = calendar_rows(rng, 100_000)
+    target = features @ rng.random(len(CALENDAR_FEATURES)) + rng.normal(0, 1, features.shape[0])
+    forest = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=0)
+    forest.fit(features, target)
+    compiled = compile_forest(forest)
+    for batch in rows:
+        X = calendar_rows(rng, batch)
+        assert np.array_equal(forest.predict(X), compiled.predict(X)), "Predictions differ"
+        # Fewer repeats of large batches
+        repeats = max(1, min(repeat, repeat * 10_000 // batch))
+        sklearn_seconds = best_seconds(partial(forest.predict, X), repeats)
+        compiled_seconds = best_seconds(partial(compiled.predict, X), repeats)
+        print(
+            f"{batch:>10} rows | scikit-learn {sklearn_seconds * 1000:10.3f} ms"
+            f" | compiled {compiled_seconds * 1000:10.3f} ms | speed-up {sklearn_seconds / compiled_seconds:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 100, 10_000, 1_000_000])
+    parser.add_argument("--n-estimators", type=int, default=20)
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.rows, args.n_estimators, args.max_depth, args.repeat)
@@ -0,0 +1,95 @@
+"""Compare load latency and memory of the parquet and Arrow IPC IO managers.
+
+Every reader is a separate process loading the same asset, as notebooks and training jobs do. Memory mapped IPC
+loads share the OS page cache between readers, which shows as a low private (unshared) memory per reader.
+
+    python -m benchmarks.bench_io_managers --rows 5000000 --readers 4
+"""
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import polars as pl
+from dagster import build_input_context, build_output_context
+from upath import UPath
+
+from ml_cookie_cutter.orchestration.io_managers import PolarsIPCIOManager, PolarsParquetIOManager
+
+
+def private_memory_mb() -> float:
+    """Private (unshared) resident memory of this process, falls back to the peak RSS off Linux."""
+    smaps = Path("/proc/self/smaps_rollup")
+    if smaps.exists():
+        private_kb = sum(int(line.split()[1]) for line in smaps.read_text().splitlines() if line.startswith("Private_"))
+        return private_kb / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_frame(rows: int) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    start = datetime(2006, 12, 16, 17, 24)
+    return pl.DataFrame(
+        {
+            "Datetime": pl.datetime_range(start, start + timedelta(minutes=rows - 1), "1m", eager=True),
+            **{f"measurement_{i}": rng.uniform(0, 5, rows) for i in range(7)},
+        }
+    )
+
+
+def io_managers(base_path: Path) -> Dict[str, PolarsParquetIOManager | PolarsIPCIOManager]:
+    return {
+        "parquet": PolarsParquetIOManager(base_path=UPath(base_path / "parquet")),
+        "ipc": PolarsIPCIOManager(base_path=UPath(base_path / "ipc")),
+        "ipc-lz4": PolarsIPCIOManager(base_path=UPath(base_path / "ipc-lz4"), compression="lz4"),
+    }
+
+
+def load(io_manager: PolarsParquetIOManager | PolarsIPCIOManager, path: UPath, results: "multiprocessing.Queue"):
+    context = build_input_context()
+    before = private_memory_mb()
+    start = time.perf_counter()
+    df = io_manager.load_from_path(context, path)
+    loaded = time.perf_counter()
+    df.select(pl.exclude("Datetime").sum())
+    scanned = time.perf_counter()
+    results.put((loaded - start, scanned - start, private_memory_mb() - before))
+
+
+def run(rows: int, readers: int):
+    df = synthetic_frame(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, io_manager in io_managers(Path(tmp)).items():
+            path = io_manager._with_extension(io_manager._base_path / "asset")
+            io_manager.make_directory(path.parent)
+            io_manager.dump_to_path(build_output_context(), df, path)
+
+            # Spawn, as forking a process with a running polars thread pool can deadlock
+            spawn = multiprocessing.get_context("spawn")
+            results: "multiprocessing.Queue" = spawn.Queue()
+            processes = [spawn.Process(target=load, args=(io_manager, path, results)) for _ in range(readers)]
+            for process in processes:
+                process.start()
+            measurements = np.array([results.get() for _ in processes])
+            for process in processes:
+                process.join()
+
+            load_s, scan_s, private_mb = measurements.mean(axis=0)
+            size_mb = path.stat().st_size / 1024**2
+            print(
+                f"{name:<8} file {size_mb:8.1f} MB | load {load_s * 1000:8.1f} ms | load+scan {scan_s * 1000:8.1f} ms"
+                f" | private memory per reader {private_mb:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    run(args.rows, args.readers)
@@ -0,0 +1,199 @@
+"""Benchmark the timeseries pipeline stages on synthetic raw data at increasing scales.
+
+Stages are raw data generation, ingest through the source IO manager, cleaning, rolling and tumbling aggregation
+and parquet and Arrow IPC IO manager round trips. Every stage runs in a fresh process, so its peak RSS is its own,
+and reads the output of the previous stage. Throughput and peak RSS per stage and scale are appended to a JSON
+results file together with the package version and git commit, so regressions between versions are visible.
+
+    python -m benchmarks.bench_pipeline --rows 1000000 10000000 --output benchmarks/results.json
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import polars as pl
+from dagster import build_input_context, build_output_context
+from upath import UPath
+
+from ml_cookie_cutter.data.aggregation import tumbling_pyramid
+from ml_cookie_cutter.data.synthetic import write_household_power
+from ml_cookie_cutter.orchestration.io_managers import (
+    PolarsIPCIOManager,
+    PolarsParquetIOManager,
+    PolarsUPathIOManager,
+    SourceAssetPolarsIOManager,
+)
+from ml_cookie_cutter.orchestration.timeseries_example import (
+    MEASUREMENT_COLUMNS,
+    average_global_active_power_per_temporal_unit,
+    clean_timeseries,
+    timeseries_example_dataset,
+)
+
+RAW = "raw.txt"
+INGESTED = "ingested.arrow"
+CLEANED = "cleaned.arrow"
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generate(workdir: Path, rows: int) -> Callable[[], int]:
+    def run():
+        write_household_power(workdir / RAW, rows)
+        return rows
+
+    return run
+
+
+def ingest(workdir: Path, rows: int) -> Callable[[], int]:
+    upstream = build_output_context(
+        metadata={
+            "asset_path": str(workdir / RAW),
+            "read_kwargs": timeseries_example_dataset.pl_read_kwargs,
+            "dtypes": timeseries_example_dataset.dtypes,
+        }
+    )
+    context = build_input_context(upstream_output=upstream)
+
+    def run():
+        df = SourceAssetPolarsIOManager().load_input(context)
+        df.write_ipc(workdir / INGESTED)
+        return df.height
+
+    return run
+
+
+def clean(workdir: Path, rows: int) -> Callable[[], int]:
+    ingested = pl.read_ipc(workdir / INGESTED)
+
+    def run():
+        df, _ = clean_timeseries(ingested)
+        df.write_ipc(workdir / CLEANED)
+        return ingested.height
+
+    return run
+
+
+def rolling_aggregate(workdir: Path, rows: int) -> Callable[[], int]:
+    cleaned = pl.read_ipc(workdir / CLEANED, columns=["Datetime", *MEASUREMENT_COLUMNS])
+
+    def run():
+        average_global_active_power_per_temporal_unit(cleaned, "1d")
+        return cleaned.height
+
+    return run
+
+
+def tumbling_aggregate(workdir: Path, rows: int) -> Callable[[], int]:
+    cleaned = pl.read_ipc(workdir / CLEANED, columns=["Datetime", *MEASUREMENT_COLUMNS])
+
+    def run():
+        tumbling_pyramid(cleaned, "Datetime", MEASUREMENT_COLUMNS)
+        return cleaned.height
+
+    return run
+
+
+def round_trip(io_manager: PolarsUPathIOManager) -> Callable[[Path, int], Callable[[], int]]:
+    def stage(workdir: Path, rows: int) -> Callable[[], int]:
+        cleaned = pl.read_ipc(workdir / CLEANED)
+        path = io_manager._with_extension(io_manager._base_path / "cleaned")
+        io_manager.make_directory(path.parent)
+        output_context, input_context = build_output_context(), build_input_context()
+
+        def run():
+            io_manager.dump_to_path(output_context, cleaned, path)
+            return io_manager.load_from_path(input_context, path).height
+
+        return run
+
+    return stage
+
+
+def stages(workdir: Path) -> Dict[str, Callable[[Path, int], Callable[[], int]]]:
+    return {
+        "generate": generate,
+        "ingest": ingest,
+        "clean": clean,
+        "rolling_aggregate": rolling_aggregate,
+        "tumbling_aggregate": tumbling_aggregate,
+        "parquet_round_trip": round_trip(PolarsParquetIOManager(base_path=UPath(workdir / "parquet"), catalog=False)),
+        "ipc_round_trip": round_trip(PolarsIPCIOManager(base_path=UPath(workdir / "ipc"), catalog=False)),
+    }
+
+
+def run_stage(name: str, workdir: Path, rows: int, results: "multiprocessing.Queue"):
+    run = stages(workdir)[name](workdir, rows)
+    start = time.perf_counter()
+    processed = run()
+    results.put((time.perf_counter() - start, processed, peak_rss_mb()))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def package_version() -> Optional[str]:
+    try:
+        return metadata.version("ml-cookie-cutter")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def run(rows: List[int], output: Path):
+    run_info = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "version": package_version(),
+        "commit": git_commit(),
+        "polars": pl.__version__,
+    }
+    records: List[Dict[str, Any]] = []
+    # Spawn, as forking a process with a running polars thread pool can deadlock
+    spawn = multiprocessing.get_context("spawn")
+    for scale in rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in stages(Path(tmp)):
+                results: "multiprocessing.Queue" = spawn.Queue()
+                process = spawn.Process(target=run_stage, args=(name, Path(tmp), scale, results))
+                process.start()
+                seconds, processed, rss_mb = results.get()
+                process.join()
+                record = {
+                    **run_info,
+                    "stage": name,
+                    "rows": processed,
+                    "seconds": round(seconds, 4),
+                    "rows_per_second": round(processed / seconds),
+                    "peak_rss_mb": round(rss_mb, 1),
+                }
+                records.append(record)
+                print(
+                    f"{name:<20} {processed:>12} rows | {seconds:8.2f} s | {record['rows_per_second']:>12} rows/s"
+                    f" | peak RSS {rss_mb:8.1f} MB"
+                )
+
+    previous = json.loads(output.read_text()) if output.exists() else []
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(previous + records, indent=2))
+    print(f"Appended {len(records)} results to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--output", type=Path, default=Path("benchmarks/results.json"))
+    args = parser.parse_args()
+    run(args.rows, args.output)
@@ -0,0 +1,97 @@
+"""Benchmark the latency and throughput of the prediction server with and without micro-batching.
+
+A random forest on the calendar features is saved to a temporary model directory and served from a fresh process.
+Concurrent clients send prediction requests of a few datetimes each. Without batching (the default of the server)
+every request is its own `predict` call in its handler thread, with batching concurrent requests are predicted in one
+call.
+
+    python -m benchmarks.bench_serving --clients 16 --requests 200 --rows 4
+"""
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES
+from ml_cookie_cutter.ml.serving import prediction_server, save_model
+
+MODEL = "bench_forest"
+# Largest batch and longest wait of each mode
+MODES: Dict[str, Dict[str, float]] = {
+    "unbatched": {"batching": False},
+    "batched": {"batching": True, "max_batch_rows": 4096, "max_wait_seconds": 0.002},
+}
+
+
+def write_model(directory: Path, n_estimators: int):
+    rng = np.random.default_rng(0)
+    features = rng.integers(0, 60, (100_000, len(CALENDAR_FEATURES))).astype(np.float32)
+    target = features @ rng.random(len(CALENDAR_FEATURES)) + rng.normal(0, 1, features.shape[0])
+    model = RandomForestRegressor(n_estimators=n_estimators, max_depth=10, random_state=0).fit(features, target)
+    save_model(model, CALENDAR_FEATURES, "target", MODEL, directory)
+
+
+def run_server(directory: Path, mode: str, ports: "multiprocessing.Queue"):
+    server = prediction_server(port=0, directory=directory, **MODES[mode])  # type: ignore[arg-type]
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def client(url: str, requests: int, rows: int, seed: int) -> List[float]:
+    rng = np.random.default_rng(seed)
+    start = datetime(2006, 12, 16)
+    latencies = []
+    for _ in range(requests):
+        minutes = rng.integers(0, 60 * 24 * 365 * 4, rows)
+        body = {"datetimes": [(start + timedelta(minutes=int(minute))).isoformat() for minute in minutes]}
+        request = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST")
+        sent = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        latencies.append(time.perf_counter() - sent)
+    return latencies
+
+
+def run(clients: int, requests: int, rows: int, n_estimators: int):
+    # Spawn, as forking a process with a running polars thread pool can deadlock
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        write_model(Path(tmp), n_estimators)
+        for mode in MODES:
+            ports: "multiprocessing.Queue" = spawn.Queue()
+            process = spawn.Process(target=run_server, args=(Path(tmp), mode, ports), daemon=True)
+            process.start()
+            url = f"http://127.0.0.1:{ports.get()}/predict/{MODEL}"
+            # Warm up, loading the model into the cache
+            client(url, 1, rows, seed=0)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                results = pool.map(client, [url] * clients, [requests] * clients, [rows] * clients, range(clients))
+                latencies = np.array([latency for result in results for latency in result]) * 1000
+            seconds = time.perf_counter() - start
+            process.terminate()
+            process.join()
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(
+                f"{mode:<10} {len(latencies) / seconds:8.0f} requests/s | {len(latencies) * rows / seconds:9.0f} rows/s"
+                f" | latency p50 {p50:6.2f} ms p95 {p95:6.2f} ms p99 {p99:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    args = parser.parse_args()
+    run(args.clients, args.requests, args.rows, args.n_estimators)
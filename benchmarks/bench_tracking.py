@@ -0,0 +1,56 @@
+"""Benchmark the time a training loop spends logging metrics, buffered versus written synchronously.
+
+The buffered tracker queues every value and writes batches from a background thread. The synchronous baseline
+inserts and commits every value into the same SQLite store, as a logger calling the store per step would.
+
+    python -m benchmarks.bench_tracking --steps 100000
+"""
+import argparse
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Tuple
+
+from ml_cookie_cutter.ml.tracking import Tracker, TrackingStore
+
+
+def synchronous(directory: Path, steps: int) -> Tuple[float, float]:
+    """Seconds spent in the loop and until all values are written"""
+    store = TrackingStore(directory)
+    with closing(store._connect()) as connection:
+        start = time.perf_counter()
+        for step in range(steps):
+            with connection:
+                row = ("run", "loss", step, 1.0, time.time())
+                connection.execute("INSERT INTO metrics VALUES (?, ?, ?, ?, ?)", row)
+        seconds = time.perf_counter() - start
+        return seconds, seconds
+
+
+def buffered(directory: Path, steps: int) -> Tuple[float, float]:
+    tracker = Tracker(directory)
+    run = tracker.start_run("bench")
+    start = time.perf_counter()
+    for step in range(steps):
+        run.log_metric("loss", 1.0, step)
+    logged = time.perf_counter() - start
+    tracker.close()
+    return logged, time.perf_counter() - start
+
+
+def run(steps: int):
+    for name, log in [("synchronous", synchronous), ("buffered", buffered)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            seconds, written = log(Path(tmp), steps)
+        print(
+            f"{name:<12} {seconds:8.3f} s in the loop | {seconds / steps * 1e6:8.2f} us per logged value"
+            f" | {written:8.3f} s until written"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=100_000)
+    args = parser.parse_args()
+    run(args.steps)
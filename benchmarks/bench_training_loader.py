@@ -0,0 +1,95 @@
+"""Benchmark the peak memory of building training arrays from a dataset with the loader against the polars path.
+
+The polars path collects the dataset, splits it into train and test frames and converts each to float64 NumPy
+arrays, as the timeseries training script did. The loader reads only the model columns, the features as float32
+into one row major matrix, and splits it into views. Each path runs in a fresh process, so its peak RSS is its own.
+
+    python -m benchmarks.bench_training_loader --rows 10000000
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import polars as pl
+
+from benchmarks.bench_pipeline import peak_rss_mb
+from ml_cookie_cutter.ml.datasets import dataset_directory, dataset_paths, load_training_arrays
+from ml_cookie_cutter.orchestration.timeseries_example import MEASUREMENT_COLUMNS, TrainTestConfig
+
+PROJECT = "timeseries"
+DATASET = "benchmark"
+TARGET = "Global_active_power"
+FEATURES = [column for column in MEASUREMENT_COLUMNS if column != TARGET]
+
+
+def write_dataset(datalake: Path, rows: int, partitions: int = 10):
+    directory = dataset_directory(PROJECT, DATASET, datalake)
+    directory.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    per_partition = rows // partitions
+    for partition in range(partitions):
+        start = partition * per_partition
+        pl.DataFrame(
+            {
+                "Datetime": pl.Series(np.arange(start, start + per_partition) * 60_000_000).cast(pl.Datetime("us")),
+                **{column: rng.random(per_partition) for column in MEASUREMENT_COLUMNS},
+            }
+        ).write_parquet(directory / f"{partition:04}.parquet")
+
+
+def polars_arrays(datalake: Path) -> int:
+    paths = dataset_paths(PROJECT, DATASET, datalake=datalake)
+    df = (
+        pl.scan_parquet(paths[0].parent / "*.parquet")
+        .select(["Datetime", *FEATURES, TARGET])
+        .sort("Datetime")
+        .collect()
+    )
+    train_df, test_df = TrainTestConfig().apply_split(df)
+    arrays = [
+        train_df[FEATURES].to_numpy(),
+        train_df[TARGET].to_numpy().reshape(-1, 1),
+        test_df[FEATURES].to_numpy(),
+        test_df[TARGET].to_numpy(),
+    ]
+    return sum(array.shape[0] for array in arrays[1::2])
+
+
+def loader_arrays(datalake: Path) -> int:
+    arrays = load_training_arrays(PROJECT, DATASET, FEATURES, TARGET, datalake=datalake)
+    train, test = arrays.split(TrainTestConfig())
+    return len(train) + len(test)
+
+
+PATHS: Dict[str, Callable[[Path], int]] = {"polars": polars_arrays, "loader": loader_arrays}
+
+
+def run_path(name: str, datalake: Path, results: "multiprocessing.Queue"):
+    start = time.perf_counter()
+    rows = PATHS[name](datalake)
+    results.put((time.perf_counter() - start, rows, peak_rss_mb()))
+
+
+def run(rows: int):
+    # Spawn, as forking a process with a running polars thread pool can deadlock
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(Path(tmp), rows)
+        for name in PATHS:
+            results: "multiprocessing.Queue" = spawn.Queue()
+            process = spawn.Process(target=run_path, args=(name, Path(tmp), results))
+            process.start()
+            seconds, loaded, rss_mb = results.get()
+            process.join()
+            print(f"{name:<8} {loaded:>12} rows | {seconds:8.2f} s | peak RSS {rss_mb:8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,30 @@
+# Used to test the mlflow tracking server, the run is tracked locally and forwarded to the server at
+# MLFLOW_TRACKING_URI (e.g. http://localhost:5000/) when it is set
+import os
+
+from sklearn.datasets import load_diabetes
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import train_test_split
+
+from ml_cookie_cutter.ml.tracking import Tracker, forward_to_mlflow
+
+db = load_diabetes()
+
+X_train, X_test, y_train, y_test = train_test_split(db.data, db.target)
+
+tracker = Tracker()
+with tracker.start_run("diabetes_random_forest", project="mlflow-store-test") as run:
+    # Create and train models.
+    params = {"n_estimators": 100, "max_depth": 12, "max_features": 3}
+    run.log_params(params)
+    rf = RandomForestRegressor(**params)
+    rf.fit(X_train, y_train)
+
+    # Use the model to make predictions on the test dataset.
+    predictions = rf.predict(X_test)
+    run.log_metric("mae", mean_absolute_error(y_test, predictions))
+tracker.close()
+
+if "MLFLOW_TRACKING_URI" in os.environ:
+    print(f"Forwarded to MLflow run {forward_to_mlflow(tracker.store, run.run_id, os.environ['MLFLOW_TRACKING_URI'])}")
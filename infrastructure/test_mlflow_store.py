@@ -1,19 +0,0 @@
-# Used to test the mlflow tracking server
-import mlflow
-from sklearn.datasets import load_diabetes
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-
-mlflow.set_tracking_uri("http://localhost:5000/")
-
-mlflow.autolog()
-db = load_diabetes()
-
-X_train, X_test, y_train, y_test = train_test_split(db.data, db.target)
-
-# Create and train models.
-rf = RandomForestRegressor(n_estimators=100, max_depth=12, max_features=3)
-rf.fit(X_train, y_train)
-
-# Use the model to make predictions on the test dataset.
-predictions = rf.predict(X_test)
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, Union
+import cProfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, List, Optional, Union
 
 import typer
 from rich import print
 from rich.panel import Panel
+from rich.table import Table
 
 if TYPE_CHECKING:
     from ml_cookie_cutter.projects import Project
 
 
 app = typer.Typer()
+MATERIALIZATION_IO_MANAGERS = {
+    "parquet": "local_polars_parquet_io_manager",
+    "ipc": "local_polars_ipc_io_manager",
+    "duckdb": "duckdb_polars_io_manager",
+}
+cache_app = typer.Typer(help="Inspect and purge the raw ingest cache")
+app.add_typer(cache_app, name="cache")
+runs_app = typer.Typer(help="Inspect tracked runs and forward them to Neptune or MLflow")
+app.add_typer(runs_app, name="runs")
 
 
 def get_project_by_name(project: str):
@@ -31,7 +43,8 @@ def print_datasets_for_project(project: Union[str, Project]) -> Optional[list[st
         _project = get_project_by_name(project)
     else:
         _project = project
-    datasets = _project.get_datasets()
+    entries = _project.get_dataset_entries()
+    datasets = [entry.path for entry in entries] if entries else _project.get_datasets()
 
     if not datasets:
         typer.echo(
@@ -39,24 +52,418 @@ def print_datasets_for_project(project: Union[str, Project]) -> Optional[list[st
         )
         raise typer.Exit(1)
 
+    if entries:
+        table = Table(title=f"Datasets for {_project}")
+        table.add_column("Asset")
+        table.add_column("Partition")
+        table.add_column("Rows", justify="right")
+        table.add_column("Size", justify="right")
+        table.add_column("From")
+        table.add_column("To")
+        for entry in entries:
+            table.add_row(
+                entry.asset_key.rsplit("/", 1)[-1],
+                entry.partition_key or "",
+                str(entry.row_count),
+                format_bytes(entry.byte_size or 0),
+                entry.min_timestamp or "",
+                entry.max_timestamp or "",
+            )
+        print(table)
+
     typer.echo(
         f"""Available datasets:
         {(', ').join([str(path) for path in datasets])}"""
     )
 
 
-@app.command(help="Materialize data for a project")
-def materialize_project(project: str, materialization: str = "parquet"):
-    """Materialize a project"""
-    from ml_cookie_cutter.orchestration import materialize_timeseries_data_assets
+@app.command(help="Materialize data for one or more projects")
+def materialize_project(
+    projects: Annotated[List[str], typer.Argument(help="Projects to materialize")],
+    materialization: str = "parquet",
+    partition: Annotated[Optional[List[str]], typer.Option(help="Partition key to materialize, repeatable")] = None,
+    missing: Annotated[bool, typer.Option(help="Only materialize missing or stale partitions")] = False,
+    workers: Annotated[int, typer.Option(help="Number of worker processes running independent assets")] = 1,
+    streaming: Annotated[
+        bool, typer.Option(help="Process raw data larger than memory with the polars streaming engine")
+    ] = False,
+    incremental: Annotated[
+        bool, typer.Option(help="Only aggregate readings newer than the previous materialization of a partition")
+    ] = False,
+):
+    """Materialize projects"""
+    from ml_cookie_cutter.orchestration.materialize import MaterializationTiming, project_materializations
+
+    _projects = [get_project_by_name(project) for project in projects]
+    for _project in _projects:
+        if _project.name not in project_materializations:
+            typer.echo(f"Project: {_project} has no data assets to materialize")
+            raise typer.Exit(1)
+    io_manager = MATERIALIZATION_IO_MANAGERS.get(materialization)
+    if io_manager is None:
+        typer.echo(f"Materialization: {materialization} not supported, use one of {list(MATERIALIZATION_IO_MANAGERS)}")
+        raise typer.Exit(1)
+    if materialization == "duckdb":
+        # DuckDB allows a single writing process and its tables are not part of the dataset catalog
+        unsupported = [
+            option
+            for option, selected in [
+                ("--workers > 1", workers > 1),
+                ("--missing", missing),
+                ("--streaming", streaming),
+                ("--incremental", incremental),
+            ]
+            if selected
+        ]
+        if unsupported:
+            typer.echo(f"Materialization: duckdb does not support {', '.join(unsupported)}")
+            raise typer.Exit(1)
+
+    def on_progress(timing: MaterializationTiming, done: int, total: int):
+        partition_key = f" [{timing.partition_key}]" if timing.partition_key else ""
+        typer.echo(f"[{done}/{total}] {timing.asset}{partition_key} {timing.seconds:.2f}s")
+
+    for _project in _projects:
+        typer.echo(f"Materializing data for project: {_project} ({materialization}, {workers} workers)")
+        timings = project_materializations[_project.name](
+            io_manager=io_manager,  # type: ignore[arg-type]
+            partition_keys=partition or None,
+            missing_only=missing,
+            workers=workers,
+            on_progress=on_progress,
+            streaming=streaming,
+            incremental=incremental,
+        )
+        print_timings(timings)
+
+        typer.echo(f"Datasets materialized successfully! ({len(timings)} runs)")
+        if materialization == "duckdb":
+            from ml_cookie_cutter.data.constants import DUCKDB_PATH
+
+            typer.echo(f"Datasets stored as tables in {DUCKDB_PATH}")
+        else:
+            print_datasets_for_project(_project)
+
+
+def print_timings(timings):
+    """Print the materialization time per asset, slowest first"""
+    per_asset: dict[str, list[float]] = {}
+    for timing in timings:
+        per_asset.setdefault(timing.asset, []).append(timing.seconds)
+
+    table = Table(title="Materialization timings")
+    table.add_column("Asset")
+    table.add_column("Runs", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Slowest (s)", justify="right")
+    for asset, seconds in sorted(per_asset.items(), key=lambda item: sum(item[1]), reverse=True):
+        table.add_row(asset, str(len(seconds)), f"{sum(seconds):.2f}", f"{max(seconds):.2f}")
+    print(table)
+
+
+def print_hot_paths(timings, top: int):
+    """Print the instrumented phases per asset, slowest first"""
+    from ml_cookie_cutter.orchestration.instrumentation import rank_hot_paths
+
+    hot_paths = rank_hot_paths([measurement for timing in timings for measurement in timing.measurements])
+    table = Table(title="Hot paths")
+    table.add_column("Asset", overflow="fold")
+    table.add_column("Phase")
+    table.add_column("Runs", justify="right")
+    table.add_column("Wall (s)", justify="right")
+    table.add_column("CPU (s)", justify="right")
+    table.add_column("Peak RSS +", justify="right")
+    table.add_column("Rows", justify="right")
+    table.add_column("Bytes", justify="right")
+    for hot_path in hot_paths[:top]:
+        table.add_row(
+            hot_path.asset,
+            hot_path.phase,
+            str(hot_path.runs),
+            f"{hot_path.wall_seconds:.3f}",
+            f"{hot_path.cpu_seconds:.3f}",
+            format_bytes(hot_path.peak_rss_delta_mb * 1024**2),
+            "" if hot_path.rows is None else str(hot_path.rows),
+            "" if hot_path.bytes is None else format_bytes(hot_path.bytes),
+        )
+    print(table)
+
+
+@app.command("profile", help="Materialize a project with instrumentation and rank its hot paths")
+def profile_project(
+    project: Annotated[str, typer.Argument(help="Project to profile")],
+    materialization: str = "parquet",
+    partition: Annotated[Optional[List[str]], typer.Option(help="Partition key to materialize, repeatable")] = None,
+    streaming: Annotated[bool, typer.Option(help="Profile the streaming materialization")] = False,
+    top: Annotated[int, typer.Option(help="Number of hot paths to print")] = 20,
+    cprofile: Annotated[
+        Optional[Path], typer.Option(help="Dump cProfile stats to this file, e.g. for flameprof or snakeviz")
+    ] = None,
+):
+    """Profile the materialization of a project"""
+    from ml_cookie_cutter.orchestration.materialize import project_materializations
+
+    _project = get_project_by_name(project)
+    if _project.name not in project_materializations:
+        typer.echo(f"Project: {_project} has no data assets to materialize")
+        raise typer.Exit(1)
+    io_manager = MATERIALIZATION_IO_MANAGERS.get(materialization)
+    if io_manager is None:
+        typer.echo(f"Materialization: {materialization} not supported, use one of {list(MATERIALIZATION_IO_MANAGERS)}")
+        raise typer.Exit(1)
+
+    typer.echo(f"Profiling materialization of project: {_project} ({materialization})")
+    profiler = cProfile.Profile() if cprofile is not None else None
+    if profiler is not None:
+        profiler.enable()
+    # A single worker, so every run is measured (and profiled) in this process
+    timings = project_materializations[_project.name](
+        io_manager=io_manager,  # type: ignore[arg-type]
+        partition_keys=partition or None,
+        workers=1,
+        streaming=streaming,
+    )
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(cprofile)
+        typer.echo(f"cProfile stats written to {cprofile}")
+
+    print_timings(timings)
+    print_hot_paths(timings, top)
+
+
+# typer reads the annotations of this module as strings, so an optional argument is declared by its default
+EXPERIMENT_OVERRIDES = typer.Argument(
+    None,
+    help="key=value overrides of dataset, features, target, model and model hyperparameters, comma separated values"
+    " are swept, e.g. model=random_forest max_depth=5,10",
+)
+
+
+@app.command(help="Run a grid or random sweep of model configurations on a dataset and compare them")
+def experiment(
+    overrides: Optional[List[str]] = EXPERIMENT_OVERRIDES,
+    project: str = "timeseries",
+    search: Annotated[str, typer.Option(help="Search strategy, grid or random")] = "grid",
+    trials: Annotated[Optional[int], typer.Option(help="Number of trials of a random search")] = None,
+    seed: int = 0,
+    workers: Annotated[int, typer.Option(help="Number of worker processes fitting trials")] = 1,
+    output: Annotated[Optional[Path], typer.Option(help="Write the results as JSON to this file")] = None,
+    save_best: Annotated[
+        Optional[str], typer.Option(help="Save the model of the best trial for serving by name")
+    ] = None,
+):
+    """Run an experiment"""
+    from ml_cookie_cutter.ml.experiment import TrialResult, parse_overrides, run_experiment, save_trial_model
+
+    _project = get_project_by_name(project)
+    if search not in ("grid", "random"):
+        typer.echo(f"Search: {search} not supported, use grid or random")
+        raise typer.Exit(1)
+    if search == "random" and trials is None:
+        typer.echo("A random search needs --trials")
+        raise typer.Exit(1)
+    try:
+        spec = parse_overrides(overrides or [])
+    except ValueError as error:
+        typer.echo(str(error))
+        raise typer.Exit(1) from error
+
+    def on_result(result: TrialResult, done: int, total: int):
+        typer.echo(f"[{done}/{total}] {result.model} {format_params(result.params)} MAE {result.mae:.4f}")
+
+    typer.echo(f"Running experiment on {_project}/{spec.dataset} ({search} search, {workers} workers)")
+    results = run_experiment(
+        _project,
+        spec,
+        search=search,  # type: ignore[arg-type]
+        n_trials=trials,
+        seed=seed,
+        workers=workers,
+        on_result=on_result,
+    )
+    print_results(results)
+    if output is not None:
+        import json
+        from dataclasses import asdict
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps([asdict(result) for result in results], indent=2))
+        typer.echo(f"Results written to {output}")
+    if save_best is not None and results:
+        path = save_trial_model(_project, spec, results[0], save_best, seed=seed)
+        typer.echo(f"Model of trial {results[0].index} saved to {path}")
+
+
+def format_params(params: dict) -> str:
+    return " ".join(f"{key}={value}" for key, value in params.items())
+
+
+def print_results(results):
+    """Print the trial results of an experiment, best first"""
+    table = Table(title="Experiment results")
+    table.add_column("Rank", justify="right")
+    table.add_column("Trial", justify="right")
+    table.add_column("Model")
+    table.add_column("Hyperparameters", overflow="fold")
+    table.add_column("MAE", justify="right")
+    table.add_column("RMSE", justify="right")
+    table.add_column("Fit (s)", justify="right")
+    table.add_column("Predict (s)", justify="right")
+    for rank, result in enumerate(results, start=1):
+        table.add_row(
+            str(rank),
+            str(result.index),
+            result.model,
+            format_params(result.params),
+            f"{result.mae:.4f}",
+            f"{result.rmse:.4f}",
+            f"{result.fit_seconds:.2f}",
+            f"{result.predict_seconds:.2f}",
+        )
+    print(table)
+
+
+BACKTEST_OVERRIDES = typer.Argument(
+    None, help="key=value overrides of dataset, features, target, model and model hyperparameters, as for experiment"
+)
+
+
+@app.command(help="Backtest a model configuration on rolling origin folds of a dataset")
+def backtest(
+    overrides: Optional[List[str]] = BACKTEST_OVERRIDES,
+    project: str = "timeseries",
+    train_rows: Annotated[int, typer.Option(help="Rows the first (expanding) or every (sliding) fold trains on")] = 0,
+    horizon: Annotated[int, typer.Option(help="Rows every fold tests on")] = 0,
+    step: Annotated[Optional[int], typer.Option(help="Rows the origin moves per fold, by default the horizon")] = None,
+    gap: Annotated[int, typer.Option(help="Rows embargoed between the train and test rows of a fold")] = 0,
+    window: Annotated[str, typer.Option(help="Train window, expanding or sliding")] = "expanding",
+    max_folds: Annotated[Optional[int], typer.Option(help="Keep only the most recent folds")] = None,
+    seed: int = 0,
+    workers: Annotated[int, typer.Option(help="Number of worker processes fitting folds")] = 1,
+    output: Annotated[Optional[Path], typer.Option(help="Write the fold results as JSON to this file")] = None,
+):
+    """Run a backtest"""
+    from ml_cookie_cutter.ml.backtest import FoldResult, aggregate_folds, run_backtest
+    from ml_cookie_cutter.ml.experiment import parse_overrides
+    from ml_cookie_cutter.orchestration.timeseries_example import BacktestConfig
 
     _project = get_project_by_name(project)
+    if train_rows < 1 or horizon < 1:
+        typer.echo("A backtest needs --train-rows and --horizon")
+        raise typer.Exit(1)
+    if window not in ("expanding", "sliding"):
+        typer.echo(f"Window: {window} not supported, use expanding or sliding")
+        raise typer.Exit(1)
+    try:
+        spec = parse_overrides(overrides or [])
+        config = BacktestConfig(
+            window=window,  # type: ignore[arg-type]
+            train_rows=train_rows,
+            horizon=horizon,
+            step=step,
+            gap=gap,
+            max_folds=max_folds,
+        )
+    except ValueError as error:
+        typer.echo(str(error))
+        raise typer.Exit(1) from error
+
+    def on_result(result: FoldResult, done: int, total: int):
+        typer.echo(f"[{done}/{total}] fold {result.fold} MAE {result.mae:.4f}")
+
+    typer.echo(f"Backtesting {', '.join(spec.models)} on {_project}/{spec.dataset} ({workers} workers)")
+    try:
+        results = run_backtest(_project, spec, config, seed=seed, workers=workers, on_result=on_result)
+    except ValueError as error:
+        typer.echo(str(error))
+        raise typer.Exit(1) from error
+    print_fold_results(results, aggregate_folds(results))
+    if output is not None:
+        import json
+        from dataclasses import asdict
 
-    typer.echo(f"Materializing data for project: {_project} ({materialization})")
-    materialize_timeseries_data_assets(io_manager="local_polars_parquet_io_manager")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps([asdict(result) for result in results], indent=2))
+        typer.echo(f"Results written to {output}")
 
-    typer.echo("Datasets materialized successfully!")
-    print_datasets_for_project(_project)
+
+def print_fold_results(results, aggregates: dict):
+    """Print the fold results of a backtest and the metrics aggregated over the folds"""
+    table = Table(title="Backtest results")
+    table.add_column("Fold", justify="right")
+    table.add_column("Train rows", justify="right")
+    table.add_column("Test rows", justify="right")
+    table.add_column("MAE", justify="right")
+    table.add_column("RMSE", justify="right")
+    table.add_column("Fit (s)", justify="right")
+    table.add_column("Predict (s)", justify="right")
+    for result in results:
+        table.add_row(
+            str(result.fold),
+            f"{result.train_start}-{result.train_stop}",
+            f"{result.test_start}-{result.test_stop}",
+            f"{result.mae:.4f}",
+            f"{result.rmse:.4f}",
+            f"{result.fit_seconds:.2f}",
+            f"{result.predict_seconds:.2f}",
+        )
+    print(table)
+    for metric in ("mae", "rmse"):
+        print(
+            f"{metric.upper()} mean {aggregates[f'{metric}_mean']:.4f} std {aggregates[f'{metric}_std']:.4f}"
+            f" max {aggregates[f'{metric}_max']:.4f}"
+        )
+
+
+@app.command(help="Serve predictions of saved models over HTTP")
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    models: Annotated[Optional[Path], typer.Option(help="Directory of the saved models")] = None,
+    cache_size: Annotated[int, typer.Option(help="Number of models kept loaded")] = 4,
+    batching: Annotated[bool, typer.Option(help="Micro-batch concurrent requests into one predict call")] = False,
+    max_batch_rows: Annotated[int, typer.Option(help="Rows of concurrent requests batched at most")] = 4096,
+    max_wait_ms: Annotated[float, typer.Option(help="Time to wait for concurrent requests to batch")] = 2.0,
+    project: str = "timeseries",
+    feature_table: Annotated[
+        Optional[str], typer.Option(help="Feature table of the project to look up request features in")
+    ] = None,
+    feature_tolerance_seconds: Annotated[
+        float, typer.Option(help="Largest age of a looked up feature row, by default its timestamp must match")
+    ] = 0.0,
+    verbose: bool = False,
+):
+    """Serve models"""
+    from datetime import timedelta
+
+    from ml_cookie_cutter.data.constants import MODEL_DIRECTORY
+    from ml_cookie_cutter.ml.feature_store import load_feature_index
+    from ml_cookie_cutter.ml.serving import available_models, prediction_server
+
+    directory = models or MODEL_DIRECTORY
+    feature_index = load_feature_index(project, feature_table) if feature_table is not None else None
+    server = prediction_server(
+        host,
+        port,
+        directory,
+        cache_size,
+        batching,
+        max_batch_rows,
+        max_wait_ms / 1000,
+        feature_index,
+        timedelta(seconds=feature_tolerance_seconds),
+        verbose,
+    )
+    if feature_index is not None:
+        typer.echo(f"Looking up features {feature_index.features} in {len(feature_index)} rows of {feature_table}")
+    typer.echo(f"Serving models {available_models(directory)} from {directory} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
 @app.command("datasets", help="List datasets for a project")
@@ -79,5 +486,118 @@ def list_projects():
     print(Panel.fit(f"""{strings_formatted}""", title="Projects"))
 
 
+def format_bytes(size: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+@cache_app.command("list", help="List raw dataset snapshots in the cache")
+def list_cache():
+    """List raw cache snapshots"""
+    from datetime import datetime
+
+    from ml_cookie_cutter.data.cache import RawSnapshotCache
+
+    cache = RawSnapshotCache()
+    table = Table(title="Raw cache")
+    table.add_column("Key")
+    table.add_column("Size", justify="right")
+    table.add_column("Last used")
+    for entry in cache.entries():
+        table.add_row(entry.key[:16], format_bytes(entry.size), datetime.fromtimestamp(entry.last_used).isoformat())
+    print(table)
+    typer.echo(f"Total: {format_bytes(cache.size())} in {cache.path}")
+
+
+@cache_app.command("purge", help="Purge the raw cache, or evict down to --max-bytes")
+def purge_cache(max_bytes: Optional[int] = None):
+    """Purge raw cache snapshots"""
+    from ml_cookie_cutter.data.cache import RawSnapshotCache
+
+    cache = RawSnapshotCache()
+    evicted = cache.purge() if max_bytes is None else cache.evict(max_bytes=max_bytes)
+    typer.echo(f"Evicted {len(evicted)} snapshot(s), freed {format_bytes(sum(entry.size for entry in evicted))}")
+
+
+@runs_app.command("list", help="List tracked runs, most recent first")
+def list_runs(project: Optional[str] = None):
+    """List tracked runs"""
+    from datetime import datetime
+
+    from ml_cookie_cutter.ml.tracking import TrackingStore
+
+    table = Table(title="Tracked runs")
+    table.add_column("Run")
+    table.add_column("Name")
+    table.add_column("Project")
+    table.add_column("Status")
+    table.add_column("Started")
+    for entry in TrackingStore().runs(project):
+        started = datetime.fromtimestamp(entry.started_at).isoformat(timespec="seconds")
+        table.add_row(entry.run_id, entry.name, entry.project or "", entry.status, started)
+    print(table)
+
+
+@runs_app.command("show", help="Show the params, latest metrics and artifacts of a tracked run")
+def show_run(run_id: str):
+    """Show a tracked run"""
+    from ml_cookie_cutter.ml.tracking import TrackingStore
+
+    store = TrackingStore()
+    try:
+        entry = store.run(run_id)
+    except KeyError as error:
+        typer.echo(str(error))
+        raise typer.Exit(1) from error
+    table = Table(title=f"{entry.name} ({entry.status})")
+    table.add_column("Kind")
+    table.add_column("Key")
+    table.add_column("Value", overflow="fold")
+    for key, value in store.params(run_id).items():
+        table.add_row("param", key, str(value))
+    for key, values in store.metrics(run_id).items():
+        step, value, _ = values[-1]
+        table.add_row("metric", key, f"{value:.6g} (step {step}, {len(values)} values)")
+    for name, path in store.artifacts(run_id).items():
+        table.add_row("artifact", name, str(path))
+    print(table)
+
+
+@runs_app.command("forward", help="Forward a tracked run to MLflow or Neptune")
+def forward_run(
+    run_id: str,
+    to: Annotated[str, typer.Option(help="Backend to forward to, mlflow or neptune")] = "mlflow",
+    tracking_uri: Annotated[Optional[str], typer.Option(help="MLflow tracking URI")] = None,
+    neptune_project: Annotated[Optional[str], typer.Option(help="Neptune project, e.g. workspace/project")] = None,
+):
+    """Forward a tracked run"""
+    import os
+
+    from ml_cookie_cutter.ml.tracking import TrackingStore, forward_to_mlflow, forward_to_neptune
+
+    store = TrackingStore()
+    if to not in ("mlflow", "neptune"):
+        typer.echo(f"Backend: {to} not supported, use mlflow or neptune")
+        raise typer.Exit(1)
+    if to == "neptune" and neptune_project is None:
+        typer.echo("Forwarding to Neptune needs --neptune-project")
+        raise typer.Exit(1)
+    try:
+        if to == "mlflow":
+            typer.echo(f"Forwarded to MLflow run {forward_to_mlflow(store, run_id, tracking_uri)}")
+        else:
+            forward_to_neptune(store, run_id, neptune_project, os.environ.get("NEPTUNE_TOKEN"))  # type: ignore[arg-type]
+            typer.echo(f"Forwarded to Neptune project {neptune_project}")
+    except ModuleNotFoundError as error:
+        typer.echo(f"Forwarding to {to} needs the {error.name} package installed")
+        raise typer.Exit(1) from error
+    except KeyError as error:
+        typer.echo(str(error))
+        raise typer.Exit(1) from error
+
+
 if __name__ == "__main__":
     list_datasets("timeseries")
@@ -0,0 +1,212 @@
+import json
+import os
+import shutil
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Mapping, Sequence
+
+import polars as pl
+
+DEFAULT_BLOCK_EVERY = "1mo"
+# Resolution name to polars duration, finest first
+PYRAMID_LEVELS = {"1min": "1m", "1h": "1h", "1d": "1d", "1w": "1w"}
+# Length of the windows of the coarsest level
+PYRAMID_LONGEST_WINDOW = timedelta(weeks=1)
+
+
+def blocked_rolling(
+    df: pl.DataFrame,
+    index_column: str,
+    period: str,
+    aggs: Sequence[pl.Expr],
+    block_every: str = DEFAULT_BLOCK_EVERY,
+) -> pl.DataFrame:
+    """Trailing rolling aggregation computed independently per calendar block.
+
+    Every block (e.g. month) is aggregated together with the rows of the previous block that fall inside its first
+    windows. The running window state therefore restarts at each block, so a block's result only depends on its own
+    rows and its lookback, which makes an incremental recompute of the open block bit-identical to a full recompute.
+    The `period` must not exceed the shortest block.
+    """
+    block_start = pl.col(index_column).dt.truncate(block_every)
+    next_block_start = block_start.dt.offset_by(block_every)
+
+    df = df.sort(index_column)
+    if not df.select((next_block_start.dt.offset_by(f"-{period}") >= block_start).all()).item():
+        raise ValueError(f"Rolling period {period} exceeds the block size {block_every}")
+
+    blocks = df.with_columns(block_start.alias("_block"), pl.lit(False).alias("_lookback"))
+    lookback = df.filter(pl.col(index_column) > next_block_start.dt.offset_by(f"-{period}")).with_columns(
+        next_block_start.alias("_block"), pl.lit(True).alias("_lookback")
+    )
+    return (
+        pl.concat([blocks, lookback])
+        .sort(["_block", index_column])
+        .rolling(index_column, period=period, by="_block", check_sorted=False)
+        .agg(*aggs, pl.col("_lookback").last())
+        .filter(~pl.col("_lookback"))
+        .drop(["_block", "_lookback"])
+    )
+
+
+def tumbling_pyramid(
+    df: pl.DataFrame,
+    index_column: str,
+    columns: Sequence[str],
+    levels: Mapping[str, str] = PYRAMID_LEVELS,
+) -> Dict[str, pl.DataFrame]:
+    """Tumbling window mean, min, max and count of `columns` at every resolution of `levels`, finest first.
+
+    Only the finest level is aggregated from `df`, in a single sorted pass. Every coarser level is derived from the
+    level before it: counts add up, extremes are the extremes of the extremes and means are weighted by counts. Each
+    level has the columns `<column>_mean`, `<column>_min`, `<column>_max` and `<column>_count`, labelled by the window
+    start (weeks start on Monday). Windows without rows are left out.
+    """
+    pyramid: Dict[str, pl.DataFrame] = {}
+    level = None
+    for name, every in levels.items():
+        if level is None:
+            level = (
+                df.sort(index_column)
+                .group_by_dynamic(index_column, every=every, check_sorted=False)
+                .agg(
+                    *[
+                        expr
+                        for column in columns
+                        for expr in (
+                            pl.col(column).mean().alias(f"{column}_mean"),
+                            pl.col(column).min().alias(f"{column}_min"),
+                            pl.col(column).max().alias(f"{column}_max"),
+                            pl.col(column).is_not_null().sum().alias(f"{column}_count"),
+                        )
+                    ]
+                )
+            )
+        else:
+            means = {f"{column}_mean": level.schema[f"{column}_mean"] for column in columns}
+            level = (
+                level.group_by_dynamic(index_column, every=every, check_sorted=False).agg(
+                    *[
+                        expr
+                        for column in columns
+                        for expr in (
+                            (pl.col(f"{column}_mean") * pl.col(f"{column}_count")).sum().alias(f"{column}_mean"),
+                            pl.col(f"{column}_min").min(),
+                            pl.col(f"{column}_max").max(),
+                            pl.col(f"{column}_count").sum(),
+                        )
+                    ]
+                )
+                # Windows where a column only has nulls have a 0 / 0 mean
+                .with_columns(
+                    (pl.col(f"{column}_mean") / pl.col(f"{column}_count")).fill_nan(None).cast(means[f"{column}_mean"])
+                    for column in columns
+                )
+            )
+        pyramid[name] = level
+    return pyramid
+
+
+class IncrementalRollingAggregation:
+    """Appends trailing rolling aggregates for new rows without recomputing history.
+
+    The aggregates are stored as numbered parquet part files in the `output_path` directory, every update writes one
+    new part, so an update costs the new rows and not the history. The running state is persisted next to it in
+    `<output>.state/`: the input rows of the open block and its lookback (`tail-<part>.parquet`) and the number of
+    committed parts (`state.json`). New rows are aggregated together with the tail through `blocked_rolling`, so the
+    appended rows are identical to a full recompute. Rows at or before the last aggregated timestamp are ignored.
+
+    Part, tail and state files are written to a temporary file and renamed into place, and an update is committed by
+    replacing `state.json` last. An update interrupted before its commit leaves parts and tails beyond the committed
+    part, which `read` ignores and the next update overwrites, so a retry never appends rows twice.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        index_column: str,
+        period: str,
+        aggs: Sequence[pl.Expr],
+        block_every: str = DEFAULT_BLOCK_EVERY,
+    ) -> None:
+        self.output_path = Path(output_path)
+        self.state_path = self.output_path.parent / f"{self.output_path.name}.state"
+        self.index_column = index_column
+        self.period = period
+        self.aggs = aggs
+        self.block_every = block_every
+
+    @property
+    def settings(self):
+        return {"index_column": self.index_column, "period": self.period, "block_every": self.block_every}
+
+    def part_path(self, part: int) -> Path:
+        return self.output_path / f"part-{part:06d}.parquet"
+
+    def tail_path(self, part: int) -> Path:
+        return self.state_path / f"tail-{part:06d}.parquet"
+
+    def committed_parts(self) -> int:
+        """Number of part files of committed updates"""
+        state_file = self.state_path / "state.json"
+        if not state_file.exists():
+            return 0
+        with open(state_file, "r") as f:
+            state = json.load(f)
+        if state["settings"] != self.settings:
+            raise ValueError(
+                f"Aggregation state {self.state_path} was built with {state['settings']}, run a full recompute"
+            )
+        return state["parts"]
+
+    def read(self) -> pl.DataFrame:
+        """All committed aggregates, in time order"""
+        parts = self.committed_parts()
+        if not parts:
+            raise FileNotFoundError(f"No aggregates written to {self.output_path}")
+        return pl.concat([pl.read_parquet(self.part_path(part)) for part in range(1, parts + 1)])
+
+    @staticmethod
+    def _write_parquet(df: pl.DataFrame, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        df.write_parquet(tmp)
+        os.replace(tmp, path)
+
+    def _commit(self, parts: int, frame: pl.DataFrame):
+        """Persist the tail of the aggregated input rows and commit the first `parts` parts"""
+        open_block_start = pl.col(self.index_column).max().dt.truncate(self.block_every)
+        tail = frame.filter(pl.col(self.index_column) > open_block_start.dt.offset_by(f"-{self.period}"))
+        self._write_parquet(tail, self.tail_path(parts))
+        tmp = self.state_path / "state.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {"settings": self.settings, "parts": parts, "last_timestamp": str(tail[self.index_column].max())}, f
+            )
+        os.replace(tmp, self.state_path / "state.json")
+        self.tail_path(parts - 1).unlink(missing_ok=True)
+
+    def update(self, rows: pl.DataFrame) -> pl.DataFrame:
+        """Aggregate the new `rows`, write them as a new part and return the appended aggregates."""
+        parts = self.committed_parts()
+        tail = pl.read_parquet(self.tail_path(parts)) if parts else None
+        if tail is not None:
+            rows = rows.filter(pl.col(self.index_column) > tail[self.index_column].max())
+            frame = pl.concat([tail, rows.select(tail.columns)])
+        else:
+            frame = rows
+        if not rows.height:
+            return blocked_rolling(frame.clear(), self.index_column, self.period, self.aggs, self.block_every)
+
+        aggregated = blocked_rolling(frame, self.index_column, self.period, self.aggs, self.block_every)
+        if tail is not None:
+            aggregated = aggregated.filter(pl.col(self.index_column) > tail[self.index_column].max())
+
+        self._write_parquet(aggregated, self.part_path(parts + 1))
+        self._commit(parts + 1, frame)
+        return aggregated
+
+    def reset(self):
+        """Drop the output and state, so the next update is a full recompute."""
+        shutil.rmtree(self.output_path, ignore_errors=True)
+        shutil.rmtree(self.state_path, ignore_errors=True)
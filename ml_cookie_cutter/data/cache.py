@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+from ml_cookie_cutter.data.constants import RAW_CACHE_DIRECTORY
+
+if TYPE_CHECKING:
+    import polars as pl
+
+DEFAULT_CACHE_MAX_BYTES = 8 * 1024**3
+SNAPSHOT_SUFFIX = ".arrow"
+# Polars can not scan IPC files with its streaming engine, streamed snapshots are parquet
+STREAMING_SNAPSHOT_SUFFIX = ".parquet"
+HASH_CHUNK_SIZE = 8 * 1024**2
+
+
+@dataclass
+class SnapshotEntry:
+    key: str
+    path: Path
+    size: int
+    last_used: float
+
+
+def file_content_hash(path: Path) -> str:
+    """Streaming sha256 of a file, never holds more than one chunk in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RawSnapshotCache:
+    """Columnar (Arrow IPC) snapshots of parsed raw datasets.
+
+    Snapshots are keyed by the content hash of the raw file and the polars read kwargs used to parse it, so a changed
+    file or changed parse options never hit a stale snapshot. Content hashes are memoized on (size, mtime) in an index
+    file to avoid re-hashing unchanged files. The cache is bounded by `max_bytes`, evicting least recently used
+    snapshots first.
+
+    Streaming loads parse the raw file with the polars streaming engine straight into a parquet snapshot, so neither
+    the parse nor later scans of the snapshot hold the whole dataset in memory.
+
+    Values derived from a snapshot, e.g. fingerprints of its rows, can be memoized beside it as JSON with `memo`.
+    """
+
+    index_name = "index.json"
+
+    def __init__(self, path: Union[str, Path] = RAW_CACHE_DIRECTORY, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+
+    def content_hash(self, asset_path: Path) -> str:
+        stat = asset_path.stat()
+        index = self._read_index()
+        entry = index.get(str(asset_path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        sha256 = file_content_hash(asset_path)
+        index[str(asset_path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        self._write_index(index)
+        return sha256
+
+    def key(self, asset_path: Path, read_kwargs: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(self.content_hash(asset_path).encode())
+        digest.update(json.dumps(read_kwargs, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def snapshot_path(self, key: str, streaming: bool = False) -> Path:
+        return self.path / f"{key}{STREAMING_SNAPSHOT_SUFFIX if streaming else SNAPSHOT_SUFFIX}"
+
+    def get(self, key: str, streaming: bool = False) -> Optional[Path]:
+        snapshot = self.snapshot_path(key, streaming)
+        if not snapshot.exists():
+            return None
+        # Touch to keep the LRU order
+        os.utime(snapshot)
+        return snapshot
+
+    def put(self, key: str, df: Union[pl.DataFrame, pl.LazyFrame]) -> Path:
+        """Snapshot a frame, a LazyFrame is sunk by the streaming engine into a parquet snapshot."""
+        # Imported here, so inspecting the cache from the CLI does not pay for importing polars
+        import polars as pl
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        streaming = isinstance(df, pl.LazyFrame)
+        snapshot = self.snapshot_path(key, streaming)
+        tmp = snapshot.with_suffix(".tmp")
+        if isinstance(df, pl.LazyFrame):
+            df.sink_parquet(tmp, statistics=True)
+        else:
+            df.write_ipc(tmp)
+        tmp.replace(snapshot)
+        self.evict(keep=key)
+        return snapshot
+
+    def load(
+        self, asset_path: Path, read_kwargs: Dict[str, Any], lazy: bool = False, streaming: bool = False
+    ) -> Union[pl.DataFrame, pl.LazyFrame]:
+        """Load a raw CSV through the cache, parsing and snapshotting it on a miss.
+
+        With `streaming` the snapshot is parquet and is returned as a `pl.LazyFrame` the streaming engine can scan.
+        """
+        import polars as pl
+
+        key = self.key(asset_path, read_kwargs)
+        if streaming:
+            snapshot = self.get(key, streaming=True)
+            if snapshot is None:
+                snapshot = self.put(key, pl.scan_csv(str(asset_path), **read_kwargs))
+            return pl.scan_parquet(snapshot)
+
+        snapshot = self.get(key)
+        if snapshot is None:
+            snapshot = self.put(key, pl.read_csv(str(asset_path), **read_kwargs))
+        if lazy:
+            return pl.scan_ipc(snapshot)
+        return pl.read_ipc(snapshot)
+
+    def memo(self, key: str, name: str, compute: Callable[[], Any]) -> Any:
+        """The JSON value `name` of the snapshot `key`, computed on the first call for the key and name only."""
+        path = self.path / f"{key}.{name}.json"
+        if path.exists():
+            with open(path, "r") as f:
+                return json.load(f)
+        value = compute()
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(value, f)
+        tmp.replace(path)
+        return value
+
+    def entries(self) -> List[SnapshotEntry]:
+        if not self.path.exists():
+            return []
+        entries = []
+        for snapshot in [
+            *self.path.glob(f"*{SNAPSHOT_SUFFIX}"),
+            *self.path.glob(f"*{STREAMING_SNAPSHOT_SUFFIX}"),
+        ]:
+            stat = snapshot.stat()
+            entries.append(SnapshotEntry(snapshot.stem, snapshot, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry.last_used, reverse=True)
+
+    def size(self) -> int:
+        return sum(entry.size for entry in self.entries())
+
+    def evict(self, max_bytes: Optional[int] = None, keep: Optional[str] = None) -> List[SnapshotEntry]:
+        """Remove least recently used snapshots until the cache fits in `max_bytes`."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        evicted = []
+        for entry in reversed(entries):
+            if total <= max_bytes:
+                break
+            if entry.key == keep:
+                continue
+            entry.path.unlink(missing_ok=True)
+            total -= entry.size
+            evicted.append(entry)
+        return evicted
+
+    def purge(self) -> List[SnapshotEntry]:
+        evicted = self.evict(max_bytes=0)
+        # The content hash index and the memoized values
+        for path in self.path.glob("*.json"):
+            path.unlink(missing_ok=True)
+        return evicted
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        index_path = self.path / self.index_name
+        if not index_path.exists():
+            return {}
+        with open(index_path, "r") as f:
+            return json.load(f)
+
+    def _write_index(self, index: Dict[str, Dict[str, Any]]):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f"{self.index_name}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        tmp.replace(self.path / self.index_name)
@@ -0,0 +1,18 @@
+from typing import List
+
+import polars as pl
+
+# Calendar features of a timestamp, the features of the timeseries models
+CALENDAR_FEATURES = ["weekday", "day_of_month", "day_of_year", "hour", "minute"]
+
+
+def calendar_features(column: str = "Datetime") -> List[pl.Expr]:
+    """Expressions of the `CALENDAR_FEATURES` of a datetime column"""
+    timestamp = pl.col(column).dt
+    return [
+        timestamp.weekday().alias("weekday"),
+        timestamp.day().alias("day_of_month"),
+        timestamp.ordinal_day().alias("day_of_year"),
+        timestamp.hour().alias("hour"),
+        timestamp.minute().alias("minute"),
+    ]
@@ -0,0 +1,99 @@
+import json
+import sqlite3
+from contextlib import closing
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ml_cookie_cutter.data.constants import CATALOG_PATH
+
+
+@dataclass
+class DatasetEntry:
+    path: str
+    asset_key: str
+    partition_key: Optional[str] = None
+    schema: Dict[str, str] = field(default_factory=dict)
+    row_count: Optional[int] = None
+    byte_size: Optional[int] = None
+    min_timestamp: Optional[str] = None
+    max_timestamp: Optional[str] = None
+    run_id: Optional[str] = None
+    data_version: Optional[str] = None
+    updated_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+
+class DatasetCatalog:
+    """Index of the datasets written to the datalake, updated by the io managers on every write.
+
+    Lookups answer from the index, without walking the datalake or opening dataset files. The index is a SQLite
+    database, so concurrent writers (e.g. parallel materialization workers) are serialized safely.
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH) -> None:
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS datasets (
+                path TEXT PRIMARY KEY,
+                asset_key TEXT NOT NULL,
+                partition_key TEXT,
+                schema TEXT NOT NULL,
+                row_count INTEGER,
+                byte_size INTEGER,
+                min_timestamp TEXT,
+                max_timestamp TEXT,
+                run_id TEXT,
+                data_version TEXT,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(datasets)")}
+        if "data_version" not in columns:
+            connection.execute("ALTER TABLE datasets ADD COLUMN data_version TEXT")
+        connection.execute("CREATE INDEX IF NOT EXISTS datasets_asset_key ON datasets (asset_key)")
+        return connection
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def record(self, entry: DatasetEntry):
+        row = {**asdict(entry), "schema": json.dumps(entry.schema)}
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO datasets ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+
+    def set_data_version(self, asset_key: str, partition_key: Optional[str], data_version: str):
+        """Record the data version of the datasets of an asset (partition)."""
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "UPDATE datasets SET data_version = ? WHERE asset_key = ? AND partition_key IS ?",
+                [data_version, asset_key, partition_key],
+            )
+
+    def remove(self, path: str):
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM datasets WHERE path = ?", [path])
+
+    def datasets(self, asset_key_prefix: Optional[str] = None) -> List[DatasetEntry]:
+        """Datasets ordered by asset and partition, optionally only those under an asset key prefix (e.g. `a/b`)."""
+        if not self.exists():
+            return []
+        query = "SELECT * FROM datasets"
+        parameters: List[str] = []
+        if asset_key_prefix:
+            query += " WHERE asset_key = ? OR asset_key LIKE ?"
+            parameters = [asset_key_prefix, f"{asset_key_prefix}/%"]
+        query += " ORDER BY asset_key, partition_key"
+        with closing(self._connect()) as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(query, parameters).fetchall()
+        return [DatasetEntry(**{**dict(row), "schema": json.loads(row["schema"])}) for row in rows]
@@ -8,8 +8,14 @@ DAGSTER_HOME = root
 RAW_DATASET_DIRECTORY: Path = DATASET_DIRECTORY / "raw"
 DATALAKE_DIRECTORY: Path = DATASET_DIRECTORY / "datalake"
 DUCKDB_PATH = DATALAKE_DIRECTORY / "duckdb.db"
+RAW_CACHE_DIRECTORY: Path = DATALAKE_DIRECTORY / "raw_cache"
+CATALOG_NAME = "catalog.sqlite"
+CATALOG_PATH: Path = DATALAKE_DIRECTORY / CATALOG_NAME
+MODEL_DIRECTORY: Path = root / "models"
+TRACKING_DIRECTORY: Path = root / "tracking"
 
 DATASET_PREFIX = "dataset"
+FEATURES_PREFIX = "features"
 
 # Project specific constants
 DATASET_PREFIX_TIMESERIES = "timeseries"
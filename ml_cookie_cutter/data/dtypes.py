@@ -0,0 +1,54 @@
+from typing import Dict, Mapping, Union
+
+import polars as pl
+
+INTEGER_DTYPES = [pl.Int8, pl.Int16, pl.Int32, pl.Int64, pl.UInt8, pl.UInt16, pl.UInt32, pl.UInt64]
+DTYPES: Dict[str, pl.PolarsDataType] = {
+    "Boolean": pl.Boolean,
+    "Categorical": pl.Categorical,
+    "Date": pl.Date,
+    "Float32": pl.Float32,
+    "Float64": pl.Float64,
+    "Utf8": pl.Utf8,
+    **{str(dtype): dtype for dtype in INTEGER_DTYPES},
+}
+
+
+def polars_dtype(name: str) -> pl.PolarsDataType:
+    if name not in DTYPES:
+        raise ValueError(f"Unsupported dtype {name}, use one of {list(DTYPES)}")
+    return DTYPES[name]
+
+
+def polars_schema(schema: Mapping[str, str]) -> Dict[str, pl.PolarsDataType]:
+    """Polars dtypes of a declarative schema of dtype names, e.g. `{"Voltage": "Float32"}`."""
+    return {column: polars_dtype(name) for column, name in schema.items()}
+
+
+def downcast(df: Union[pl.DataFrame, pl.LazyFrame]) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """Downcast Float64 columns to Float32 and, for eager frames, integer columns to the smallest fitting dtype.
+
+    Integers are only shrunk eagerly, since the shrunk dtype depends on the data.
+    """
+    df = df.with_columns(pl.col(pl.Float64).cast(pl.Float32))
+    if isinstance(df, pl.DataFrame):
+        df = df.with_columns(pl.col(INTEGER_DTYPES).shrink_dtype())
+    return df
+
+
+def widened_size(series: pl.Series) -> int:
+    """Estimated bytes of a column read with inferred dtypes: 64 bit numbers and strings instead of categoricals."""
+    if series.is_float():
+        return series.cast(pl.Float64).estimated_size()
+    if series.is_integer():
+        return series.cast(pl.Int64).estimated_size()
+    if series.dtype == pl.Categorical:
+        return series.cast(pl.Utf8).estimated_size()
+    return series.estimated_size()
+
+
+def memory_metadata(df: pl.DataFrame) -> Dict[str, float]:
+    """In-memory size of a frame and the memory saved by its compact dtypes, in MB."""
+    size = df.estimated_size()
+    saved = sum(widened_size(series) for series in df.get_columns()) - size
+    return {"estimated_size_mb": round(size / 1024**2, 2), "memory_saved_mb": round(saved / 1024**2, 2)}
@@ -23,6 +23,8 @@ import pyro.distributions.constraints as constraints
 import torch
 from sklearn.linear_model import LinearRegression
 
+from ml_cookie_cutter.ml.tracking import Tracker
+
 # %% [markdown]
 # # Linear problem with noise
 #
@@ -87,12 +89,19 @@ adam = pyro.optim.Adam({"lr": 0.02})
 elbo = pyro.infer.Trace_ELBO()
 svi = pyro.infer.SVI(lin_pyro_model, auto_guide, adam, elbo)
 
+# Losses are logged to the local tracking store by a background thread, without slowing down the steps
+tracker = Tracker()
+run = tracker.start_run("pyro_lin_reg", project="sandbox")
+run.log_params({"lr": 0.02, "steps": 10000})
 losses = []
 for step in range(10000):  # Consider running for more steps.
     loss = svi.step(x, y)
     losses.append(loss)
+    run.log_metric("elbo_loss", loss, step)
     if step % 100 == 0:
         print("Elbo loss: {}".format(loss))
+run.finish()
+tracker.flush()
 
 plt.figure(figsize=(5, 2))
 plt.plot(losses)
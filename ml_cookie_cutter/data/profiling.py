@@ -0,0 +1,139 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import polars as pl
+
+from ml_cookie_cutter.data.raw import ProfileConfig
+
+RANGED_DTYPES = [*pl.NUMERIC_DTYPES, *pl.TEMPORAL_DTYPES]
+
+
+@dataclass
+class CheckOutcome:
+    name: str
+    passed: bool
+    # Failing checks that only warn, e.g. gaps in an otherwise valid series
+    warn_only: bool = False
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class DatasetProfile:
+    rows: int
+    null_counts: Dict[str, int]
+    ranges: Dict[str, Tuple[Any, Any]]
+    quantiles: Dict[str, Dict[str, Any]]
+    checks: List[CheckOutcome]
+
+    def metadata(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "null_counts": self.null_counts,
+            "ranges": {column: [str(low), str(high)] for column, (low, high) in self.ranges.items()},
+            "quantiles": {
+                column: {key: str(value) for key, value in values.items()} for column, values in self.quantiles.items()
+            },
+        }
+
+
+def profile_check_names(config: ProfileConfig) -> List[str]:
+    """Names of the checks a profile with `config` evaluates."""
+    names = ["has_no_nulls", "index_is_monotonic", "index_has_no_duplicates"]
+    if config.ranges:
+        names.append("values_in_range")
+    if config.max_gap_seconds is not None:
+        names.append("index_has_no_gaps")
+    return names
+
+
+def profile(
+    df: Union[pl.DataFrame, pl.LazyFrame],
+    config: ProfileConfig,
+    streaming: bool = False,
+    index_df: Optional[Union[pl.DataFrame, pl.LazyFrame]] = None,
+) -> DatasetProfile:
+    """Profile a frame and evaluate its data quality checks.
+
+    Every statistic is an expression of a single `select`, which polars evaluates in one query over the frame, so
+    adding checks does not add passes over the data. Statistics are null counts of all columns, ranges and quantiles
+    of the numeric and temporal columns, and the steps between consecutive index values. The index statistics are
+    measured on `index_df` instead when given, e.g. the frame before cleaning dropped incomplete rows, which would
+    otherwise show up as gaps; that is a second query over `index_df`.
+
+    All statistics are exact. Quantiles, unique counts and index steps are not streamable, so with `streaming` only the
+    scan and filters of a lazy frame run on the polars streaming engine, and the aggregations run in memory over the
+    profiled columns of the frame.
+    """
+    schema = df.schema
+    index = pl.col(config.index_column)
+    ranged = [column for column, dtype in schema.items() if dtype in RANGED_DTYPES]
+    step = index.diff()
+    index_stats = [
+        pl.count().alias("index_rows"),
+        index.n_unique().alias("index_unique"),
+        step.min().alias("index_min_step"),
+    ]
+    if config.max_gap_seconds is not None:
+        gap = step > pl.duration(seconds=config.max_gap_seconds)
+        index_stats += [gap.sum().alias("index_gaps"), step.max().alias("index_max_step")]
+    stats = [
+        pl.count().alias("rows"),
+        *[pl.col(column).null_count().alias(f"null_count:{column}") for column in schema],
+        *[pl.col(column).min().alias(f"min:{column}") for column in ranged],
+        *[pl.col(column).max().alias(f"max:{column}") for column in ranged],
+        *[
+            pl.col(column).quantile(quantile, interpolation="nearest").alias(f"quantile:{column}:{quantile}")
+            for column in ranged
+            for quantile in config.quantiles
+        ],
+    ]
+    if index_df is None:
+        stats += index_stats
+    row = df.lazy().select(stats).collect(streaming=streaming).row(0, named=True)
+    if index_df is not None:
+        row.update(index_df.lazy().select(index_stats).collect(streaming=streaming).row(0, named=True))
+
+    rows = row["rows"]
+    null_counts = {column: row[f"null_count:{column}"] for column in schema}
+    ranges = {column: (row[f"min:{column}"], row[f"max:{column}"]) for column in ranged}
+    quantiles = {
+        column: {f"p{quantile * 100:g}": row[f"quantile:{column}:{quantile}"] for quantile in config.quantiles}
+        for column in ranged
+    }
+    min_step = row["index_min_step"]
+    checks = [
+        CheckOutcome(
+            "has_no_nulls",
+            passed=sum(null_counts.values()) == 0,
+            metadata={"null_counts": {column: count for column, count in null_counts.items() if count}},
+        ),
+        CheckOutcome(
+            "index_is_monotonic",
+            passed=min_step is None or min_step.total_seconds() >= 0,
+            metadata={"min_step": str(min_step)},
+        ),
+        CheckOutcome(
+            "index_has_no_duplicates",
+            passed=row["index_unique"] == row["index_rows"],
+            metadata={"duplicates": row["index_rows"] - row["index_unique"]},
+        ),
+    ]
+    if config.ranges:
+        out_of_range = {
+            column: [str(low), str(high)]
+            for column, (low, high) in ranges.items()
+            if column in config.ranges
+            and low is not None
+            and not (config.ranges[column][0] <= low and high <= config.ranges[column][1])
+        }
+        checks.append(CheckOutcome("values_in_range", passed=not out_of_range, metadata={"out_of_range": out_of_range}))
+    if config.max_gap_seconds is not None:
+        checks.append(
+            CheckOutcome(
+                "index_has_no_gaps",
+                passed=row["index_gaps"] == 0,
+                warn_only=True,
+                metadata={"gaps": row["index_gaps"], "largest_step": str(row["index_max_step"])},
+            )
+        )
+    return DatasetProfile(rows=rows, null_counts=null_counts, ranges=ranges, quantiles=quantiles, checks=checks)
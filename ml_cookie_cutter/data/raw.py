@@ -1,11 +1,28 @@
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import yaml
 from pydantic import BaseModel
 
+from ml_cookie_cutter.data.cache import RawSnapshotCache
 from ml_cookie_cutter.data.constants import RAW_DATASET_DIRECTORY
 
+LFS_POINTER_PREFIX = b"version https://git-lfs.github.com/spec/"
+LFS_POINTER_MAX_BYTES = 1024
+
+
+def lfs_pointer_oid(path: Path) -> Optional[str]:
+    """The sha256 oid of a git-lfs pointer file, `None` if the file is not a pointer."""
+    if path.stat().st_size > LFS_POINTER_MAX_BYTES:
+        return None
+    content = path.read_bytes()
+    if not content.startswith(LFS_POINTER_PREFIX):
+        return None
+    for line in content.decode().splitlines():
+        if line.startswith("oid sha256:"):
+            return line.split(":", 1)[1]
+    return None
+
 
 class DatasetDirectories:
     def __init__(self, path: Path) -> None:
@@ -25,10 +42,30 @@ class DatasetDirectories:
         raise ValueError(f"Dataset {name} not found")
 
 
+class PartitionsConfig(BaseModel):
+    schedule: Literal["daily", "weekly", "monthly"] = "monthly"
+    start_date: str
+    end_date: Optional[str] = None
+
+
+class ProfileConfig(BaseModel):
+    index_column: str
+    # Inclusive (min, max) range of the values per column
+    ranges: Dict[str, Tuple[float, float]] = {}
+    # Largest step between consecutive index values that is not a gap
+    max_gap_seconds: Optional[int] = None
+    quantiles: List[float] = [0.01, 0.5, 0.99]
+
+
 class RawDatasetConfig(BaseModel):
     name: str
     asset: str
     polars_read_kwargs: Dict[str, Any] = {}
+    # Per-column polars dtype names applied when reading, e.g. Float32, Int16 or Categorical
+    dtypes: Dict[str, str] = {}
+    partitions: Optional[PartitionsConfig] = None
+    # Data quality profile of the cleaned dataset
+    profile: Optional[ProfileConfig] = None
 
 
 raw_dataset_directories = DatasetDirectories(RAW_DATASET_DIRECTORY)
@@ -51,10 +88,26 @@ class RawDataset:
             "format": self.asset_path.suffix,
         }
 
+    def data_version(self, cache: Optional[RawSnapshotCache] = None) -> str:
+        """Content fingerprint of the asset file, the sha256 of its content.
+
+        The git-lfs oid is used when the asset is an lfs pointer. Otherwise the hash is memoized on (size, mtime) by the
+        raw cache, so only a changed file is re-hashed (streaming). The lfs oid is the sha256 of the content, so the
+        version is the same whether or not the lfs object is checked out.
+        """
+        oid = lfs_pointer_oid(self.asset_path)
+        if oid is not None:
+            return oid
+        return (cache or RawSnapshotCache()).content_hash(self.asset_path)
+
     @property
     def pl_read_kwargs(self):
         return self.config.polars_read_kwargs
 
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        return self.config.dtypes
+
     @property
     def asset_path(self):
         return self.root_path / self.config.asset
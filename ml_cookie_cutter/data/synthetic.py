@@ -0,0 +1,77 @@
+"""Synthetic household power consumption readings in the format of the raw dataset.
+
+    python -m ml_cookie_cutter.data.synthetic household_power_consumption.txt --rows 10000000
+"""
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+DEFAULT_START = datetime(2006, 12, 16, 17, 24)
+DEFAULT_CHUNK_ROWS = 1_000_000
+# Share of readings missing in the raw dataset
+DEFAULT_NULL_FRACTION = 0.0125
+
+
+def household_power_chunk(start: datetime, rows: int, rng: np.random.Generator, null_fraction: float) -> pl.DataFrame:
+    """One reading per minute from `start`, with all measurements of a `null_fraction` of the readings missing."""
+    readings = pl.datetime_range(start, start + timedelta(minutes=rows - 1), "1m", eager=True)
+    active_power = rng.gamma(1.2, 0.9, rows).clip(0, 11)
+    df = pl.DataFrame(
+        {
+            "Date": readings.dt.date(),
+            "Time": readings.dt.time(),
+            "Global_active_power": active_power,
+            "Global_reactive_power": rng.gamma(1.5, 0.08, rows).clip(0, 1.4),
+            "Voltage": rng.normal(240.8, 3.2, rows).clip(223, 254),
+            "Global_intensity": active_power * 4.2 + rng.normal(0, 0.2, rows).clip(0),
+            "Sub_metering_1": rng.choice([0.0, 1.0, 2.0, 37.0], rows, p=[0.9, 0.05, 0.03, 0.02]),
+            "Sub_metering_2": rng.choice([0.0, 1.0, 2.0, 26.0], rows, p=[0.85, 0.08, 0.04, 0.03]),
+            "Sub_metering_3": rng.choice([0.0, 1.0, 17.0, 18.0], rows, p=[0.55, 0.05, 0.2, 0.2]),
+        }
+    )
+    missing = pl.Series(rng.random(rows) < null_fraction)
+    return df.with_columns(pl.when(missing).then(None).otherwise(pl.exclude("Date", "Time")).name.keep())
+
+
+def write_household_power(
+    path: Path,
+    rows: int,
+    start: datetime = DEFAULT_START,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    null_fraction: float = DEFAULT_NULL_FRACTION,
+    seed: int = 0,
+) -> Path:
+    """Write `rows` synthetic readings as `;` separated CSV with `?` for missing values.
+
+    Readings are generated and appended in chunks of `chunk_rows`, so memory use does not grow with `rows`.
+    """
+    rng = np.random.default_rng(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        for offset in range(0, rows, chunk_rows):
+            chunk = household_power_chunk(
+                start + timedelta(minutes=offset), min(chunk_rows, rows - offset), rng, null_fraction
+            )
+            chunk.write_csv(
+                f,
+                has_header=offset == 0,
+                separator=";",
+                date_format="%-d/%-m/%Y",
+                time_format="%H:%M:%S",
+                float_precision=3,
+                null_value="?",
+            )
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_household_power(args.path, args.rows, chunk_rows=args.chunk_rows, seed=args.seed)
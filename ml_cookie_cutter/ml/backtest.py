@@ -0,0 +1,99 @@
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from ml_cookie_cutter.data.constants import DATALAKE_DIRECTORY
+from ml_cookie_cutter.ml.datasets import load_training_arrays
+from ml_cookie_cutter.ml.experiment import (
+    ExperimentSpec,
+    Trial,
+    attached_arrays,
+    evaluate_trial,
+    grid_trials,
+    map_arrays,
+    run_on_mapped,
+)
+from ml_cookie_cutter.orchestration.timeseries_example import BacktestConfig, Fold, TrainTestConfig
+from ml_cookie_cutter.projects import Project
+
+METRICS = ["mae", "rmse"]
+
+
+@dataclass
+class FoldResult:
+    fold: int
+    train_start: int
+    train_stop: int
+    test_start: int
+    test_stop: int
+    mae: float
+    rmse: float
+    fit_seconds: float
+    predict_seconds: float
+
+
+def _run_fold(trial: Trial, fold: Fold, seed: int) -> FoldResult:
+    """Fit and evaluate the model of a trial on a fold of the mapped arrays of the process, runs in worker processes"""
+    arrays = attached_arrays()
+    return FoldResult(
+        fold=fold.index,
+        train_start=fold.train.start,
+        train_stop=fold.train.stop,
+        test_start=fold.test.start,
+        test_stop=fold.test.stop,
+        **evaluate_trial(trial, arrays[fold.train], arrays[fold.test], seed),
+    )
+
+
+def aggregate_folds(results: List[FoldResult]) -> Dict[str, float]:
+    """Mean, standard deviation and worst value of the metrics over the folds"""
+    aggregates: Dict[str, float] = {}
+    for metric in METRICS:
+        values = np.array([getattr(result, metric) for result in results])
+        aggregates[f"{metric}_mean"] = float(values.mean())
+        aggregates[f"{metric}_std"] = float(values.std())
+        aggregates[f"{metric}_max"] = float(values.max())
+    return aggregates
+
+
+def run_backtest(
+    project: Union[str, Project],
+    spec: ExperimentSpec,
+    config: Union[BacktestConfig, TrainTestConfig],
+    seed: int = 0,
+    workers: int = 1,
+    on_result: Optional[Callable[[FoldResult, int, int], None]] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+) -> List[FoldResult]:
+    """Fit and evaluate the model of an experiment on every fold of a backtest, on a pool of `workers` processes.
+
+    The dataset is loaded once, sorted by time, and saved to memory mapped files the workers map read-only. The train
+    and test rows of a fold are slices of the mapped arrays, so no fold copies the data. Folds with the most train rows
+    are submitted first, so the longest fits do not trail behind the others. Returns the results in fold order,
+    `on_result` is called with the result, number of finished folds and total number of folds after every fold.
+    """
+    trials = grid_trials(spec)
+    if len(trials) != 1:
+        raise ValueError(f"A backtest evaluates a single model configuration, the experiment has {len(trials)}")
+    (trial,) = trials
+    finished = 0
+    total = 0
+
+    def record(result: FoldResult):
+        nonlocal finished
+        finished += 1
+        if on_result is not None:
+            on_result(result, finished, total)
+
+    with tempfile.TemporaryDirectory() as directory:
+        arrays = load_training_arrays(project, spec.dataset, spec.features, spec.target, datalake=datalake)
+        folds = config.folds(len(arrays))
+        total = len(folds)
+        mapped = map_arrays(arrays, Path(directory))
+        del arrays
+        by_size = sorted(folds, key=lambda fold: fold.train.stop - fold.train.start, reverse=True)
+        results = run_on_mapped(mapped, _run_fold, [(trial, fold, seed) for fold in by_size], workers, record)
+    return sorted(results, key=lambda result: result.fold)
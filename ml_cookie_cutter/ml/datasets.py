@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import polars as pl
+
+from ml_cookie_cutter.data.catalog import DatasetCatalog
+from ml_cookie_cutter.data.constants import CATALOG_NAME, DATALAKE_DIRECTORY, DATASET_PREFIX
+from ml_cookie_cutter.projects import DATASET_SUFFIXES, Project
+
+if TYPE_CHECKING:
+    from ml_cookie_cutter.orchestration.timeseries_example import TrainTestConfig
+
+Batch = Tuple[np.ndarray, np.ndarray]
+
+
+def dataset_directory(
+    project: Union[str, Project], dataset: str, datalake: Path = DATALAKE_DIRECTORY, prefix: str = DATASET_PREFIX
+) -> Path:
+    """Datalake directory of a dataset asset of a project, holding one file per partition."""
+    return datalake / str(project) / prefix / dataset
+
+
+def dataset_paths(
+    project: Union[str, Project],
+    dataset: str,
+    catalog: Optional[DatasetCatalog] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+    prefix: str = DATASET_PREFIX,
+    suffix: Optional[str] = None,
+) -> List[Path]:
+    """One file per partition of a dataset in partition order, from the dataset catalog or the datalake layout.
+
+    Datasets are the assets under `prefix`, e.g. `FEATURES_PREFIX` for the feature tables. Files are looked up in the
+    datalake layout when the catalog has no entries for the dataset. A partition materialized in several formats (e.g.
+    by both the parquet and IPC io managers) resolves to its file with `suffix`, by default to its latest written file.
+    """
+    catalog = catalog or DatasetCatalog(datalake / CATALOG_NAME)
+    candidates = [Path(entry.path) for entry in catalog.datasets(asset_key_prefix=f"{project}/{prefix}/{dataset}")]
+    if not candidates:
+        directory = dataset_directory(project, dataset, datalake, prefix)
+        candidates = [path for path in directory.glob("*") if path.suffix in DATASET_SUFFIXES]
+    if suffix is not None:
+        candidates = [path for path in candidates if path.suffix == suffix]
+    partitions: Dict[Path, Path] = {}
+    for path in candidates:
+        partition = path.with_suffix("")
+        if partition not in partitions or path.stat().st_mtime_ns > partitions[partition].stat().st_mtime_ns:
+            partitions[partition] = path
+    if not partitions:
+        raise FileNotFoundError(f"Dataset {dataset} of project {project} is not materialized")
+    return [partitions[partition] for partition in sorted(partitions)]
+
+
+@dataclass
+class TrainingArrays:
+    """Features and target of a dataset as NumPy arrays, indexable and splittable without copies.
+
+    `features` is a C-contiguous float32 matrix of one row per sample, the layout scikit-learn estimators use without
+    converting it, and `target` a float64 vector, the dtype scikit-learn fits regression targets in, so the fitted
+    models match fitting the dataset's columns. Slices, splits and sequential batches are views of both.
+    """
+
+    features: np.ndarray
+    target: np.ndarray
+    feature_names: List[str]
+    target_name: str
+
+    def __len__(self) -> int:
+        return self.target.shape[0]
+
+    def __getitem__(self, index: slice) -> "TrainingArrays":
+        return TrainingArrays(self.features[index], self.target[index], self.feature_names, self.target_name)
+
+    def split(self, config: "TrainTestConfig") -> Tuple["TrainingArrays", "TrainingArrays"]:
+        """Ordered train and test splits, the first `config.train` share of the rows is the train split."""
+        train_index = int(config.train * len(self))
+        return self[:train_index], self[train_index:]
+
+    def batches(
+        self, batch_size: int, shuffle: bool = False, seed: Optional[int] = None, drop_last: bool = False
+    ) -> Iterator[Batch]:
+        """Fixed size minibatches of features and target, e.g. for `torch.from_numpy`.
+
+        Sequential batches are contiguous views. Shuffled batches gather their rows, so only a batch is copied at a
+        time. With `drop_last` a last batch smaller than `batch_size` is skipped.
+        """
+        rows = len(self)
+        order = np.random.default_rng(seed).permutation(rows) if shuffle else None
+        stop = rows - rows % batch_size if drop_last else rows
+        for start in range(0, stop, batch_size):
+            if order is None:
+                yield self.features[start : start + batch_size], self.target[start : start + batch_size]
+            else:
+                index = order[start : start + batch_size]
+                yield self.features[index], self.target[index]
+
+
+def to_training_arrays(df: pl.DataFrame, features: Sequence[str], target: str) -> TrainingArrays:
+    """Convert the float32 feature and target columns of a frame into `TrainingArrays`.
+
+    The feature columns are written once into a row major matrix, the target is a view of the frame's column when it
+    has no nulls and a single chunk.
+    """
+    return TrainingArrays(
+        features=df.select(features).to_numpy(order="c"),
+        target=df[target].to_numpy(),
+        feature_names=list(features),
+        target_name=target,
+    )
+
+
+def load_training_arrays(
+    project: Union[str, Project],
+    dataset: str,
+    features: Sequence[str],
+    target: str,
+    sort_by: Optional[str] = "Datetime",
+    catalog: Optional[DatasetCatalog] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+    suffix: Optional[str] = None,
+) -> TrainingArrays:
+    """Load the `features` and `target` of a materialized dataset as `TrainingArrays`, ordered by `sort_by`.
+
+    The arrays are allocated once and filled a partition at a time with only the requested columns, cast to float32
+    features and a float64 target in the scan, so besides the arrays only one partition is in memory. Partitions are
+    usually already in `sort_by` order; otherwise the rows are reordered once at the end. See `dataset_paths` for the
+    `suffix` of the files read.
+    """
+    paths = dataset_paths(project, dataset, catalog, datalake, suffix=suffix)
+    scans = [pl.scan_parquet(path) if path.suffix == ".parquet" else pl.scan_ipc(path) for path in paths]
+    counts = [scan.select(pl.count()).collect().item() for scan in scans]
+    arrays = TrainingArrays(
+        features=np.empty((sum(counts), len(features)), dtype=np.float32),
+        target=np.empty(sum(counts), dtype=np.float64),
+        feature_names=list(features),
+        target_name=target,
+    )
+    keys = []
+    offset = 0
+    for scan, count in zip(scans, counts):
+        df = scan.select(
+            pl.col(features).cast(pl.Float32), pl.col(target).cast(pl.Float64), *([sort_by] if sort_by else [])
+        ).collect()
+        arrays.features[offset : offset + count] = df.select(features).to_numpy()
+        arrays.target[offset : offset + count] = df[target].to_numpy()
+        if sort_by is not None:
+            keys.append(df[sort_by])
+        offset += count
+    if keys:
+        key = pl.concat(keys)
+        if not key.is_sorted():
+            order = key.arg_sort().to_numpy()
+            arrays = TrainingArrays(arrays.features[order], arrays.target[order], arrays.feature_names, target)
+    return arrays
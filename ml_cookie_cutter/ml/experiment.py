@@ -0,0 +1,302 @@
+import itertools
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional, Sequence, Tuple, TypeVar, Union
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+from threadpoolctl import threadpool_limits
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES
+from ml_cookie_cutter.data.constants import DATALAKE_DIRECTORY, MODEL_DIRECTORY
+from ml_cookie_cutter.ml.datasets import TrainingArrays, load_training_arrays
+from ml_cookie_cutter.ml.serving import save_model
+from ml_cookie_cutter.orchestration.timeseries_example import TrainTestConfig
+from ml_cookie_cutter.projects import Project
+
+MODELS: Dict[str, Callable[..., Any]] = {
+    "random_forest": RandomForestRegressor,
+    "extra_trees": ExtraTreesRegressor,
+    "hist_gradient_boosting": HistGradientBoostingRegressor,
+    "ridge": Ridge,
+}
+# Hyperparameters of a model unless the experiment sets them
+MODEL_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "random_forest": {"n_estimators": 20, "max_depth": 10},
+    "extra_trees": {"n_estimators": 20, "max_depth": 10},
+}
+DEFAULT_DATASET = "timeseries_average_per_day"
+DEFAULT_FEATURES = CALENDAR_FEATURES
+DEFAULT_TARGET = "Global_active_power"
+
+Search = Literal["grid", "random"]
+R = TypeVar("R")
+
+
+def parse_value(value: str) -> Any:
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return {"none": None, "true": True, "false": False}.get(value.lower(), value)
+
+
+@dataclass
+class ExperimentSpec:
+    dataset: str = DEFAULT_DATASET
+    features: List[str] = field(default_factory=lambda: list(DEFAULT_FEATURES))
+    target: str = DEFAULT_TARGET
+    models: List[str] = field(default_factory=lambda: ["random_forest"])
+    # Values of each swept hyperparameter
+    search_space: Dict[str, List[Any]] = field(default_factory=dict)
+
+
+def parse_overrides(overrides: Sequence[str]) -> ExperimentSpec:
+    """Parse `key=value` overrides of an experiment, e.g. `dataset=... model=random_forest max_depth=5,10`.
+
+    `dataset`, `features`, `target` and `model` select the data and models, any other key is a hyperparameter of
+    the models. Comma separated values of models and hyperparameters are swept.
+    """
+    values: Dict[str, str] = {}
+    for override in overrides:
+        key, separator, value = override.partition("=")
+        if not key or not separator:
+            raise ValueError(f"Override {override} is not of the form key=value")
+        values[key] = value
+    spec = ExperimentSpec()
+    spec.dataset = values.pop("dataset", spec.dataset)
+    spec.target = values.pop("target", spec.target)
+    if "features" in values:
+        spec.features = values.pop("features").split(",")
+    if "model" in values:
+        spec.models = values.pop("model").split(",")
+    spec.search_space = {key: [parse_value(value) for value in value.split(",")] for key, value in values.items()}
+
+    for model in spec.models:
+        if model not in MODELS:
+            raise ValueError(f"Model {model} not supported, use one of {list(MODELS)}")
+        unknown = set(spec.search_space) - set(MODELS[model]().get_params())
+        if unknown:
+            raise ValueError(f"Model {model} has no hyperparameters {sorted(unknown)}")
+    return spec
+
+
+@dataclass
+class Trial:
+    index: int
+    model: str
+    params: Dict[str, Any]
+
+
+def grid_trials(spec: ExperimentSpec) -> List[Trial]:
+    """Every combination of the models and swept hyperparameter values"""
+    trials: List[Trial] = []
+    for model in spec.models:
+        for values in itertools.product(*spec.search_space.values()):
+            params = {**MODEL_DEFAULTS.get(model, {}), **dict(zip(spec.search_space, values))}
+            trials.append(Trial(len(trials), model, params))
+    return trials
+
+
+def random_trials(spec: ExperimentSpec, n_trials: int, seed: int = 0) -> List[Trial]:
+    """`n_trials` distinct combinations drawn uniformly from the grid"""
+    grid = grid_trials(spec)
+    picks = np.random.default_rng(seed).choice(len(grid), size=min(n_trials, len(grid)), replace=False)
+    return [Trial(index, grid[pick].model, grid[pick].params) for index, pick in enumerate(sorted(picks))]
+
+
+@dataclass
+class MappedArrays:
+    """`TrainingArrays` saved as .npy files, which every process maps read-only instead of holding its own copy"""
+
+    features: Path
+    target: Path
+    feature_names: List[str]
+    target_name: str
+
+    def open(self) -> TrainingArrays:
+        return TrainingArrays(
+            np.load(self.features, mmap_mode="r"),
+            np.load(self.target, mmap_mode="r"),
+            self.feature_names,
+            self.target_name,
+        )
+
+
+def map_arrays(arrays: TrainingArrays, directory: Path) -> MappedArrays:
+    np.save(directory / "features.npy", arrays.features)
+    np.save(directory / "target.npy", arrays.target)
+    return MappedArrays(directory / "features.npy", directory / "target.npy", arrays.feature_names, arrays.target_name)
+
+
+@dataclass
+class TrialResult:
+    index: int
+    model: str
+    params: Dict[str, Any]
+    mae: float
+    rmse: float
+    fit_seconds: float
+    predict_seconds: float
+
+
+# Training arrays of a process, mapped once per worker by the pool initializer
+_worker_arrays: Optional[TrainingArrays] = None
+
+
+def _attach(mapped: MappedArrays, threads: Optional[int] = None):
+    global _worker_arrays
+    _worker_arrays = mapped.open()
+    if threads is not None:
+        # Models with native thread pools would otherwise start a thread per core in every worker
+        threadpool_limits(threads)
+
+
+def _detach():
+    global _worker_arrays
+    _worker_arrays = None
+
+
+def attached_arrays() -> TrainingArrays:
+    """The training arrays mapped by the process, in the tasks of `run_on_mapped`"""
+    assert _worker_arrays is not None, "Training arrays are not attached"
+    return _worker_arrays
+
+
+def fit_trial(trial: Trial, train: TrainingArrays, seed: int = 0) -> Any:
+    """Fit the model of a trial, seeded with `seed` unless the trial sets its `random_state`"""
+    model = MODELS[trial.model](**trial.params)
+    if "random_state" in model.get_params() and "random_state" not in trial.params:
+        model.set_params(random_state=seed)
+    return model.fit(train.features, train.target)
+
+
+def evaluate_trial(trial: Trial, train: TrainingArrays, test: TrainingArrays, seed: int = 0) -> Dict[str, float]:
+    """Fit the model of a trial on `train`, its MAE and RMSE on `test` and the seconds spent fitting and predicting"""
+    start = time.perf_counter()
+    model = fit_trial(trial, train, seed)
+    fitted = time.perf_counter()
+    prediction = model.predict(test.features)
+    predicted = time.perf_counter()
+    return {
+        "mae": float(mean_absolute_error(test.target, prediction)),
+        "rmse": float(np.sqrt(mean_squared_error(test.target, prediction))),
+        "fit_seconds": fitted - start,
+        "predict_seconds": predicted - fitted,
+    }
+
+
+def _run_trial(trial: Trial, split: TrainTestConfig, seed: int) -> TrialResult:
+    """Fit and evaluate the model of a trial on the mapped arrays of the process, runs in worker processes"""
+    train, test = attached_arrays().split(split)
+    return TrialResult(
+        index=trial.index, model=trial.model, params=trial.params, **evaluate_trial(trial, train, test, seed)
+    )
+
+
+def run_on_mapped(
+    mapped: MappedArrays,
+    function: Callable[..., R],
+    tasks: Sequence[Tuple[Any, ...]],
+    workers: int = 1,
+    on_result: Optional[Callable[[R], None]] = None,
+) -> List[R]:
+    """Call `function(*task)` for every task with the mapped arrays attached, on a pool of `workers` processes.
+
+    Every worker maps the arrays once, the operating system shares one copy of them between all workers. Results are
+    returned, and passed to `on_result`, in the order the tasks finish.
+    """
+    results: List[R] = []
+
+    def record(result: R):
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    if workers <= 1:
+        _attach(mapped)
+        try:
+            for task in tasks:
+                record(function(*task))
+        finally:
+            _detach()
+        return results
+
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    # Spawn, as forking a process with a running polars thread pool can deadlock
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_attach,
+        initargs=(mapped, threads),
+    ) as pool:
+        futures = [pool.submit(function, *task) for task in tasks]
+        for future in as_completed(futures):
+            record(future.result())
+    return results
+
+
+def run_experiment(
+    project: Union[str, Project],
+    spec: ExperimentSpec,
+    search: Search = "grid",
+    n_trials: Optional[int] = None,
+    seed: int = 0,
+    workers: int = 1,
+    split: Optional[TrainTestConfig] = None,
+    on_result: Optional[Callable[[TrialResult, int, int], None]] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+) -> List[TrialResult]:
+    """Fit and evaluate the trials of an experiment on a pool of `workers` processes, best (lowest MAE) first.
+
+    The dataset is loaded once and saved to memory mapped files, which the workers map read-only, so the operating
+    system shares one copy of the training arrays between all workers. A random search runs `n_trials` of the grid.
+    `on_result` is called with the result, number of finished trials and total number of trials after every trial.
+    """
+    split = split or TrainTestConfig()
+    if search == "random":
+        if n_trials is None:
+            raise ValueError("A random search needs a number of trials")
+        trials = random_trials(spec, n_trials, seed)
+    else:
+        trials = grid_trials(spec)
+    finished = 0
+
+    def record(result: TrialResult):
+        nonlocal finished
+        finished += 1
+        if on_result is not None:
+            on_result(result, finished, len(trials))
+
+    with tempfile.TemporaryDirectory() as directory:
+        arrays = load_training_arrays(project, spec.dataset, spec.features, spec.target, datalake=datalake)
+        mapped = map_arrays(arrays, Path(directory))
+        del arrays
+        tasks = [(trial, split, seed) for trial in trials]
+        results = run_on_mapped(mapped, _run_trial, tasks, workers, record)
+    return sorted(results, key=lambda result: result.mae)
+
+
+def save_trial_model(
+    project: Union[str, Project],
+    spec: ExperimentSpec,
+    result: TrialResult,
+    name: str,
+    seed: int = 0,
+    split: Optional[TrainTestConfig] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+    directory: Path = MODEL_DIRECTORY,
+) -> Path:
+    """Fit the model of a trial result again on the train split and save it for serving as `name`"""
+    arrays = load_training_arrays(project, spec.dataset, spec.features, spec.target, datalake=datalake)
+    train, _ = arrays.split(split or TrainTestConfig())
+    model = fit_trial(Trial(result.index, result.model, result.params), train, seed)
+    return save_model(model, spec.features, spec.target, name, directory)
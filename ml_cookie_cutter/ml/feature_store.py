@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import polars as pl
+
+from ml_cookie_cutter.data.catalog import DatasetCatalog
+from ml_cookie_cutter.data.constants import DATALAKE_DIRECTORY, FEATURES_PREFIX
+from ml_cookie_cutter.ml.datasets import dataset_paths
+from ml_cookie_cutter.projects import Project
+
+Timestamps = Union[Sequence[Any], np.ndarray, pl.Series]
+
+
+def sorted_by(df: pl.DataFrame, column: str) -> pl.DataFrame:
+    """The frame sorted by `column`, flagged as sorted without sorting it when it already is (e.g. read from a file)."""
+    if df[column].flags["SORTED_ASC"]:
+        return df
+    if df[column].is_sorted():
+        return df.with_columns(pl.col(column).set_sorted())
+    return df.sort(column)
+
+
+def feature_table(df: pl.DataFrame, features: Sequence[pl.Expr], on: str = "Datetime") -> pl.DataFrame:
+    """Feature table of the `features` of the timestamps of `df`, sorted by the timestamp column `on`."""
+    return sorted_by(df.select(on), on).with_columns(features)
+
+
+def point_in_time_join(
+    labels: pl.DataFrame, features: pl.DataFrame, on: str = "Datetime", tolerance: Optional[timedelta] = None
+) -> pl.DataFrame:
+    """Join the latest feature row at or before its timestamp to every label row, in the order of the timestamps.
+
+    A label only sees the features known at its time, never later ones, so training on the joined rows does not leak
+    the future. Feature rows older than `tolerance` are not joined, the feature columns are null for labels without a
+    feature row.
+    """
+    return sorted_by(labels, on).join_asof(sorted_by(features, on), on=on, strategy="backward", tolerance=tolerance)
+
+
+def to_microseconds(timestamps: Timestamps) -> np.ndarray:
+    """Timestamps, e.g. datetimes or ISO strings, as int64 microseconds since the epoch"""
+    if isinstance(timestamps, pl.Series):
+        timestamps = timestamps.to_numpy()
+    return np.asarray(timestamps, dtype="datetime64[us]").astype(np.int64)
+
+
+@dataclass
+class FeatureIndex:
+    """A feature table held in memory, indexed by its sorted timestamps for online lookups.
+
+    `timestamps` are the ascending int64 microseconds of the rows and `values` a C-contiguous float32 matrix of one
+    row of `features` per timestamp. Lookups binary search the timestamps, so they take logarithmic time and ranges
+    are views of the matrix.
+    """
+
+    timestamps: np.ndarray
+    values: np.ndarray
+    features: List[str]
+
+    def __len__(self) -> int:
+        return self.timestamps.shape[0]
+
+    def __contains__(self, feature: str) -> bool:
+        return feature in self.features
+
+    @classmethod
+    def from_frame(cls, df: pl.DataFrame, features: Optional[Sequence[str]] = None, on: str = "Datetime"):
+        features = list(features) if features is not None else [column for column in df.columns if column != on]
+        df = sorted_by(df, on)
+        return cls(
+            timestamps=to_microseconds(df[on]),
+            values=df.select(pl.col(features).cast(pl.Float32)).to_numpy(order="c"),
+            features=features,
+        )
+
+    def columns(self, features: Sequence[str]) -> List[int]:
+        missing = [feature for feature in features if feature not in self.features]
+        if missing:
+            raise ValueError(f"Features {missing} are not in the feature index")
+        return [self.features.index(feature) for feature in features]
+
+    def as_of(
+        self, timestamps: Timestamps, features: Optional[Sequence[str]] = None, tolerance: Optional[timedelta] = None
+    ) -> np.ndarray:
+        """Rows of the latest features at or before each timestamp, as `point_in_time_join` joins them.
+
+        Raises a `ValueError` for timestamps before the first row, or more than `tolerance` after their row.
+        """
+        query = to_microseconds(timestamps)
+        rows = np.searchsorted(self.timestamps, query, side="right") - 1
+        if (rows < 0).any():
+            raise ValueError("Timestamps before the first row of the feature index")
+        if tolerance is not None and (query - self.timestamps[rows] > tolerance // timedelta(microseconds=1)).any():
+            raise ValueError(f"Timestamps without features in the preceding {tolerance}")
+        if features is None:
+            return self.values[rows]
+        return self.values[np.ix_(rows, self.columns(features))]
+
+    def lookup(self, timestamp: Union[datetime, str], features: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Latest features at or before a single timestamp"""
+        return self.as_of([timestamp], features)[0]
+
+    def range(self, start: Union[datetime, str], end: Union[datetime, str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and features of the rows in the [start, end) window, views of the index"""
+        first, last = np.searchsorted(self.timestamps, to_microseconds([start, end]), side="left")
+        return self.timestamps[first:last], self.values[first:last]
+
+
+def load_feature_table(
+    project: Union[str, Project],
+    table: str,
+    features: Optional[Sequence[str]] = None,
+    window: Optional[Tuple[datetime, datetime]] = None,
+    on: str = "Datetime",
+    catalog: Optional[DatasetCatalog] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+) -> pl.DataFrame:
+    """The `features` of a materialized feature table in the [start, end) `window`, sorted by the timestamps `on`."""
+    paths = dataset_paths(project, table, catalog, datalake, prefix=FEATURES_PREFIX)
+    scans = [pl.scan_parquet(path) if path.suffix == ".parquet" else pl.scan_ipc(path) for path in paths]
+    plan = pl.concat(scans)
+    if features is not None:
+        plan = plan.select(on, *features)
+    if window is not None:
+        plan = plan.filter(pl.col(on).is_between(*window, closed="left"))
+    return sorted_by(plan.collect(), on)
+
+
+def load_feature_index(
+    project: Union[str, Project],
+    table: str,
+    features: Optional[Sequence[str]] = None,
+    window: Optional[Tuple[datetime, datetime]] = None,
+    on: str = "Datetime",
+    catalog: Optional[DatasetCatalog] = None,
+    datalake: Path = DATALAKE_DIRECTORY,
+) -> FeatureIndex:
+    """A `FeatureIndex` of a materialized feature table, see `load_feature_table`"""
+    df = load_feature_table(project, table, features, window, on, catalog, datalake)
+    return FeatureIndex.from_frame(df, features, on)
@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+# Trees times rows traversed at once, keeps the node arrays of a chunk in the CPU cache
+TRAVERSAL_CHUNK_NODES = 1 << 15
+
+
+def round_down_to_float32(values: np.ndarray) -> np.ndarray:
+    """The largest float32 at or below each value, for a float32 `x` `x <= value` equals `x <= rounded`"""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+@dataclass
+class CompiledForest:
+    """The trees of a fitted forest regressor packed into contiguous node arrays, predicted with vectorized NumPy.
+
+    Node `i` of the forest sends a row to node `children[2 * i]` when its `feature[i]` is at most `threshold[i]`
+    and to node `children[2 * i + 1]` otherwise. Node indices are global, tree `t` starts at node `roots[t]`. Leaves
+    are their own children, so rows that reached a leaf stay there while deeper branches are traversed. Thresholds are
+    rounded down to float32, which splits the float32 rows exactly as the float64 thresholds of scikit-learn do.
+    """
+
+    feature: np.ndarray
+    threshold: np.ndarray
+    children: np.ndarray
+    # Prediction of each node and output
+    value: np.ndarray
+    roots: np.ndarray
+    max_depth: int
+    n_features: int
+
+    @property
+    def n_trees(self) -> int:
+        return self.roots.shape[0]
+
+    @property
+    def n_outputs(self) -> int:
+        return self.value.shape[1]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Average prediction of the trees for the rows of `X`, bit identical to the forest it was compiled from.
+
+        Like scikit-learn the rows are cast to float32, and the tree predictions are summed in tree order and divided
+        by the number of trees, as the forest does with a single job. All trees are traversed level by level for a
+        chunk of rows at a time.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X must be rows of {self.n_features} features, got shape {X.shape}")
+        if np.isnan(X).any():
+            raise ValueError("X contains NaN")
+        predictions = np.zeros((X.shape[0], self.n_outputs), dtype=np.float64)
+        chunk_rows = max(TRAVERSAL_CHUNK_NODES // self.n_trees, 1)
+        for start in range(0, X.shape[0], chunk_rows):
+            stop = min(start + chunk_rows, X.shape[0])
+            leaf_values = self.value[self._leaves(X, start, stop)]
+            chunk = predictions[start:stop]
+            for tree in range(self.n_trees):
+                chunk += leaf_values[tree]
+        predictions /= self.n_trees
+        return predictions[:, 0] if self.n_outputs == 1 else predictions
+
+    def _leaves(self, X: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Leaf of the rows `start:stop` (columns) in every tree (rows)"""
+        shape = (self.n_trees, stop - start)
+        values = X.reshape(-1)
+        index_dtype = np.int32 if values.shape[0] <= np.iinfo(np.int32).max else np.int64
+        row_offsets = np.arange(start * self.n_features, stop * self.n_features, self.n_features, dtype=index_dtype)
+        nodes = np.empty(shape, dtype=np.int32)
+        nodes[:] = self.roots[:, np.newaxis]
+        index = np.empty(shape, dtype=index_dtype)
+        value = np.empty(shape, dtype=np.float32)
+        threshold = np.empty(shape, dtype=np.float32)
+        goes_right = np.empty(shape, dtype=bool)
+        # In place, so a level allocates nothing
+        for _ in range(self.max_depth):
+            np.take(self.feature, nodes, out=index)
+            index += row_offsets
+            np.take(values, index, out=value)
+            np.take(self.threshold, nodes, out=threshold)
+            np.greater(value, threshold, out=goes_right)
+            nodes *= 2
+            nodes += goes_right
+            np.take(self.children, nodes, out=nodes)
+        return nodes
+
+
+def compile_forest(forest: Union[RandomForestRegressor, ExtraTreesRegressor]) -> CompiledForest:
+    """Compile the trees of a fitted random forest or extra trees regressor into a `CompiledForest`"""
+    if not isinstance(forest, (RandomForestRegressor, ExtraTreesRegressor)):
+        raise TypeError(f"Only forest regressors can be compiled, got {type(forest).__name__}")
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    feature, children = [], []
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left < 0
+        # Leaves split on the first feature into themselves
+        feature.append(np.where(leaf, 0, tree.feature))
+        left = np.where(leaf, nodes, tree.children_left) + offset
+        right = np.where(leaf, nodes, tree.children_right) + offset
+        children.append(np.stack([left, right], axis=1).reshape(-1))
+    return CompiledForest(
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=round_down_to_float32(np.concatenate([tree.threshold for tree in trees])),
+        children=np.concatenate(children).astype(np.int32),
+        value=np.concatenate([tree.value[:, :, 0] for tree in trees]).astype(np.float64),
+        roots=offsets[:-1].astype(np.int32),
+        max_depth=max(tree.max_depth for tree in trees),
+        n_features=forest.n_features_in_,
+    )
@@ -0,0 +1,314 @@
+import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import polars as pl
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES, calendar_features
+from ml_cookie_cutter.data.constants import MODEL_DIRECTORY
+from ml_cookie_cutter.ml.feature_store import FeatureIndex
+from ml_cookie_cutter.ml.forest import compile_forest
+
+MODEL_SUFFIX = ".joblib"
+# Names of servable models, a name never leaves the model directory
+MODEL_NAME = re.compile(r"^[\w.-]+$")
+
+
+@dataclass
+class ServedModel:
+    """A fitted model with the features, in order, and the target it was trained on"""
+
+    model: Any
+    features: List[str]
+    target: str
+
+
+def model_path(name: str, directory: Path = MODEL_DIRECTORY) -> Path:
+    return directory / f"{name}{MODEL_SUFFIX}"
+
+
+def save_model(
+    model: Any,
+    features: Sequence[str],
+    target: str,
+    name: str,
+    directory: Path = MODEL_DIRECTORY,
+    compile_forests: bool = True,
+) -> Path:
+    """Save a fitted model for serving, uncompressed so its arrays can be memory mapped when loaded.
+
+    With `compile_forests` forest regressors are saved as their `CompiledForest`, which predicts identically, faster,
+    and keeps all its nodes in plain arrays that are mapped instead of copied into every serving process.
+    """
+    if compile_forests and isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        model = compile_forest(model)
+    path = model_path(name, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(ServedModel(model, list(features), target), path)
+    return path
+
+
+def available_models(directory: Path = MODEL_DIRECTORY) -> List[str]:
+    return sorted(path.stem for path in directory.glob(f"*{MODEL_SUFFIX}"))
+
+
+class ModelCache:
+    """Least recently used cache of at most `capacity` loaded models.
+
+    Models are loaded with `mmap_mode="r"`, so their NumPy arrays are read-only maps of the model file which the
+    operating system shares between the processes serving it. A model is loaded again when its file changed.
+    """
+
+    def __init__(self, directory: Path = MODEL_DIRECTORY, capacity: int = 4) -> None:
+        self.directory = directory
+        self.capacity = capacity
+        self.loads = 0
+        self._models: "OrderedDict[str, Tuple[int, ServedModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ServedModel:
+        """The loaded model `name`, a `FileNotFoundError` is raised for names of no model file in the directory."""
+        path = model_path(name, self.directory)
+        # Loading a joblib file can run arbitrary code, only files directly in the model directory are loaded
+        inside = MODEL_NAME.match(name) is not None and path.resolve().parent == self.directory.resolve()
+        if not inside or not path.exists():
+            raise FileNotFoundError(f"Model {name} not found in {self.directory}")
+        modified = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._models.get(name)
+            if cached is None or cached[0] != modified:
+                cached = (modified, joblib.load(path, mmap_mode="r"))
+                self.loads += 1
+            self._models[name] = cached
+            self._models.move_to_end(name)
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+            return cached[1]
+
+    def loaded(self) -> List[str]:
+        """Loaded models, least recently used first"""
+        with self._lock:
+            return list(self._models)
+
+
+@dataclass
+class _Request:
+    model: str
+    features: np.ndarray
+    future: "Future[np.ndarray]"
+
+
+class MicroBatcher:
+    """Predict concurrent requests to the same model in one vectorized `predict` call.
+
+    A background thread takes the first waiting request and collects further requests for up to `max_wait_seconds`
+    or until `max_batch_rows` rows are waiting. The rows of each model are stacked, predicted at once and the
+    predictions split back into the futures of the requests.
+    """
+
+    def __init__(self, cache: ModelCache, max_batch_rows: int = 4096, max_wait_seconds: float = 0.002) -> None:
+        self.cache = cache
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_seconds = max_wait_seconds
+        # Number of predict calls and the rows they predicted
+        self.batches = 0
+        self.rows = 0
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, model: str, features: np.ndarray) -> "Future[np.ndarray]":
+        future: "Future[np.ndarray]" = Future()
+        self._queue.put(_Request(model, features, future))
+        return future
+
+    def predict(self, model: str, features: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(model, features).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            rows = request.features.shape[0]
+            deadline = time.monotonic() + self.max_wait_seconds
+            stop = False
+            while rows < self.max_batch_rows:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                rows += request.features.shape[0]
+            self._predict(batch)
+            if stop:
+                return
+
+    def _predict(self, batch: List[_Request]):
+        per_model: Dict[str, List[_Request]] = {}
+        for request in batch:
+            per_model.setdefault(request.model, []).append(request)
+        for model, requests in per_model.items():
+            try:
+                served = self.cache.get(model)
+                features = np.concatenate([request.features for request in requests])
+                predictions = served.model.predict(features)
+            except Exception as error:
+                for request in requests:
+                    request.future.set_exception(error)
+                continue
+            self.batches += 1
+            self.rows += features.shape[0]
+            offsets = np.cumsum([request.features.shape[0] for request in requests])[:-1]
+            for request, prediction in zip(requests, np.split(predictions, offsets)):
+                request.future.set_result(prediction)
+
+
+def request_features(
+    served: ServedModel,
+    payload: Dict[str, Any],
+    feature_index: Optional[FeatureIndex] = None,
+    tolerance: timedelta = timedelta(0),
+) -> np.ndarray:
+    """Feature matrix of a prediction request in the feature order of the model.
+
+    A request holds either `features`, rows of feature values, or `datetimes`, ISO timestamps. The features of the
+    `feature_index`, e.g. of the feature table the daily averages dataset is joined with, are looked up in the latest
+    row at most `tolerance` before each timestamp (by default the row of the timestamp), a `ValueError` is raised for
+    timestamps without one. Calendar features the index does not hold are derived from the timestamps.
+    """
+    if "features" in payload:
+        features = np.asarray(payload["features"], dtype=np.float32)
+        if features.ndim != 2 or features.shape[1] != len(served.features):
+            raise ValueError(f"Features must be rows of {len(served.features)} values: {served.features}")
+        return features
+    if "datetimes" in payload:
+        looked_up = [feature for feature in served.features if feature_index is not None and feature in feature_index]
+        missing = [feature for feature in served.features if feature not in looked_up + CALENDAR_FEATURES]
+        if missing:
+            raise ValueError(f"Features {missing} can not be derived from datetimes")
+        timestamps = pl.Series("Datetime", payload["datetimes"], dtype=pl.Utf8).str.to_datetime(time_unit="us")
+        df = pl.DataFrame(timestamps).with_columns(calendar_features("Datetime"))
+        if feature_index is not None and looked_up:
+            df = df.with_columns(pl.DataFrame(feature_index.as_of(timestamps, looked_up, tolerance), schema=looked_up))
+        return df.select(pl.col(served.features).cast(pl.Float32)).to_numpy(order="c")
+    raise ValueError("A prediction request needs features or datetimes")
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """`POST /predict/<model>` with a JSON request, `GET /models` and `GET /health`"""
+
+    server: "PredictionServer"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(HTTPStatus.OK, {"status": "ok"})
+        elif self.path == "/models":
+            models = {"available": available_models(self.server.cache.directory), "loaded": self.server.cache.loaded()}
+            self._respond(HTTPStatus.OK, models)
+        else:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        prefix, _, model = self.path.partition("/predict/")
+        if prefix or not model:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            served = self.server.cache.get(model)
+            features = request_features(served, payload, self.server.feature_index, self.server.feature_tolerance)
+            if self.server.batcher is not None:
+                predictions = self.server.batcher.predict(model, features)
+            else:
+                predictions = served.model.predict(features)
+        except FileNotFoundError as error:
+            self._respond(HTTPStatus.NOT_FOUND, {"error": str(error)})
+        except (ValueError, TypeError, AttributeError, pl.ComputeError) as error:
+            self._respond(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        else:
+            self._respond(HTTPStatus.OK, {"model": model, "predictions": predictions.tolist()})
+
+    def _respond(self, status: HTTPStatus, body: Dict[str, Any]):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: Any):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Listen backlog, with the default of 5 bursts of concurrent clients have their connections retried after a second
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        cache: ModelCache,
+        batcher: Optional[MicroBatcher] = None,
+        feature_index: Optional[FeatureIndex] = None,
+        feature_tolerance: timedelta = timedelta(0),
+        verbose: bool = False,
+    ) -> None:
+        super().__init__(address, PredictionHandler)
+        self.cache = cache
+        self.batcher = batcher
+        self.feature_index = feature_index
+        self.feature_tolerance = feature_tolerance
+        self.verbose = verbose
+
+    def server_close(self):
+        super().server_close()
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+def prediction_server(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    directory: Path = MODEL_DIRECTORY,
+    cache_size: int = 4,
+    batching: bool = False,
+    max_batch_rows: int = 4096,
+    max_wait_seconds: float = 0.002,
+    feature_index: Optional[FeatureIndex] = None,
+    feature_tolerance: timedelta = timedelta(0),
+    verbose: bool = False,
+) -> PredictionServer:
+    """A prediction server on `host`:`port`, serving the models in `directory`, run it with `serve_forever`.
+
+    Features of the models that can not be derived from the datetimes of a request are looked up in the
+    `feature_index`, see `request_features`. Every request is predicted by its handler thread, with `batching`
+    concurrent requests are micro-batched instead, see `MicroBatcher`. Batching only pays off when the per call
+    overhead of `predict` outweighs the wait for concurrent requests, measure it with `benchmarks/bench_serving.py`.
+    """
+    cache = ModelCache(directory, cache_size)
+    batcher = MicroBatcher(cache, max_batch_rows, max_wait_seconds) if batching else None
+    return PredictionServer((host, port), cache, batcher, feature_index, feature_tolerance, verbose)
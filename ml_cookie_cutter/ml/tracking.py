@@ -0,0 +1,353 @@
+import atexit
+import json
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from ml_cookie_cutter.data.constants import TRACKING_DIRECTORY
+
+TRACKING_DATABASE = "tracking.sqlite"
+# Most metrics and params of a single MLflow log_batch request
+MLFLOW_BATCH_METRICS = 1000
+MLFLOW_BATCH_PARAMS = 100
+
+
+class Event(NamedTuple):
+    """A logged run start, param, metric, artifact or run finish, queued for the writer thread"""
+
+    kind: str
+    run_id: str
+    key: str
+    value: Any
+    step: Optional[int]
+    timestamp: float
+
+
+@dataclass
+class RunEntry:
+    run_id: str
+    name: str
+    project: Optional[str]
+    status: str
+    started_at: float
+    finished_at: Optional[float] = None
+
+
+class TrackingStore:
+    """Local store of tracked runs: params, metrics and artifact paths in SQLite, artifact copies in `directory`.
+
+    The writer thread of a `Tracker` writes every batch of events in a single transaction.
+    """
+
+    def __init__(self, directory: Path = TRACKING_DIRECTORY) -> None:
+        self.directory = Path(directory)
+        self.path = self.directory / TRACKING_DATABASE
+
+    def _connect(self) -> sqlite3.Connection:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                project TEXT,
+                status TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS params (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (run_id, key)
+            );
+            CREATE TABLE IF NOT EXISTS metrics (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                step INTEGER NOT NULL,
+                value REAL NOT NULL,
+                timestamp REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS metrics_run_key ON metrics (run_id, key, step);
+            CREATE TABLE IF NOT EXISTS artifacts (
+                run_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (run_id, name)
+            );
+            """
+        )
+        return connection
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def artifact_directory(self, run_id: str) -> Path:
+        return self.directory / run_id
+
+    def write(self, events: List[Event]):
+        """Write a batch of events, copying logged artifact files into the artifact directory of their run.
+
+        The events are written in one transaction. The start of a run that already exists is ignored, so a reused run
+        id logs into the existing run rather than failing the batch. An artifact that can not be copied is skipped, and
+        its error raised once the other events are written.
+        """
+        runs, finished, params, metrics, artifacts = [], [], [], [], []
+        error: Optional[OSError] = None
+        for event in events:
+            if event.kind == "start":
+                runs.append((event.run_id, event.key, event.value, "running", event.timestamp))
+            elif event.kind == "finish":
+                finished.append((event.value, event.timestamp, event.run_id))
+            elif event.kind == "param":
+                params.append((event.run_id, event.key, json.dumps(event.value, default=str)))
+            elif event.kind == "metric":
+                metrics.append((event.run_id, event.key, event.step, event.value, event.timestamp))
+            elif event.kind == "artifact":
+                destination = self.artifact_directory(event.run_id) / event.key
+                try:
+                    destination.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(event.value, destination)
+                except OSError as copy_error:
+                    error = error or copy_error
+                    continue
+                artifacts.append((event.run_id, event.key, str(destination)))
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO runs (run_id, name, project, status, started_at) VALUES (?, ?, ?, ?, ?)", runs
+            )
+            connection.executemany("INSERT OR REPLACE INTO params VALUES (?, ?, ?)", params)
+            connection.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?, ?)", metrics)
+            connection.executemany("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?)", artifacts)
+            connection.executemany("UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?", finished)
+        if error is not None:
+            raise error
+
+    def runs(self, project: Optional[str] = None) -> List[RunEntry]:
+        """Runs, most recently started first, optionally only those of a project"""
+        if not self.exists():
+            return []
+        query = "SELECT * FROM runs"
+        parameters: List[str] = []
+        if project is not None:
+            query += " WHERE project = ?"
+            parameters = [project]
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query + " ORDER BY started_at DESC", parameters).fetchall()
+        return [RunEntry(*row) for row in rows]
+
+    def run(self, run_id: str) -> RunEntry:
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT * FROM runs WHERE run_id = ?", [run_id]).fetchone()
+        if row is None:
+            raise KeyError(f"Run {run_id} not found in {self.path}")
+        return RunEntry(*row)
+
+    def params(self, run_id: str) -> Dict[str, Any]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT key, value FROM params WHERE run_id = ? ORDER BY key", [run_id])
+            return {key: json.loads(value) for key, value in rows}
+
+    def metrics(self, run_id: str) -> Dict[str, List[Tuple[int, float, float]]]:
+        """Steps, values and timestamps of every metric of a run, in step order"""
+        query = "SELECT key, step, value, timestamp FROM metrics WHERE run_id = ? ORDER BY key, step, rowid"
+        metrics: Dict[str, List[Tuple[int, float, float]]] = {}
+        with closing(self._connect()) as connection:
+            for key, step, value, timestamp in connection.execute(query, [run_id]):
+                metrics.setdefault(key, []).append((step, value, timestamp))
+        return metrics
+
+    def artifacts(self, run_id: str) -> Dict[str, Path]:
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT name, path FROM artifacts WHERE run_id = ? ORDER BY name", [run_id])
+            return {name: Path(path) for name, path in rows}
+
+
+class Run:
+    """A tracked run, logging returns immediately and the events are written by the writer thread of its tracker"""
+
+    def __init__(self, tracker: "Tracker", run_id: str) -> None:
+        self.tracker = tracker
+        self.run_id = run_id
+        # Next step of the metrics logged without one
+        self._steps: Dict[str, int] = {}
+
+    def log_param(self, key: str, value: Any):
+        self.tracker.put(Event("param", self.run_id, key, value, None, time.time()))
+
+    def log_params(self, params: Mapping[str, Any]):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def log_metric(self, key: str, value: float, step: Optional[int] = None):
+        """Log a value of a metric at `step`, by default the step after the previously logged one"""
+        if step is None:
+            step = self._steps.get(key, 0)
+        self._steps[key] = step + 1
+        self.tracker.put(Event("metric", self.run_id, key, float(value), step, time.time()))
+
+    def log_metrics(self, metrics: Mapping[str, float], step: Optional[int] = None):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step)
+
+    def log_artifact(self, path: Union[str, Path], name: Optional[str] = None):
+        """Log a file, copied into the store by the writer thread, so it must not change until the next flush"""
+        path = Path(path)
+        self.tracker.put(Event("artifact", self.run_id, name or path.name, path, None, time.time()))
+
+    def finish(self, status: str = "finished"):
+        self.tracker.put(Event("finish", self.run_id, "", status, None, time.time()))
+
+    def __enter__(self) -> "Run":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.finish("failed" if exc_type is not None else "finished")
+
+
+class Tracker:
+    """Track runs into a local `TrackingStore` without blocking the caller on I/O.
+
+    Logged events are put on an unbounded in-memory queue. A background thread takes the first waiting event and
+    collects further events for up to `flush_interval` seconds or until `max_batch` events are waiting, then writes the
+    batch to the store at once. An error of the writer is raised by the next `flush` or `close`. Waiting events are
+    written when the tracker is closed, at the latest when the interpreter exits.
+    """
+
+    def __init__(
+        self, directory: Path = TRACKING_DIRECTORY, flush_interval: float = 1.0, max_batch: int = 10_000
+    ) -> None:
+        self.store = TrackingStore(directory)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # Number of written batches and the events they held
+        self.batches = 0
+        self.events = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._queue: "queue.SimpleQueue[Union[Event, threading.Event, None]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="tracking-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def start_run(self, name: str, project: Optional[str] = None, run_id: Optional[str] = None) -> Run:
+        run_id = run_id or uuid.uuid4().hex
+        self.put(Event("start", run_id, name, project, None, time.time()))
+        return Run(self, run_id)
+
+    def put(self, event: Event):
+        if self._closed:
+            raise RuntimeError("The tracker is closed")
+        self._queue.put(event)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until the events logged so far are written"""
+        if not self._closed:
+            written = threading.Event()
+            self._queue.put(written)
+            if not written.wait(timeout):
+                raise TimeoutError(f"Tracking events not written within {timeout} seconds")
+        self._raise_error()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            atexit.unregister(self.close)
+        self._raise_error()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch: List[Event] = []
+            flushed: List[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    # Write what is waiting right away
+                    flushed.append(item)
+                    deadline = 0
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.store.write(batch)
+                    self.batches += 1
+                    self.events += len(batch)
+                except Exception as error:
+                    self._error = self._error or error
+            for written in flushed:
+                written.set()
+            if stop:
+                return
+
+
+def forward_to_mlflow(store: TrackingStore, run_id: str, tracking_uri: Optional[str] = None) -> str:
+    """Replay a stored run into MLflow, as a run of the experiment named like its project. Returns the MLflow run id"""
+    import mlflow
+    from mlflow.entities import Metric, Param
+    from mlflow.tracking import MlflowClient
+
+    entry = store.run(run_id)
+    if tracking_uri is not None:
+        mlflow.set_tracking_uri(tracking_uri)
+    mlflow.set_experiment(entry.project or "Default")
+    client = MlflowClient()
+    with mlflow.start_run(run_name=entry.name) as active:
+        mlflow_run_id = active.info.run_id
+        params = [
+            Param(key, value if isinstance(value, str) else json.dumps(value))
+            for key, value in store.params(run_id).items()
+        ]
+        metrics = [
+            Metric(key, value, int(timestamp * 1000), step)
+            for key, values in store.metrics(run_id).items()
+            for step, value, timestamp in values
+        ]
+        for start in range(0, len(params), MLFLOW_BATCH_PARAMS):
+            client.log_batch(mlflow_run_id, params=params[start : start + MLFLOW_BATCH_PARAMS])
+        for start in range(0, len(metrics), MLFLOW_BATCH_METRICS):
+            client.log_batch(mlflow_run_id, metrics=metrics[start : start + MLFLOW_BATCH_METRICS])
+        for path in store.artifacts(run_id).values():
+            mlflow.log_artifact(str(path))
+    return mlflow_run_id
+
+
+def forward_to_neptune(store: TrackingStore, run_id: str, project: str, api_token: Optional[str] = None) -> Any:
+    """Replay a stored run into a Neptune run of `project`, the Neptune run is returned stopped"""
+    import neptune
+    from neptune.utils import stringify_unsupported
+
+    entry = store.run(run_id)
+    run = neptune.init_run(project=project, api_token=api_token, name=entry.name)
+    run["parameters"] = stringify_unsupported(store.params(run_id))
+    for key, values in store.metrics(run_id).items():
+        steps, series, timestamps = zip(*values)
+        run[f"metrics/{key}"].extend(list(series), steps=list(steps), timestamps=list(timestamps))
+    for name, path in store.artifacts(run_id).items():
+        run[f"artifacts/{name}"].upload(str(path))
+    run.stop()
+    return run
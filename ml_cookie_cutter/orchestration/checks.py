@@ -0,0 +1,25 @@
+from typing import List, Optional
+
+from dagster import AssetCheckResult, AssetCheckSeverity, AssetCheckSpec, AssetKey
+
+from ml_cookie_cutter.data.profiling import DatasetProfile, profile_check_names
+from ml_cookie_cutter.data.raw import ProfileConfig
+
+
+def profile_check_specs(asset_key: AssetKey, config: Optional[ProfileConfig]) -> List[AssetCheckSpec]:
+    """Asset check specs of the checks a data quality profile evaluates, none without a profile config."""
+    if config is None:
+        return []
+    return [AssetCheckSpec(name=name, asset=asset_key) for name in profile_check_names(config)]
+
+
+def profile_check_results(profile: DatasetProfile) -> List[AssetCheckResult]:
+    return [
+        AssetCheckResult(
+            check_name=check.name,
+            passed=check.passed,
+            metadata=check.metadata,
+            severity=AssetCheckSeverity.WARN if check.warn_only else AssetCheckSeverity.ERROR,
+        )
+        for check in profile.checks
+    ]
@@ -1,11 +1,38 @@
+import os
+
+from dagster import Definitions, load_asset_checks_from_modules, load_assets_from_modules
 from dagster_duckdb import DuckDBResource
-from dagster_duckdb_polars import DuckDBPolarsIOManager
 
-from ml_cookie_cutter.data.constants import DATALAKE_DIRECTORY
-from ml_cookie_cutter.orchestration.io_managers import LocalPolarsParquetIOManager
+from ml_cookie_cutter.data.constants import DAGSTER_HOME, DATALAKE_DIRECTORY, DUCKDB_PATH, RAW_DATASET_DIRECTORY
+from ml_cookie_cutter.orchestration import timeseries_example
+from ml_cookie_cutter.orchestration.duckdb_io_managers import DuckDBPolarsArrowIOManager
+from ml_cookie_cutter.orchestration.io_managers import (
+    LocalPolarsIPCIOManager,
+    LocalPolarsParquetIOManager,
+    SourceAssetPolarsIOManager,
+)
+
+all_assets = load_assets_from_modules([timeseries_example])
+all_asset_checks = load_asset_checks_from_modules([timeseries_example])
 
-duckdb_polars_io_manager = DuckDBPolarsIOManager(database=str(DATALAKE_DIRECTORY / "duckdb.db"))
+duckdb_polars_io_manager = DuckDBPolarsArrowIOManager(database=str(DUCKDB_PATH))
 parquet_io_manager = LocalPolarsParquetIOManager(base_path=str(DATALAKE_DIRECTORY))
+ipc_io_manager = LocalPolarsIPCIOManager(base_path=str(DATALAKE_DIRECTORY))
 duckdb_resource = DuckDBResource(
-    database=str(DATALAKE_DIRECTORY / "duckdb.db"),  # required
+    database=str(DUCKDB_PATH),  # required
+)
+
+os.environ["DAGSTER_HOME"] = str(DAGSTER_HOME)
+os.environ["RAW_DATA_VAULT"] = str(RAW_DATASET_DIRECTORY)
+
+defs = Definitions(
+    assets=all_assets,
+    asset_checks=all_asset_checks,
+    resources={
+        "source_asset_polars_io_manager": SourceAssetPolarsIOManager(use_raw_cache=True),
+        "duckdb": duckdb_resource,
+        "duckdb_polars_io_manager": duckdb_polars_io_manager,
+        "local_polars_parquet_io_manager": parquet_io_manager,
+        "local_polars_ipc_io_manager": ipc_io_manager,
+    },
 )
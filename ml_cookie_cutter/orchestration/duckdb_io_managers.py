@@ -0,0 +1,97 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+import duckdb
+import polars as pl
+from dagster import InitResourceContext, InputContext, MetadataValue, OutputContext, TableColumn, TableSchema
+from dagster._core.storage.db_io_manager import DbIOManager, DbTypeHandler, TableSlice
+from dagster_duckdb.io_manager import DuckDbClient
+from dagster_duckdb_polars import DuckDBPolarsIOManager
+from dagster_duckdb_polars.duckdb_polars_type_handler import DuckDBPolarsTypeHandler
+from pydantic import PrivateAttr
+
+
+class DuckDBPolarsArrowTypeHandler(DuckDBPolarsTypeHandler):
+    """Moves polars frames into DuckDB by registering them as Arrow tables, without an intermediate copy."""
+
+    def handle_output(
+        self, context: OutputContext, table_slice: TableSlice, obj: Union[pl.DataFrame, pl.LazyFrame], connection
+    ):
+        if isinstance(obj, pl.LazyFrame):
+            obj = obj.collect()
+        table = f"{table_slice.schema}.{table_slice.table}"
+        connection.register("polars_arrow_view", obj.to_arrow())
+        try:
+            connection.execute(f"create table if not exists {table} as select * from polars_arrow_view;")
+            if not connection.fetchall():
+                connection.execute(f"insert into {table} select * from polars_arrow_view")
+        finally:
+            connection.unregister("polars_arrow_view")
+
+        context.add_output_metadata(
+            {
+                "row_count": obj.height,
+                "dataframe_columns": MetadataValue.table_schema(
+                    TableSchema(columns=[TableColumn(name=name, type=str(dtype)) for name, dtype in obj.schema.items()])
+                ),
+            }
+        )
+
+    def load_input(self, context: InputContext, table_slice: TableSlice, connection) -> pl.DataFrame:
+        if table_slice.partition_dimensions and len(context.asset_partition_keys) == 0:
+            return pl.DataFrame()
+        return pl.from_arrow(connection.execute(DuckDbClient.get_select_statement(table_slice)).arrow())  # type: ignore
+
+    @property
+    def supported_types(self):
+        return [pl.DataFrame, pl.LazyFrame]
+
+
+class PooledDuckDbClient(DuckDbClient):
+    """DuckDB client handing out cursors of one shared connection instead of connecting per asset."""
+
+    def __init__(self, database: str, connection_config: Dict[str, Any]) -> None:
+        self.database = database
+        self.connection_config = connection_config
+        self._connection: Optional[duckdb.DuckDBPyConnection] = None
+
+    @contextmanager
+    def connect(self, context, _) -> Iterator[duckdb.DuckDBPyConnection]:
+        if self._connection is None:
+            self._connection = duckdb.connect(database=self.database, config=self.connection_config)
+        # Cursors share the database instance, but are safe to use from separate threads
+        cursor = self._connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class DuckDBPolarsArrowIOManager(DuckDBPolarsIOManager):
+    """DuckDB IO manager for polars frames using one pooled connection per run and Arrow registration."""
+
+    _client: Optional[PooledDuckDbClient] = PrivateAttr(default=None)
+
+    @staticmethod
+    def type_handlers() -> Sequence[DbTypeHandler]:
+        return [DuckDBPolarsArrowTypeHandler()]
+
+    def create_io_manager(self, context) -> DbIOManager:
+        self._client = PooledDuckDbClient(self.database, self.connection_config)
+        return DbIOManager(
+            db_client=self._client,
+            database=self.database,
+            schema=self.schema_,
+            type_handlers=self.type_handlers(),
+            default_load_type=self.default_load_type(),
+            io_manager_name="DuckDBPolarsArrowIOManager",
+        )
+
+    def teardown_after_execution(self, context: InitResourceContext) -> None:
+        if self._client is not None:
+            self._client.close()
@@ -0,0 +1,211 @@
+import functools
+import inspect
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import polars as pl
+from dagster import ExecuteInProcessResult, Output
+
+# Phases of a step, in execution order
+PHASES = ["load_input", "compute", "handle_output"]
+# Metadata key of the rows and bytes of each phase
+PHASE_ROWS = {"load_input": "rows_in", "compute": "rows_out"}
+PHASE_BYTES = {"load_input": "bytes_read", "handle_output": "bytes_written"}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process, `ru_maxrss` is in bytes on macOS and in KiB elsewhere."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class Measurement:
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    # Growth of the process peak RSS, memory freed before the peak is not counted
+    peak_rss_delta_mb: float = 0.0
+
+    def __add__(self, other: "Measurement") -> "Measurement":
+        return Measurement(
+            self.wall_seconds + other.wall_seconds,
+            self.cpu_seconds + other.cpu_seconds,
+            self.peak_rss_delta_mb + other.peak_rss_delta_mb,
+        )
+
+    def metadata(self, phase: str) -> Dict[str, float]:
+        return {
+            f"{phase}_wall_seconds": round(self.wall_seconds, 6),
+            f"{phase}_cpu_seconds": round(self.cpu_seconds, 6),
+            f"{phase}_peak_rss_delta_mb": round(self.peak_rss_delta_mb, 3),
+        }
+
+
+@contextmanager
+def measure() -> Iterator[Measurement]:
+    """Measure the wall time, CPU time and peak RSS growth of the block into the yielded measurement."""
+    measurement = Measurement()
+    wall, cpu, rss = time.perf_counter(), time.process_time(), peak_rss_mb()
+    try:
+        yield measurement
+    finally:
+        measurement.wall_seconds = time.perf_counter() - wall
+        measurement.cpu_seconds = time.process_time() - cpu
+        measurement.peak_rss_delta_mb = max(peak_rss_mb() - rss, 0.0)
+
+
+def frame_rows(obj: Any) -> Optional[int]:
+    """Rows of an eager frame, a lazy frame has no row count until collected."""
+    return obj.height if isinstance(obj, pl.DataFrame) else None
+
+
+# Inputs loaded since the last instrumented compute started. A step loads its inputs right before its compute in the
+# same process, so the compute attaches them to its outputs.
+_pending_loads: List[Tuple[Measurement, int]] = []
+
+
+def record_load(measurement: Measurement, bytes_read: int):
+    """Record an input load of an io manager, attached to the outputs of the next instrumented compute."""
+    _pending_loads.append((measurement, bytes_read))
+
+
+def consume_loads() -> Dict[str, float]:
+    if not _pending_loads:
+        return {}
+    total, bytes_read = Measurement(), 0
+    for measurement, size in _pending_loads:
+        total, bytes_read = total + measurement, bytes_read + size
+    _pending_loads.clear()
+    return {**total.metadata("load_input"), "bytes_read": bytes_read}
+
+
+def _with_metadata(result: Any, metadata: Dict[str, Any]) -> Output:
+    output = result if isinstance(result, Output) else Output(result)
+    rows_out = frame_rows(output.value)
+    return Output(
+        output.value,
+        output_name=output.output_name,
+        metadata={**output.metadata, **metadata, **({"rows_out": rows_out} if rows_out is not None else {})},
+        data_version=output.data_version,
+    )
+
+
+def instrumented(fn: Callable) -> Callable:
+    """Attach the performance of an asset compute function to the metadata of its outputs.
+
+    Every output gets the wall time, CPU time and peak RSS growth of the compute that produced it and its rows. The
+    first output also gets the loads of the step inputs by the instrumented io managers and the rows of the eager frame
+    inputs. For generators only the time spent in the generator counts, not the handling of outputs between yields.
+    Apply it below the asset decorator.
+    """
+
+    def inputs_metadata(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        rows = [frame_rows(value) for value in [*args, *kwargs.values()]]
+        rows_in = [count for count in rows if count is not None]
+        return {**consume_loads(), **({"rows_in": sum(rows_in)} if rows_in else {})}
+
+    if inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def generator_wrapper(*args, **kwargs):
+            metadata = inputs_metadata(args, kwargs)
+            results = fn(*args, **kwargs)
+            while True:
+                with measure() as measurement:
+                    result = next(results, StopIteration)
+                if result is StopIteration:
+                    return
+                if isinstance(result, Output):
+                    result = _with_metadata(result, {**metadata, **measurement.metadata("compute")})
+                    metadata = {}
+                yield result
+
+        return generator_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        metadata = inputs_metadata(args, kwargs)
+        with measure() as measurement:
+            result = fn(*args, **kwargs)
+        return _with_metadata(result, {**metadata, **measurement.metadata("compute")})
+
+    return wrapper
+
+
+@dataclass
+class AssetMeasurement:
+    asset: str
+    partition_key: Optional[str]
+    phase: str
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_delta_mb: float
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+
+
+def result_measurements(result: ExecuteInProcessResult) -> List[AssetMeasurement]:
+    """Measurements of the instrumented phases recorded in the materializations of a run."""
+    measurements = []
+    for event in result.get_asset_materialization_events():
+        materialization = event.step_materialization_data.materialization
+        metadata = {key: value.value for key, value in materialization.metadata.items()}
+        for phase in PHASES:
+            if f"{phase}_wall_seconds" not in metadata:
+                continue
+            measurements.append(
+                AssetMeasurement(
+                    asset=materialization.asset_key.to_user_string(),
+                    partition_key=materialization.partition,
+                    phase=phase,
+                    wall_seconds=metadata[f"{phase}_wall_seconds"],
+                    cpu_seconds=metadata[f"{phase}_cpu_seconds"],
+                    peak_rss_delta_mb=metadata[f"{phase}_peak_rss_delta_mb"],
+                    rows=metadata.get(PHASE_ROWS.get(phase, "")),
+                    bytes=metadata.get(PHASE_BYTES.get(phase, "")),
+                )
+            )
+    return measurements
+
+
+@dataclass
+class HotPath:
+    asset: str
+    phase: str
+    runs: int
+    wall_seconds: float
+    cpu_seconds: float
+    # Largest peak RSS growth of a single run
+    peak_rss_delta_mb: float
+    rows: Optional[int]
+    bytes: Optional[int]
+
+
+def rank_hot_paths(measurements: List[AssetMeasurement]) -> List[HotPath]:
+    """Measurements summed per asset and phase, slowest first."""
+    grouped: Dict[Tuple[str, str], List[AssetMeasurement]] = {}
+    for measurement in measurements:
+        grouped.setdefault((measurement.asset, measurement.phase), []).append(measurement)
+
+    def total(values: List[Optional[int]]) -> Optional[int]:
+        present = [value for value in values if value is not None]
+        return sum(present) if present else None
+
+    hot_paths = [
+        HotPath(
+            asset=asset,
+            phase=phase,
+            runs=len(group),
+            wall_seconds=sum(measurement.wall_seconds for measurement in group),
+            cpu_seconds=sum(measurement.cpu_seconds for measurement in group),
+            peak_rss_delta_mb=max(measurement.peak_rss_delta_mb for measurement in group),
+            rows=total([measurement.rows for measurement in group]),
+            bytes=total([measurement.bytes for measurement in group]),
+        )
+        for (asset, phase), group in grouped.items()
+    ]
+    return sorted(hot_paths, key=lambda hot_path: hot_path.wall_seconds, reverse=True)
@@ -1,16 +1,88 @@
+import abc
+import operator
+from pathlib import Path
+from typing import Any, Literal, Mapping, Optional, Sequence, Tuple, Union
+
 import polars as pl
 from dagster import (
     ConfigurableIOManager,
     ConfigurableIOManagerFactory,
+    DagsterInvariantViolationError,
     InputContext,
     OutputContext,
     UPathIOManager,
 )
 from upath import UPath
 
+from ml_cookie_cutter.data.cache import DEFAULT_CACHE_MAX_BYTES, RawSnapshotCache
+from ml_cookie_cutter.data.catalog import DatasetCatalog, DatasetEntry
+from ml_cookie_cutter.data.constants import CATALOG_NAME, RAW_CACHE_DIRECTORY
+from ml_cookie_cutter.data.dtypes import downcast, polars_schema
+from ml_cookie_cutter.orchestration.instrumentation import measure, record_load
+
+IPCCompression = Literal["uncompressed", "lz4"]
+Filter = Tuple[str, str, Any]
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def filters_to_expr(filters: Sequence[Filter], schema: Mapping[str, pl.PolarsDataType]) -> pl.Expr:
+    """Translate `(column, op, value)` filters, combined with AND, into a polars predicate.
+
+    Supported operators are comparisons, `in` and `not in`. String values compared to temporal columns are parsed.
+    """
+    predicates = []
+    for column, op, value in filters:
+        dtype = schema[column]
+        if op in ("in", "not in"):
+            predicate = pl.col(column).is_in(pl.Series(list(value)).cast(dtype))
+            predicates.append(~predicate if op == "not in" else predicate)
+            continue
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator {op} for column {column}")
+        literal = pl.lit(value)
+        if isinstance(value, str) and dtype in (pl.Date, pl.Datetime, pl.Time):
+            literal = literal.str.strptime(dtype)  # type: ignore[arg-type]
+        predicates.append(FILTER_OPERATORS[op](pl.col(column), literal))
+    return pl.all_horizontal(predicates)
+
 
 class SourceAssetPolarsIOManager(ConfigurableIOManager):
-    """Translates between Pandas DataFrames and CSVs on the local filesystem."""
+    """Translates between Pandas DataFrames and CSVs on the local filesystem.
+
+    With `lazy=True` the source is returned as a `pl.LazyFrame` from `pl.scan_csv`, so downstream assets can push
+    column projections and predicates into the CSV reader and only collect at the IO manager boundary.
+
+    With `use_raw_cache=True` the first parse of a raw file is snapshotted as Arrow IPC in the raw cache, and later
+    loads of the same file content and read kwargs read the snapshot instead of parsing the CSV.
+
+    Columns are read with the `dtypes` declared in the source metadata. With `downcast=True` the remaining 64 bit
+    columns are downcast after reading.
+
+    With `streaming=True` the source is a `pl.LazyFrame` the polars streaming engine can execute in bounded memory,
+    so raw files larger than memory can be processed. Raw cache snapshots are then parquet, as the streaming engine
+    can not scan Arrow IPC.
+
+    Loads are measured for the instrumentation of the consuming asset, eager loads read the size of the raw file.
+    """
+
+    lazy: bool = False
+    streaming: bool = False
+    downcast: bool = False
+    use_raw_cache: bool = False
+    raw_cache_directory: Optional[str] = None
+    raw_cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+
+    @property
+    def raw_cache(self) -> RawSnapshotCache:
+        return RawSnapshotCache(self.raw_cache_directory or RAW_CACHE_DIRECTORY, max_bytes=self.raw_cache_max_bytes)
 
     def handle_output(self, context: OutputContext, obj: pl.DataFrame):
         """This saves the dataframe as a CSV."""
@@ -28,24 +100,254 @@ class SourceAssetPolarsIOManager(ConfigurableIOManager):
         if asset_path is None:
             raise ValueError(f"Asset path not found in metadata for asset {context.asset_key.to_string()}")
         read_kwargs = context.upstream_output.metadata.get("read_kwargs", {})
-        return pl.read_csv(str(asset_path), **read_kwargs)
+        dtypes = context.upstream_output.metadata.get("dtypes", {})
+        if dtypes:
+            read_kwargs = {**read_kwargs, "dtypes": polars_schema(dtypes)}
+        with measure() as measurement:
+            if self.use_raw_cache:
+                df = self.raw_cache.load(Path(str(asset_path)), read_kwargs, lazy=self.lazy, streaming=self.streaming)
+            elif self.lazy or self.streaming:
+                df = pl.scan_csv(str(asset_path), **read_kwargs)
+            else:
+                df = pl.read_csv(str(asset_path), **read_kwargs)
+            if self.downcast:
+                df = downcast(df)
+        # A lazy source is only read by the compute collecting it
+        record_load(measurement, Path(str(asset_path)).stat().st_size if isinstance(df, pl.DataFrame) else 0)
+        return df
+
+
+class PolarsUPathIOManager(UPathIOManager, abc.ABC):
+    """Base for IO managers storing polars frames as one file per asset or partition.
+
+    Inputs spanning several partitions are loaded as a single frame concatenated in partition order. Every written
+    file is recorded in the dataset catalog at the root of `base_path`, unless `catalog` is disabled.
+
+    With `streaming=True` LazyFrame outputs on the local filesystem are executed by the polars streaming engine and
+    sunk straight into their file, so an output never has to fit in memory. Otherwise they are collected and written.
+
+    Writes add their wall time, CPU time, peak RSS growth and bytes written to the output metadata. Loads are
+    measured for the instrumentation of the consuming asset.
+    """
+
+    def __init__(self, base_path: UPath, catalog: bool = True, streaming: bool = False):
+        super().__init__(base_path=base_path)
+        self.catalog = DatasetCatalog(Path(str(base_path)) / CATALOG_NAME) if catalog else None
+        self.streaming = streaming
+
+    @abc.abstractmethod
+    def write_frame(self, df: pl.DataFrame, path: UPath):
+        ...
+
+    @abc.abstractmethod
+    def sink_frame(self, df: pl.LazyFrame, path: UPath):
+        ...
+
+    @abc.abstractmethod
+    def scan(self, path: UPath) -> pl.LazyFrame:
+        ...
+
+    def dump_to_path(self, context: OutputContext, obj: Union[pl.DataFrame, pl.LazyFrame], path: UPath):
+        with measure() as measurement:
+            # The streaming engine sinks to local paths only
+            if isinstance(obj, pl.LazyFrame) and self.streaming and isinstance(path, Path):
+                self.sink_frame(obj, path)
+                written: Union[pl.DataFrame, pl.LazyFrame] = self.scan(path)
+            else:
+                if isinstance(obj, pl.LazyFrame):
+                    obj = obj.collect()
+                self.write_frame(obj, path)
+                written = obj
+            if self.catalog is not None:
+                self.catalog.record(self.catalog_entry(context, written, path))
+        context.add_output_metadata({**measurement.metadata("handle_output"), "bytes_written": path.stat().st_size})
+
+    @staticmethod
+    def _run_id(context: OutputContext) -> Optional[str]:
+        try:
+            return context.run_id
+        except DagsterInvariantViolationError:
+            return None
 
+    def catalog_entry(self, context: OutputContext, df: Union[pl.DataFrame, pl.LazyFrame], path: UPath) -> DatasetEntry:
+        """Catalog entry of a written frame, a LazyFrame (the scan of a sunk file) is summarized in one query."""
+        timestamps = [name for name, dtype in df.schema.items() if dtype == pl.Datetime]
+        stats = [pl.count().alias("rows")]
+        if timestamps:
+            stats += [pl.col(timestamps[0]).min().alias("min"), pl.col(timestamps[0]).max().alias("max")]
+        summary = df.lazy().select(stats).collect(streaming=isinstance(df, pl.LazyFrame)).row(0, named=True)
+        min_timestamp = max_timestamp = None
+        if timestamps and summary["rows"]:
+            min_timestamp, max_timestamp = str(summary["min"]), str(summary["max"])
+        return DatasetEntry(
+            path=str(path),
+            asset_key=(
+                "/".join(context.asset_key.path)
+                if context.has_asset_key
+                else path.relative_to(self._base_path).with_suffix("").as_posix()
+            ),
+            partition_key=context.partition_key if context.has_partition_key else None,
+            schema={name: str(dtype) for name, dtype in df.schema.items()},
+            row_count=summary["rows"],
+            byte_size=path.stat().st_size,
+            min_timestamp=min_timestamp,
+            max_timestamp=max_timestamp,
+            run_id=self._run_id(context),
+        )
+
+    def load_input(self, context: InputContext) -> pl.DataFrame:
+        with measure() as measurement:
+            if not context.has_asset_key or not context.has_asset_partitions or len(context.asset_partition_keys) <= 1:
+                df = super().load_input(context)
+            else:
+                partitions = self._load_multiple_inputs(context)
+                df = pl.concat([partitions[key] for key in context.asset_partition_keys if key in partitions])
+        record_load(measurement, self._input_bytes(context))
+        return df
+
+    def _input_bytes(self, context: InputContext) -> int:
+        """Size of the files an input is loaded from, columns and row groups skipped by a scan are counted too."""
+        if context.has_asset_key and context.has_asset_partitions:
+            paths = list(self._get_paths_for_partitions(context).values())
+        else:
+            paths = [self._get_path(context)]
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+
+class PolarsParquetIOManager(PolarsUPathIOManager):
+    """Stores polars frames as parquet, one file per partition for partitioned assets.
+
+    Downstream assets can declare the `columns` they need and row `filters` (`(column, op, value)` tuples) through
+    `AssetIn` metadata. Loads then scan the parquet with projection and predicate pushdown, skipping row groups by their
+    statistics, so the written row group size and statistics are configurable.
+    """
 
-class PolarsParquetIOManager(UPathIOManager):
     extension: str = ".parquet"
 
-    def dump_to_path(self, context: OutputContext, obj: pl.DataFrame, path: UPath):
+    def __init__(
+        self,
+        base_path: UPath,
+        compression: str = "zstd",
+        compression_level: Optional[int] = None,
+        row_group_size: Optional[int] = None,
+        statistics: bool = True,
+        catalog: bool = True,
+        streaming: bool = False,
+    ):
+        super().__init__(base_path=base_path, catalog=catalog, streaming=streaming)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.row_group_size = row_group_size
+        self.statistics = statistics
+
+    def write_frame(self, df: pl.DataFrame, path: UPath):
         with path.open("wb") as file:
-            obj.write_parquet(file)
+            df.write_parquet(
+                file,
+                compression=self.compression,  # type: ignore[arg-type]
+                compression_level=self.compression_level,
+                row_group_size=self.row_group_size,
+                statistics=self.statistics,
+            )
+
+    def sink_frame(self, df: pl.LazyFrame, path: UPath):
+        df.sink_parquet(
+            str(path),
+            compression=self.compression,
+            compression_level=self.compression_level,
+            row_group_size=self.row_group_size,
+            statistics=self.statistics,
+        )
+
+    def scan(self, path: UPath) -> pl.LazyFrame:
+        return pl.scan_parquet(str(path))
 
     def load_from_path(self, context: InputContext, path: UPath) -> pl.DataFrame:
-        with path.open("rb") as file:
-            return pl.read_parquet(file)
+        metadata = context.metadata or {}
+        columns, filters = metadata.get("columns"), metadata.get("filters")
+        if not columns and not filters:
+            with path.open("rb") as file:
+                return pl.read_parquet(file)
+
+        if not path.exists():
+            raise FileNotFoundError(f"No such file: {path}")
+        scan = pl.scan_parquet(str(path))
+        if filters:
+            scan = scan.filter(filters_to_expr(filters, scan.schema))
+        if columns:
+            scan = scan.select(columns)
+        return scan.collect()
+
+
+class PolarsIPCIOManager(PolarsUPathIOManager):
+    """Stores polars frames as Arrow IPC (Feather v2) files, loaded through memory mapping.
+
+    Uncompressed files are memory mapped on load, so readers of the same asset share the OS page cache instead of
+    each copying it onto their own heap. LZ4 trades that for smaller files, as compressed buffers are decoded on load.
+    """
+
+    extension: str = ".arrow"
+
+    def __init__(
+        self,
+        base_path: UPath,
+        compression: IPCCompression = "uncompressed",
+        catalog: bool = True,
+        streaming: bool = False,
+    ):
+        super().__init__(base_path=base_path, catalog=catalog, streaming=streaming)
+        self.compression = compression
+
+    def write_frame(self, df: pl.DataFrame, path: UPath):
+        with path.open("wb") as file:
+            df.write_ipc(file, compression=self.compression)
+
+    def sink_frame(self, df: pl.LazyFrame, path: UPath):
+        df.sink_ipc(str(path), compression=None if self.compression == "uncompressed" else self.compression)
+
+    def scan(self, path: UPath) -> pl.LazyFrame:
+        return pl.scan_ipc(str(path), memory_map=self.compression == "uncompressed")
+
+    def load_from_path(self, context: InputContext, path: UPath) -> pl.DataFrame:
+        if not path.exists():
+            raise FileNotFoundError(f"No such file: {path}")
+        return pl.read_ipc(str(path), memory_map=self.compression == "uncompressed")
 
 
 class LocalPolarsParquetIOManager(ConfigurableIOManagerFactory["PolarsParquetIOManager"]):
     base_path: str
+    compression: str = "zstd"
+    compression_level: Optional[int] = None
+    row_group_size: Optional[int] = None
+    statistics: bool = True
+    catalog: bool = True
+    streaming: bool = False
 
     def create_io_manager(self, context: InputContext) -> PolarsParquetIOManager:
         base_path = UPath(self.base_path or context.instance.storage_directory())
-        return PolarsParquetIOManager(base_path=base_path)
+        return PolarsParquetIOManager(
+            base_path=base_path,
+            compression=self.compression,
+            compression_level=self.compression_level,
+            row_group_size=self.row_group_size,
+            statistics=self.statistics,
+            catalog=self.catalog,
+            streaming=self.streaming,
+        )
+
+
+class LocalPolarsIPCIOManager(ConfigurableIOManagerFactory["PolarsIPCIOManager"]):
+    base_path: str
+    # One of "uncompressed" (memory mapped loads) or "lz4"
+    compression: str = "uncompressed"
+    catalog: bool = True
+    streaming: bool = False
+
+    def create_io_manager(self, context: InputContext) -> PolarsIPCIOManager:
+        base_path = UPath(self.base_path or context.instance.storage_directory())
+        return PolarsIPCIOManager(
+            base_path=base_path,
+            compression=self.compression,  # type: ignore[arg-type]
+            catalog=self.catalog,
+            streaming=self.streaming,
+        )
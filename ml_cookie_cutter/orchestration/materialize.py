@@ -0,0 +1,261 @@
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Literal, Optional, Sequence, Tuple
+
+import polars as pl
+from dagster import AssetKey, AssetsDefinition, ConfigurableIOManagerFactory, FilesystemIOManager, materialize
+
+from ml_cookie_cutter.data.cache import RawSnapshotCache
+from ml_cookie_cutter.data.catalog import DatasetCatalog
+from ml_cookie_cutter.data.constants import CATALOG_NAME, DATALAKE_DIRECTORY, DATASET_PREFIX_TIMESERIES, DUCKDB_PATH
+from ml_cookie_cutter.data.dtypes import polars_schema
+from ml_cookie_cutter.orchestration.instrumentation import AssetMeasurement, result_measurements
+from ml_cookie_cutter.orchestration.io_managers import (
+    LocalPolarsIPCIOManager,
+    LocalPolarsParquetIOManager,
+    SourceAssetPolarsIOManager,
+)
+from ml_cookie_cutter.orchestration.partitions import (
+    missing_or_stale_partition_keys,
+    partition_data_versions,
+    partition_fingerprints,
+)
+from ml_cookie_cutter.orchestration.timeseries_example import (
+    timeseries_aggregates,
+    timeseries_average_per_day,
+    timeseries_calendar_features,
+    timeseries_example_asset,
+    timeseries_example_cleaned,
+    timeseries_example_dataset,
+    timeseries_example_df,
+    timeseries_partitions_def,
+    timeseries_window,
+)
+
+# In dependency order
+TIMESERIES_ASSETS = [
+    timeseries_example_df,
+    timeseries_example_cleaned,
+    timeseries_calendar_features,
+    timeseries_average_per_day,
+    timeseries_aggregates,
+]
+
+DatalakeIOManager = Literal[
+    "duckdb_polars_io_manager", "local_polars_parquet_io_manager", "local_polars_ipc_io_manager"
+]
+
+
+def datalake_io_manager(io_manager: DatalakeIOManager, streaming: bool = False) -> ConfigurableIOManagerFactory:
+    """The io manager storing datalake assets, DuckDB is only imported when selected."""
+    if io_manager == "duckdb_polars_io_manager":
+        from ml_cookie_cutter.orchestration.duckdb_io_managers import DuckDBPolarsArrowIOManager
+
+        return DuckDBPolarsArrowIOManager(database=str(DUCKDB_PATH))
+    if io_manager == "local_polars_ipc_io_manager":
+        return LocalPolarsIPCIOManager(base_path=str(DATALAKE_DIRECTORY), streaming=streaming)
+    return LocalPolarsParquetIOManager(base_path=str(DATALAKE_DIRECTORY), streaming=streaming)
+
+
+def timeseries_data_versions(streaming: bool = False) -> Dict[AssetKey, Dict[Optional[str], str]]:
+    """Expected data versions of the timeseries asset partitions, given the raw readings and the code versions.
+
+    The raw readings of every partition window are fingerprinted in one query over the raw cache snapshot the runs
+    load, so readings appended to the latest partition only change the versions of the partitions reading them.
+    The fingerprints are memoized in the raw cache per snapshot, so the query only reads the raw readings once for
+    every content of the raw file.
+    """
+    fingerprints: Dict[Optional[str], str]
+    if timeseries_partitions_def is None:
+        fingerprints = {None: timeseries_example_dataset.data_version()}
+    else:
+        read_kwargs = {
+            **timeseries_example_dataset.pl_read_kwargs,
+            "dtypes": polars_schema(timeseries_example_dataset.dtypes),
+        }
+        cache = RawSnapshotCache()
+
+        def fingerprint() -> Dict[str, str]:
+            raw = cache.load(timeseries_example_dataset.asset_path, read_kwargs, lazy=True, streaming=streaming)
+            return partition_fingerprints(timeseries_window(raw), timeseries_partitions_def, streaming=streaming)
+
+        # Kept per polars version, as the row hashes of the fingerprints are not stable across polars versions
+        name = f"fingerprints-{timeseries_partitions_def.get_serializable_unique_identifier()}-polars-{pl.__version__}"
+        fingerprints = cache.memo(cache.key(timeseries_example_dataset.asset_path, read_kwargs), name, fingerprint)
+    return partition_data_versions(
+        TIMESERIES_ASSETS, timeseries_partitions_def, {timeseries_example_asset.key: fingerprints}
+    )
+
+
+def asset_label(asset: AssetsDefinition) -> str:
+    """Key of a single asset, or the op name of a multi asset."""
+    if len(asset.keys) == 1:
+        return asset.key.to_user_string()
+    return asset.node_def.name
+
+
+@dataclass
+class MaterializationTiming:
+    asset: str
+    partition_key: Optional[str]
+    seconds: float
+    # Instrumented phases of the run
+    measurements: List[AssetMeasurement] = field(default_factory=list)
+
+
+def _materialize_timeseries_asset(
+    io_manager: DatalakeIOManager,
+    asset: str,
+    partition_key: Optional[str],
+    intermediate_directory: str,
+    data_versions: Optional[Dict[AssetKey, Dict[Optional[str], str]]] = None,
+    streaming: bool = False,
+    incremental: bool = False,
+) -> MaterializationTiming:
+    """Materialize one asset (partition) of the timeseries graph, runs in worker processes.
+
+    The `data_versions` of its keys are recorded in the dataset catalog for the written datasets.
+    """
+    assets = [timeseries_example_asset, *TIMESERIES_ASSETS]
+    resources = {
+        # Unpartitioned intermediates are shared between the runs (and worker processes) through the filesystem
+        "io_manager": FilesystemIOManager(base_dir=intermediate_directory),
+        # The source frame is a lazy scan of the raw cache snapshot, so every partition run only unpickles the plan
+        # and reads the rows of its own window
+        "source_asset_polars_io_manager": SourceAssetPolarsIOManager(
+            lazy=True, use_raw_cache=True, streaming=streaming
+        ),
+        # Datalake assets are keyed on the parquet io manager, swap in the selected storage
+        "local_polars_parquet_io_manager": datalake_io_manager(io_manager, streaming=streaming),
+    }
+    selection = next(a for a in TIMESERIES_ASSETS if asset_label(a) == asset)
+    run_config = {}
+    if streaming and selection is timeseries_example_cleaned:
+        run_config = {"ops": {selection.node_def.name: {"config": {"streaming": True}}}}
+    if incremental and selection is timeseries_average_per_day:
+        config = {"incremental": True, "state_directory": str(DATALAKE_DIRECTORY)}
+        run_config = {"ops": {selection.node_def.name: {"config": config}}}
+    start = time.perf_counter()
+    result = materialize(
+        assets, selection=[selection], partition_key=partition_key, resources=resources, run_config=run_config
+    )
+    if data_versions and partition_key is not None:
+        catalog = DatasetCatalog(DATALAKE_DIRECTORY / CATALOG_NAME)
+        for key in selection.keys:
+            catalog.set_data_version(key.to_user_string(), partition_key, data_versions[key][partition_key])
+    return MaterializationTiming(asset, partition_key, time.perf_counter() - start, result_measurements(result))
+
+
+def materialize_timeseries_data_assets(
+    io_manager: DatalakeIOManager,
+    partition_keys: Optional[Sequence[str]] = None,
+    missing_only: bool = False,
+    workers: int = 1,
+    on_progress: Optional[Callable[[MaterializationTiming, int, int], None]] = None,
+    streaming: bool = False,
+    incremental: bool = False,
+) -> List[MaterializationTiming]:
+    """Materialize the timeseries assets, one run per asset and time window partition.
+
+    Partitions default to all partitions, or with `missing_only` to the partitions that are missing or stale. A
+    partition is stale when its recorded data version differs from the one expected from the fingerprints of the raw
+    readings it reads and the code versions, so nothing is recomputed when neither changed and appended readings only
+    recompute the partitions they land in.
+    The datalake assets are stored through the selected `io_manager`. Runs are executed in stages of independent
+    runs (source frame, cleaned partitions, feature table and tumbling aggregate partitions, rolling aggregate
+    partitions joined with their features), each stage on a pool of `workers` processes.
+    With `streaming` the raw data is parsed and cleaned by the polars streaming engine and the cleaned partitions are
+    sunk straight into the datalake, so raw data larger than memory can be processed. The source frame is then a lazy
+    plan over a parquet snapshot of the raw data, only the aggregates collect their (partition sized) inputs.
+    With `incremental` the rolling averages of a partition only aggregate the readings newer than its previous
+    materialization, from running state kept next to the partition in the datalake.
+    `on_progress` is called with the timing, number of finished runs and total number of runs after every run.
+    """
+    # Data versions are recorded in the dataset catalog, which DuckDB tables are not part of
+    data_versions = timeseries_data_versions(streaming) if io_manager != "duckdb_polars_io_manager" else {}
+    if timeseries_partitions_def is None:
+        partition_keys = [None]  # type: ignore[list-item]
+    elif partition_keys is None and missing_only:
+        if io_manager == "duckdb_polars_io_manager":
+            raise ValueError("Materializing missing partitions is only supported for file based io managers")
+        partition_keys = missing_or_stale_partition_keys(
+            timeseries_partitions_def,
+            DATALAKE_DIRECTORY,
+            [
+                timeseries_example_cleaned.key,
+                timeseries_calendar_features.key,
+                timeseries_average_per_day.key,
+                *timeseries_aggregates.keys,
+            ],
+            extension=".arrow" if io_manager == "local_polars_ipc_io_manager" else ".parquet",
+            data_versions=data_versions,
+        )
+    elif partition_keys is None:
+        partition_keys = timeseries_partitions_def.get_partition_keys()
+    if workers > 1 and io_manager == "duckdb_polars_io_manager":
+        raise ValueError("DuckDB allows a single writing process, materialize with one worker")
+    if streaming and io_manager == "duckdb_polars_io_manager":
+        raise ValueError("Streaming materialization is only supported for file based io managers")
+    if incremental and io_manager == "duckdb_polars_io_manager":
+        raise ValueError("Incremental materialization is only supported for file based io managers")
+    if not partition_keys:
+        return []
+
+    stages: List[List[Tuple[AssetsDefinition, Optional[str]]]] = [
+        [(timeseries_example_df, None)],
+        [(timeseries_example_cleaned, key) for key in partition_keys],
+        [(asset, key) for asset in [timeseries_calendar_features, timeseries_aggregates] for key in partition_keys],
+        [(timeseries_average_per_day, key) for key in partition_keys],
+    ]
+    total = sum(len(stage) for stage in stages)
+    timings: List[MaterializationTiming] = []
+
+    def record(timing: MaterializationTiming):
+        timings.append(timing)
+        if on_progress is not None:
+            on_progress(timing, len(timings), total)
+
+    with tempfile.TemporaryDirectory() as intermediate_directory:
+        if workers <= 1:
+            for stage in stages:
+                for asset, partition_key in stage:
+                    record(
+                        _materialize_timeseries_asset(
+                            io_manager,
+                            asset_label(asset),
+                            partition_key,
+                            intermediate_directory,
+                            data_versions,
+                            streaming,
+                            incremental,
+                        )
+                    )
+            return timings
+
+        # Spawn, as forking a process with a running polars thread pool can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for stage in stages:
+                futures = [
+                    pool.submit(
+                        _materialize_timeseries_asset,
+                        io_manager,
+                        asset_label(asset),
+                        partition_key,
+                        intermediate_directory,
+                        data_versions,
+                        streaming,
+                        incremental,
+                    )
+                    for asset, partition_key in stage
+                ]
+                for future in as_completed(futures):
+                    record(future.result())
+    return timings
+
+
+project_materializations = {
+    DATASET_PREFIX_TIMESERIES: materialize_timeseries_data_assets,
+}
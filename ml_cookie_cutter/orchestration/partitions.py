@@ -0,0 +1,163 @@
+import hashlib
+import math
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import polars as pl
+from dagster import (
+    AssetExecutionContext,
+    AssetKey,
+    AssetsDefinition,
+    DailyPartitionsDefinition,
+    MonthlyPartitionsDefinition,
+    TimeWindow,
+    TimeWindowPartitionsDefinition,
+    WeeklyPartitionsDefinition,
+)
+
+from ml_cookie_cutter.data.catalog import DatasetCatalog
+from ml_cookie_cutter.data.constants import CATALOG_NAME
+from ml_cookie_cutter.data.raw import PartitionsConfig
+
+PARTITIONS_DEFINITIONS = {
+    "daily": DailyPartitionsDefinition,
+    "weekly": WeeklyPartitionsDefinition,
+    "monthly": MonthlyPartitionsDefinition,
+}
+# Shortest time window of a partition of every schedule
+SHORTEST_PARTITIONS = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1), "monthly": timedelta(days=28)}
+
+
+def time_window_partitions(config: Optional[PartitionsConfig]) -> Optional[TimeWindowPartitionsDefinition]:
+    """Build the time window partitions of a raw dataset from its config, `None` if it is unpartitioned."""
+    if config is None:
+        return None
+    return PARTITIONS_DEFINITIONS[config.schedule](start_date=config.start_date, end_date=config.end_date)
+
+
+def lookback_partitions(config: Optional[PartitionsConfig], lookback: timedelta) -> int:
+    """Number of preceding partitions holding the rows up to `lookback` before the start of a partition."""
+    if config is None:
+        return 0
+    return math.ceil(lookback / SHORTEST_PARTITIONS[config.schedule])
+
+
+def partition_window(context: AssetExecutionContext) -> Optional[Tuple[datetime, datetime]]:
+    """The naive [start, end) time window of the partition being materialized, `None` if unpartitioned."""
+    if not context.has_partition_key:
+        return None
+    return naive_window(context.partition_time_window)
+
+
+def naive_window(window: TimeWindow) -> Tuple[datetime, datetime]:
+    return datetime(*window.start.timetuple()[:6]), datetime(*window.end.timetuple()[:6])
+
+
+def partition_fingerprints(
+    df: pl.LazyFrame, partitions_def: TimeWindowPartitionsDefinition, column: str = "Datetime", streaming: bool = False
+) -> Dict[str, str]:
+    """Fingerprint of the rows in the time window of every partition, in a single (`streaming`) query over `df`.
+
+    A fingerprint combines the number of rows, their latest `column` timestamp and the sum of their row hashes, so it
+    changes when rows of the window are appended, removed or edited, and only then. The query reads every row of `df`.
+    """
+    # Polars row hashes are not stable across polars versions, a polars upgrade changes every fingerprint and thereby
+    # marks every partition stale once
+    partition_keys = partitions_def.get_partition_keys()
+    windows = [naive_window(partitions_def.time_window_for_partition_key(key)) for key in partition_keys]
+    starts = pl.Series([start for start, _ in windows], dtype=pl.Datetime("us"))
+    summary = (
+        df.filter(pl.col(column).is_between(windows[0][0], windows[-1][1], closed="left"))
+        .group_by((pl.lit(starts).search_sorted(pl.col(column), side="right") - 1).alias("partition"))
+        .agg(pl.count().alias("rows"), pl.col(column).max().alias("max"), pl.struct(pl.all()).hash(seed=0).sum())
+        .collect(streaming=streaming)
+    )
+    found = {row[0]: ":".join(map(str, row[1:])) for row in summary.iter_rows()}
+    # Windows without rows share the fingerprint of no rows
+    return {key: found.get(index, "0:None:0") for index, key in enumerate(partition_keys)}
+
+
+def partition_data_versions(
+    assets: Sequence[AssetsDefinition],
+    partitions_def: Optional[TimeWindowPartitionsDefinition],
+    source_versions: Mapping[AssetKey, Mapping[Optional[str], str]],
+) -> Dict[AssetKey, Dict[Optional[str], str]]:
+    """Expected data versions of every partition of the `assets`, given in dependency order.
+
+    The version of a partition is derived from the code version of its asset and the versions of the upstream
+    partitions it reads, following the partition mappings of its inputs. Unpartitioned assets have a version per
+    partition too, that of the slice the partition reads, so `source_versions` are the fingerprints of the source rows
+    in every partition window (see `partition_fingerprints`), or a single version under the `None` key when
+    `partitions_def` is `None`. Changed source rows thereby only change the versions of the partitions reading them.
+    """
+    partition_keys = partitions_def.get_partition_keys() if partitions_def is not None else [None]
+    data_versions: Dict[AssetKey, Dict[Optional[str], str]] = {
+        key: dict(value) for key, value in source_versions.items()
+    }
+    for asset in assets:
+        for key in asset.keys:
+            code_version = asset.code_versions_by_key[key] or ""
+            data_versions[key] = {}
+            for partition_key in partition_keys:
+                inputs = []
+                for dep in asset.asset_deps[key]:
+                    mapping = asset.get_partition_mapping(dep)
+                    upstream_keys = [partition_key]
+                    if mapping is not None and partitions_def is not None:
+                        upstream = mapping.get_upstream_mapped_partitions_result_for_partitions(
+                            partitions_def.subset_with_partition_keys([partition_key]), partitions_def
+                        )
+                        upstream_keys = list(upstream.partitions_subset.get_partition_keys())
+                    inputs += [data_versions[dep][upstream_key] for upstream_key in upstream_keys]
+                data_versions[key][partition_key] = logical_data_version(code_version, inputs)
+    return data_versions
+
+
+def logical_data_version(code_version: str, input_data_versions: Sequence[str]) -> str:
+    """Data version of an output derived from its code version and input data versions."""
+    digest = hashlib.sha256(code_version.encode())
+    for input_data_version in sorted(input_data_versions):
+        digest.update(input_data_version.encode())
+    return digest.hexdigest()
+
+
+def missing_or_stale_partition_keys(
+    partitions_def: TimeWindowPartitionsDefinition,
+    base_path: Path,
+    asset_keys: Sequence[AssetKey],
+    extension: str = ".parquet",
+    data_versions: Optional[Mapping[AssetKey, Mapping[Optional[str], str]]] = None,
+) -> list[str]:
+    """Partition keys where any of the assets has no partition file yet, or a stale one.
+
+    Given the expected `data_versions` of the partitions of the assets (see `partition_data_versions`), a partition is
+    stale when the data version recorded for it in the dataset catalog differs, i.e. the data it reads or the code
+    changed since it was written. Without data versions the most recent partition is always considered stale, since
+    newly appended readings land in it.
+    """
+    partition_keys = partitions_def.get_partition_keys()
+    missing = [
+        partition_key
+        for partition_key in partition_keys
+        if any(not (base_path.joinpath(*key.path) / f"{partition_key}{extension}").exists() for key in asset_keys)
+    ]
+    if data_versions is None:
+        if partition_keys and partition_keys[-1] not in missing:
+            missing.append(partition_keys[-1])
+        return missing
+
+    catalog = DatasetCatalog(base_path / CATALOG_NAME)
+    recorded = {
+        (entry.asset_key, entry.partition_key): entry.data_version
+        for key in asset_keys
+        for entry in catalog.datasets("/".join(key.path))
+    }
+    return [
+        partition_key
+        for partition_key in partition_keys
+        if partition_key in missing
+        or any(
+            recorded.get(("/".join(key.path), partition_key)) != data_versions[key][partition_key] for key in asset_keys
+        )
+    ]
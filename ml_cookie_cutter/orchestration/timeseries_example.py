@@ -1,25 +1,46 @@
 import warnings
-from typing import Tuple
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Literal, Mapping, Optional, Tuple, Union
 
 import polars as pl
 from dagster import (
-    AssetCheckResult,
-    AssetCheckSpec,
+    AssetExecutionContext,
     AssetIn,
     AssetKey,
+    AssetOut,
     Config,
+    DagsterType,
+    DataVersion,
     ExperimentalWarning,
     Output,
-    SourceAsset,
     TableColumn,
     TableSchema,
     TableSchemaMetadataValue,
+    TimeWindowPartitionMapping,
     asset,
+    multi_asset,
+    observable_source_asset,
 )
 from pydantic import model_validator
 
-from ml_cookie_cutter.data.constants import DATASET_PREFIX_TIMESERIES
-from ml_cookie_cutter.data.raw import RawDataset
+from ml_cookie_cutter.data.aggregation import (
+    PYRAMID_LEVELS,
+    PYRAMID_LONGEST_WINDOW,
+    IncrementalRollingAggregation,
+    blocked_rolling,
+    tumbling_pyramid,
+)
+from ml_cookie_cutter.data.calendar import calendar_features
+from ml_cookie_cutter.data.constants import DATALAKE_DIRECTORY, DATASET_PREFIX_TIMESERIES, FEATURES_PREFIX
+from ml_cookie_cutter.data.dtypes import memory_metadata
+from ml_cookie_cutter.data.profiling import profile
+from ml_cookie_cutter.data.raw import PartitionsConfig, RawDataset
+from ml_cookie_cutter.ml.feature_store import feature_table, point_in_time_join
+from ml_cookie_cutter.orchestration.checks import profile_check_results, profile_check_specs
+from ml_cookie_cutter.orchestration.instrumentation import instrumented
+from ml_cookie_cutter.orchestration.partitions import lookback_partitions, partition_window, time_window_partitions
 
 warnings.filterwarnings("ignore", category=ExperimentalWarning)
 
@@ -27,90 +48,314 @@ warnings.filterwarnings("ignore", category=ExperimentalWarning)
 DATASET_PREFIX = DATASET_PREFIX_TIMESERIES
 
 timeseries_example_dataset = RawDataset("timeseries-example")
+timeseries_partitions_def = time_window_partitions(timeseries_example_dataset.config.partitions)
 
 
-timeseries_example_asset = SourceAsset(
-    key=AssetKey([DATASET_PREFIX, timeseries_example_dataset.name]),
-    metadata={**timeseries_example_dataset.to_dict(), "read_kwargs": timeseries_example_dataset.pl_read_kwargs},
+@observable_source_asset(
+    name=timeseries_example_dataset.name,
+    key_prefix=[DATASET_PREFIX],
+    metadata={
+        **timeseries_example_dataset.to_dict(),
+        "read_kwargs": timeseries_example_dataset.pl_read_kwargs,
+        "dtypes": timeseries_example_dataset.dtypes,
+    },
     description="A dataset of household power consumption.",
     io_manager_key="source_asset_polars_io_manager",
 )
+def timeseries_example_asset():
+    # Observed content fingerprint, downstream assets are stale only when it or their code version changes
+    return DataVersion(timeseries_example_dataset.data_version())
+
+
+PolarsFrame = Union[pl.DataFrame, pl.LazyFrame]
+PolarsFrameType = DagsterType(
+    name="PolarsFrame",
+    type_check_fn=lambda _, value: isinstance(value, (pl.DataFrame, pl.LazyFrame)),
+    description="An eager or lazy polars frame.",
+)
 
 
-def polars_df_to_dagster_df(df: pl.DataFrame):
+def polars_df_to_dagster_df(df: PolarsFrame):
     return Output(
         df,
         metadata={
             "schema": TableSchemaMetadataValue(
                 TableSchema([TableColumn(name=key, type=str(value)) for key, value in df.schema.items()])
-            )
+            ),
+            # The footprint of a lazy source is unknown until collected downstream
+            **(memory_metadata(df) if isinstance(df, pl.DataFrame) else {}),
         },
     )
 
 
 @asset(
-    code_version="1",
+    code_version="2",
     key_prefix=[DATASET_PREFIX],
-    ins={"timeseries_example_asset": AssetIn(timeseries_example_asset.key)},
+    ins={"timeseries_example_asset": AssetIn(timeseries_example_asset.key, dagster_type=PolarsFrameType)},
 )
-def timeseries_example_df(timeseries_example_asset: pl.DataFrame):
+@instrumented
+def timeseries_example_df(timeseries_example_asset: PolarsFrame):
     return polars_df_to_dagster_df(timeseries_example_asset)
 
 
+def date_time_to_datetime(
+    schema: Mapping[str, pl.PolarsDataType], date_column: str = "Date", time_column: str = "Time"
+) -> pl.Expr:
+    """Datetime expression combining a day first date column and a time column.
+
+    Date and time are parsed separately and combined, rather than parsing concatenated strings. Both columns repeat a
+    small set of distinct values, which the parse cache turns into a lookup, and no concatenated string column is
+    allocated. Columns already read as `pl.Date` and `pl.Time` are combined as is.
+    """
+    date = pl.col(date_column)
+    if schema[date_column] == pl.Utf8:
+        date = date.str.to_date("%d/%m/%Y")
+    time = pl.col(time_column)
+    if schema[time_column] == pl.Utf8:
+        time = time.str.to_time("%H:%M:%S")
+    return date.dt.combine(time)
+
+
+def timeseries_window(df: PolarsFrame, window: Optional[Tuple[datetime, datetime]] = None) -> pl.LazyFrame:
+    """Lazy plan deriving the Datetime of the readings and keeping those in the [start, end) `window`."""
+    plan = df.lazy()
+    # Derive datetime column from date and time columns
+    plan = plan.with_columns(date_time_to_datetime(plan.schema).alias("Datetime"))
+    if window is not None:
+        plan = plan.filter(pl.col("Datetime").is_between(*window, closed="left"))
+    return plan
+
+
+def clean_timeseries(df: PolarsFrame, window: Optional[Tuple[datetime, datetime]] = None) -> Tuple[pl.DataFrame, int]:
+    """Derive the Datetime of the readings, keep those in the [start, end) `window` and drop incomplete readings.
+
+    Returns the cleaned frame and the number of readings in the window before dropping.
+    """
+    # Build a single lazy plan, so a LazyFrame source only collects the columns and rows the plan needs
+    plan = timeseries_window(df, window)
+    cleaned = plan.with_columns(pl.count().alias("rows_before_clean")).drop_nulls().collect()
+    if cleaned.height:
+        rows_before_clean = cleaned["rows_before_clean"][0]
+    else:
+        rows_before_clean = plan.select(pl.count()).collect().item()
+    return cleaned.drop("rows_before_clean"), rows_before_clean
+
+
+class StreamingConfig(Config):
+    """Keep the output a lazy plan, which a streaming io manager executes with the polars streaming engine."""
+
+    streaming: bool = False
+
+
 @asset(
-    code_version="1",
-    ins={"timeseries_example_df": AssetIn(timeseries_example_df.key)},
+    code_version="2",
+    ins={"timeseries_example_df": AssetIn(timeseries_example_df.key, dagster_type=PolarsFrameType)},
     io_manager_key="local_polars_parquet_io_manager",
     key_prefix=[DATASET_PREFIX],
-    check_specs=[AssetCheckSpec(name="timeseries_has_no_nulls", asset=[DATASET_PREFIX, "timeseries_example_cleaned"])],
+    partitions_def=timeseries_partitions_def,
+    metadata={"partition_expr": "Datetime"},
+    check_specs=profile_check_specs(
+        AssetKey([DATASET_PREFIX, "timeseries_example_cleaned"]), timeseries_example_dataset.config.profile
+    ),
 )
-def timeseries_example_cleaned(timeseries_example_df: pl.DataFrame):
-    rows_before_clean = timeseries_example_df.height
-    df = timeseries_example_df.drop_nulls()
+@instrumented
+def timeseries_example_cleaned(
+    context: AssetExecutionContext, config: StreamingConfig, timeseries_example_df: PolarsFrame
+):
+    profile_config = timeseries_example_dataset.config.profile
+    if config.streaming:
+        # Counts and profile stream the scan of the window, the cleaned rows are only sunk by the io manager
+        plan = timeseries_window(timeseries_example_df, partition_window(context))
+        rows_before_clean = plan.select(pl.count()).collect(streaming=True).item()
+        df: PolarsFrame = plan.drop_nulls()
+        dataset_profile = (
+            profile(df, profile_config, streaming=True, index_df=plan) if profile_config is not None else None
+        )
+        if dataset_profile is not None:
+            metadata = {"rows_after_clean": dataset_profile.rows}
+        else:
+            metadata = {"rows_after_clean": df.select(pl.count()).collect(streaming=True).item()}
+    else:
+        df, rows_before_clean = clean_timeseries(timeseries_example_df, partition_window(context))
+        # Gaps are measured before dropping incomplete readings, which are not missing from the series
+        dataset_profile = (
+            profile(df, profile_config, index_df=timeseries_window(timeseries_example_df, partition_window(context)))
+            if profile_config is not None
+            else None
+        )
+        metadata = {"rows_after_clean": df.height, **memory_metadata(df)}
+    yield Output(
+        value=df,
+        metadata={
+            "rows_before_clean": rows_before_clean,
+            **metadata,
+            **(dataset_profile.metadata() if dataset_profile is not None else {}),
+        },
+    )
 
-    # Derive datetime column from date and time columns
-    df = df.with_columns((df["Date"] + " " + df["Time"]).str.to_datetime(format="%d/%m/%Y %H:%M:%S").alias("Datetime"))
-    rows_after_clean = df.height
-    yield Output(value=df, metadata={"rows_before_clean": rows_before_clean, "rows_after_clean": rows_after_clean})
+    if dataset_profile is not None:
+        yield from profile_check_results(dataset_profile)
 
-    yield AssetCheckResult(
-        passed=(df.null_count().sum(axis=1).sum() == 0),
-    )
 
+MEASUREMENT_COLUMNS = [
+    "Global_active_power",
+    "Global_reactive_power",
+    "Voltage",
+    "Global_intensity",
+    "Sub_metering_1",
+    "Sub_metering_2",
+    "Sub_metering_3",
+]
 
-def average_global_active_power_per_temporal_unit(df: pl.DataFrame, temporal_unit: str):
-    return (
-        df.sort(["Datetime"])
-        .rolling("Datetime", period=temporal_unit)
-        .agg(
-            pl.col("Global_active_power").mean(),
-            pl.col("Global_reactive_power").mean(),
-            pl.col("Voltage").mean(),
-            pl.col("Global_intensity").mean(),
-            pl.col("Sub_metering_1").mean(),
-            pl.col("Sub_metering_2").mean(),
-            pl.col("Sub_metering_3").mean(),
-        )
-    )
+
+def average_global_active_power_per_temporal_unit(
+    df: pl.DataFrame, temporal_unit: str, state_path: Optional[Path] = None
+) -> pl.DataFrame:
+    """Trailing means of the measurements over `temporal_unit` at every reading.
+
+    With a `state_path` the means are computed incrementally: only the readings after those of the previous call with
+    the same path are aggregated, against the running state persisted there, and all means aggregated so far are
+    returned. They are identical to a full recompute of all readings passed so far.
+    """
+    aggs = [pl.col(column).mean() for column in MEASUREMENT_COLUMNS]
+    if state_path is None:
+        return blocked_rolling(df, "Datetime", temporal_unit, aggs)
+    aggregation = IncrementalRollingAggregation(state_path, "Datetime", temporal_unit, aggs)
+    appended = aggregation.update(df)
+    return aggregation.read() if aggregation.committed_parts() else appended
+
+
+class RollingAverageConfig(Config):
+    """With `incremental` only the readings newer than the previous materialization of a partition are averaged.
+
+    The running state of a partition is kept in `state_directory`, by default next to the partition in the datalake.
+    """
+
+    incremental: bool = False
+    state_directory: str = str(DATALAKE_DIRECTORY)
+
+
+def rolling_state_path(state_directory: Path, key: AssetKey, partition_key: Optional[str]) -> Path:
+    """Directory of the incremental aggregation of an asset (partition), beside its `<partition>.parquet` file"""
+    path = state_directory.joinpath(*key.path)
+    return path / f"{partition_key}.rolling" if partition_key is not None else path.with_name(f"{path.name}.rolling")
 
 
 @asset(
-    code_version="2",
+    code_version="1",
+    io_manager_key="local_polars_parquet_io_manager",
+    ins={"timeseries_example_cleaned": AssetIn(timeseries_example_cleaned.key, metadata={"columns": ["Datetime"]})},
+    key_prefix=[DATASET_PREFIX, FEATURES_PREFIX],
+    partitions_def=timeseries_partitions_def,
+    metadata={"partition_expr": "Datetime"},
+)
+@instrumented
+def timeseries_calendar_features(timeseries_example_cleaned: pl.DataFrame):
+    """Feature table of the calendar features of the readings, sorted by Datetime."""
+    df = feature_table(timeseries_example_cleaned, calendar_features("Datetime"))
+    return Output(df, metadata=memory_metadata(df))
+
+
+@asset(
+    code_version="6",
     io_manager_key="local_polars_parquet_io_manager",
-    ins={"timeseries_example_cleaned": AssetIn(timeseries_example_cleaned.key)},
+    ins={
+        "timeseries_calendar_features": AssetIn(timeseries_calendar_features.key),
+        "timeseries_example_cleaned": AssetIn(
+            timeseries_example_cleaned.key,
+            # Skip the raw Date and Time string columns
+            metadata={"columns": ["Datetime", *MEASUREMENT_COLUMNS]},
+            # Include the previous partition, so the trailing windows at the start of a partition are complete
+            partition_mapping=TimeWindowPartitionMapping(start_offset=-1, allow_nonexistent_upstream_partitions=True),
+        ),
+    },
     key_prefix=[DATASET_PREFIX, "dataset"],
+    partitions_def=timeseries_partitions_def,
+    metadata={"partition_expr": "Datetime"},
 )
-def timeseries_average_per_day(timeseries_example_cleaned: pl.DataFrame):
-    df = average_global_active_power_per_temporal_unit(timeseries_example_cleaned, "1d")
-    return df.with_columns(
-        pl.col("Datetime").dt.weekday().alias("weekday"),
-        pl.col("Datetime").dt.day().alias("day_of_month"),
-        pl.col("Datetime").dt.ordinal_day().alias("day_of_year"),
-        pl.col("Datetime").dt.hour().alias("hour"),
-        pl.col("Datetime").dt.minute().alias("minute"),
+@instrumented
+def timeseries_average_per_day(
+    context: AssetExecutionContext,
+    config: RollingAverageConfig,
+    timeseries_calendar_features: pl.DataFrame,
+    timeseries_example_cleaned: pl.DataFrame,
+):
+    state_path = None
+    if config.incremental:
+        partition_key = context.partition_key if context.has_partition_key else None
+        state_path = rolling_state_path(Path(config.state_directory), context.asset_key, partition_key)
+    df = average_global_active_power_per_temporal_unit(timeseries_example_cleaned, "1d", state_path)
+    window = partition_window(context)
+    if window is not None:
+        df = df.filter(pl.col("Datetime").is_between(*window, closed="left"))
+    # The averages are per reading, the feature table holds a row of every reading of the partition
+    df = point_in_time_join(df, timeseries_calendar_features, tolerance=timedelta(0))
+    return Output(df, metadata=memory_metadata(df))
+
+
+def aggregates_partition_mapping(config: Optional[PartitionsConfig]) -> TimeWindowPartitionMapping:
+    """Mapping of a partition of the tumbling aggregates to the cleaned partitions holding its windows.
+
+    Besides its own partition, a partition reads the preceding partitions holding the start of the longest window
+    ending in it, e.g. the 7 preceding days of daily partitions for weeks.
+    """
+    return TimeWindowPartitionMapping(
+        start_offset=-lookback_partitions(config, PYRAMID_LONGEST_WINDOW), allow_nonexistent_upstream_partitions=True
     )
 
 
+def tumbling_aggregates(
+    df: pl.DataFrame, window: Optional[Tuple[datetime, datetime]] = None
+) -> Mapping[str, pl.DataFrame]:
+    """Tumbling aggregates of the measurements per pyramid level, of the windows ending in the [start, end) `window`.
+
+    `df` must hold the readings since the start of the longest window ending in `window`, as the partitions of
+    `aggregates_partition_mapping` do.
+    """
+    if window is not None:
+        df = df.filter(pl.col("Datetime") >= window[0] - PYRAMID_LONGEST_WINDOW)
+    pyramid = tumbling_pyramid(df, "Datetime", MEASUREMENT_COLUMNS)
+    if window is None:
+        return pyramid
+    aggregates = {}
+    for level, every in PYRAMID_LEVELS.items():
+        end = pl.col("Datetime").dt.offset_by(every)
+        aggregates[level] = pyramid[level].filter((end > window[0]) & (end <= window[1]))
+    return aggregates
+
+
+@multi_asset(
+    outs={
+        f"timeseries_aggregate_{level}": AssetOut(
+            key_prefix=[DATASET_PREFIX, "dataset"],
+            io_manager_key="local_polars_parquet_io_manager",
+            metadata={"partition_expr": "Datetime"},
+            code_version="1",
+        )
+        for level in PYRAMID_LEVELS
+    },
+    ins={
+        "timeseries_example_cleaned": AssetIn(
+            timeseries_example_cleaned.key,
+            metadata={"columns": ["Datetime", *MEASUREMENT_COLUMNS]},
+            # Include the preceding partitions, for the weeks starting in them
+            partition_mapping=aggregates_partition_mapping(timeseries_example_dataset.config.partitions),
+        )
+    },
+    partitions_def=timeseries_partitions_def,
+)
+@instrumented
+def timeseries_aggregates(context: AssetExecutionContext, timeseries_example_cleaned: pl.DataFrame):
+    """Tumbling mean, min, max and count of the measurements per minute, hour, day and week.
+
+    Every level is derived from the level below it. A partition holds the windows ending in its time window, so
+    weeks spanning several partitions are complete and stored once.
+    """
+    aggregates = tumbling_aggregates(timeseries_example_cleaned, partition_window(context))
+    for level, aggregate in aggregates.items():
+        yield Output(aggregate, output_name=f"timeseries_aggregate_{level}", metadata=memory_metadata(aggregate))
+
+
 class TrainTestConfig(Config):
     train: float = 0.8
     test: float = 0.2
@@ -126,3 +371,64 @@ class TrainTestConfig(Config):
         test_index = int(self.test * df.height)
         assert train_index + test_index == df.height
         return df[:train_index], df[train_index:]
+
+    def folds(self, rows: int) -> List["Fold"]:
+        """The split as the single fold of a backtest"""
+        train_index = int(self.train * rows)
+        return [Fold(0, slice(0, train_index), slice(train_index, rows))]
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Train and test rows of a backtest fold, as ranges of the rows sorted by time"""
+
+    index: int
+    train: slice
+    test: slice
+
+
+class BacktestConfig(Config):
+    """Rolling origin backtest folds, in rows of a time sorted dataset.
+
+    The first fold trains on `train_rows` rows, every following fold moves the origin `step` rows (by default the
+    `horizon`) further. An expanding window trains on all rows before the origin, a sliding window on the last
+    `train_rows`. Each fold tests on the `horizon` rows after the origin, skipping `gap` rows in between, so the
+    test rows are embargoed from train rows whose targets overlap them (e.g. trailing means). With `max_folds` only
+    the most recent folds are kept.
+    """
+
+    window: Literal["expanding", "sliding"] = "expanding"
+    train_rows: int
+    horizon: int
+    step: Optional[int] = None
+    gap: int = 0
+    max_folds: Optional[int] = None
+
+    @model_validator(mode="after")
+    def validate_sizes(self) -> "BacktestConfig":
+        if self.train_rows < 1 or self.horizon < 1 or (self.step is not None and self.step < 1):
+            raise ValueError("Train rows, horizon and step must be positive")
+        if self.gap < 0:
+            raise ValueError("The gap can not be negative")
+        return self
+
+    def folds(self, rows: int) -> List[Fold]:
+        step = self.step or self.horizon
+        origins = range(self.train_rows, rows - self.gap - self.horizon + 1, step)
+        if self.max_folds is not None:
+            origins = origins[len(origins) - min(self.max_folds, len(origins)) :]
+        if not origins:
+            raise ValueError(f"{rows} rows are too few for a fold of {self.train_rows + self.gap + self.horizon} rows")
+        return [
+            Fold(
+                index,
+                slice(0 if self.window == "expanding" else origin - self.train_rows, origin),
+                slice(origin + self.gap, origin + self.gap + self.horizon),
+            )
+            for index, origin in enumerate(origins)
+        ]
+
+    def apply_folds(self, df: pl.DataFrame) -> Iterator[Tuple[pl.DataFrame, pl.DataFrame]]:
+        """Train and test frames of every fold, slices of `df` without copies"""
+        for fold in self.folds(df.height):
+            yield df[fold.train], df[fold.test]
@@ -1,16 +1,32 @@
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
+from ml_cookie_cutter.data.catalog import DatasetCatalog, DatasetEntry
 from ml_cookie_cutter.data.constants import DATALAKE_DIRECTORY, DATASET_PREFIX, DATASET_PREFIX_TIMESERIES
 
+DATASET_SUFFIXES = (".parquet", ".arrow")
+
 
 class Project:
     def __init__(self, name: str, description: Optional[str] = None) -> None:
         self.name = name
         self.description = description
 
-    def get_datasets(self) -> list[Path]:
-        return list((DATALAKE_DIRECTORY / self.name / DATASET_PREFIX).rglob("*.parquet"))
+    def get_dataset_entries(self, catalog: Optional[DatasetCatalog] = None) -> List[DatasetEntry]:
+        """Catalog entries of the datasets materialized for the project"""
+        catalog = catalog or DatasetCatalog()
+        return catalog.datasets(asset_key_prefix=f"{self.name}/{DATASET_PREFIX}")
+
+    def get_datasets(self, catalog: Optional[DatasetCatalog] = None) -> list[Path]:
+        catalog = catalog or DatasetCatalog()
+        if catalog.exists():
+            return [Path(entry.path) for entry in self.get_dataset_entries(catalog)]
+        # Datalakes materialized before the catalog existed
+        return [
+            path
+            for path in (DATALAKE_DIRECTORY / self.name / DATASET_PREFIX).rglob("*")
+            if path.suffix in DATASET_SUFFIXES
+        ]
 
     def __eq__(self, __value: object) -> bool:
         if isinstance(__value, str):
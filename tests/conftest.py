@@ -0,0 +1,28 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from dagster import MetadataValue
+
+from ml_cookie_cutter.data.synthetic import write_household_power
+from ml_cookie_cutter.orchestration.timeseries_example import timeseries_example_asset, timeseries_example_dataset
+
+# Readings from 2006-12-16 into February 2007, so the first two monthly partitions are complete
+SYNTHETIC_ROWS = 80_000
+
+
+@pytest.fixture(scope="session", autouse=True)
+def synthetic_raw_data(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Path]:
+    """Synthetic readings in place of the raw dataset, which is a git-lfs pointer unless its object is pulled.
+
+    The timeseries example dataset, and through the asset path metadata of its source asset the
+    `SourceAssetPolarsIOManager`, read the synthetic file for the whole session.
+    """
+    directory = tmp_path_factory.mktemp("raw")
+    path = write_household_power(directory / timeseries_example_dataset.config.asset, SYNTHETIC_ROWS)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(timeseries_example_dataset, "root_path", directory)
+        # Copies of the source asset, e.g. with resources bound by `materialize`, are made from its raw metadata
+        monkeypatch.setitem(timeseries_example_asset.raw_metadata, "asset_path", path)
+        monkeypatch.setitem(timeseries_example_asset.metadata, "asset_path", MetadataValue.path(path))
+        yield path
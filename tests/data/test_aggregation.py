@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.data.aggregation import (
+    PYRAMID_LEVELS,
+    IncrementalRollingAggregation,
+    blocked_rolling,
+    tumbling_pyramid,
+)
+from ml_cookie_cutter.data.raw import PartitionsConfig
+from ml_cookie_cutter.orchestration.partitions import naive_window, time_window_partitions
+from ml_cookie_cutter.orchestration.timeseries_example import (
+    MEASUREMENT_COLUMNS,
+    aggregates_partition_mapping,
+    average_global_active_power_per_temporal_unit,
+    tumbling_aggregates,
+)
+
+
+@pytest.fixture
+def measurements() -> pl.DataFrame:
+    rows = 90 * 24 * 6
+    rng = np.random.default_rng(0)
+    start = datetime(2006, 12, 16, 17, 24)
+    return pl.DataFrame(
+        {
+            "Datetime": pl.datetime_range(start, start + timedelta(minutes=10 * (rows - 1)), "10m", eager=True),
+            **{column: rng.uniform(0, 5, rows) for column in MEASUREMENT_COLUMNS},
+        }
+    )
+
+
+def incremental_average(output_path: Path, temporal_unit: str) -> IncrementalRollingAggregation:
+    aggs = [pl.col(column).mean() for column in MEASUREMENT_COLUMNS]
+    return IncrementalRollingAggregation(output_path, "Datetime", temporal_unit, aggs)
+
+
+@pytest.mark.parametrize("temporal_unit", ["1h", "1d"])
+def test_incremental_matches_full_recompute(measurements: pl.DataFrame, tmp_path: Path, temporal_unit: str):
+    full = average_global_active_power_per_temporal_unit(measurements, temporal_unit)
+
+    aggregation = incremental_average(tmp_path / "average", temporal_unit)
+    # Uneven batches crossing block boundaries, with an already aggregated row repeated
+    for start, end in [(0, 1000), (999, 5000), (5000, 5001), (5001, measurements.height)]:
+        aggregation.update(measurements[start:end])
+
+    assert aggregation.committed_parts() == 4
+    assert aggregation.read().frame_equal(full)
+
+
+def test_interrupted_incremental_update_is_retried(
+    measurements: pl.DataFrame, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    aggregation = incremental_average(tmp_path / "average", "1d")
+    aggregation.update(measurements[:5000])
+
+    def fail(parts: int, frame: pl.DataFrame):
+        raise OSError("Interrupted before the commit")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(aggregation, "_commit", fail)
+        with pytest.raises(OSError):
+            aggregation.update(measurements[5000:])
+    # The written part is not committed, and the retry replaces it
+    assert aggregation.part_path(2).exists() and aggregation.committed_parts() == 1
+    assert aggregation.read().height == 5000
+    aggregation.update(measurements[5000:])
+    assert aggregation.read().frame_equal(average_global_active_power_per_temporal_unit(measurements, "1d"))
+
+
+def test_blocked_rolling_matches_rolling(measurements: pl.DataFrame):
+    aggs = [pl.col("Voltage").mean()]
+    blocked = blocked_rolling(measurements, "Datetime", "1d", aggs)
+    rolling = measurements.rolling("Datetime", period="1d").agg(*aggs)
+    assert blocked["Datetime"].series_equal(rolling["Datetime"])
+    assert np.allclose(blocked["Voltage"].to_numpy(), rolling["Voltage"].to_numpy())
+
+
+def test_blocked_rolling_rejects_period_longer_than_block(measurements: pl.DataFrame):
+    with pytest.raises(ValueError):
+        blocked_rolling(measurements, "Datetime", "2d", [pl.col("Voltage").mean()], block_every="1d")
+
+
+def test_tumbling_pyramid_matches_direct_aggregation(measurements: pl.DataFrame):
+    # Null every 7th reading, so the counts differ between windows
+    measurements = measurements.with_columns(
+        pl.when(pl.int_range(0, pl.count()) % 7 == 0).then(None).otherwise(pl.col("Voltage")).alias("Voltage")
+    )
+    pyramid = tumbling_pyramid(measurements, "Datetime", ["Voltage"])
+    assert list(pyramid) == list(PYRAMID_LEVELS)
+    for level, every in PYRAMID_LEVELS.items():
+        expected = measurements.group_by_dynamic("Datetime", every=every).agg(
+            pl.col("Voltage").mean().alias("Voltage_mean"),
+            pl.col("Voltage").min().alias("Voltage_min"),
+            pl.col("Voltage").max().alias("Voltage_max"),
+            pl.col("Voltage").is_not_null().sum().alias("Voltage_count"),
+        )
+        assert pyramid[level].drop("Voltage_mean").frame_equal(expected.drop("Voltage_mean"))
+        assert (pyramid[level]["Voltage_mean"] - expected["Voltage_mean"]).abs().max() < 1e-9
+
+
+def test_daily_partitioned_aggregates_match_unpartitioned(measurements: pl.DataFrame):
+    config = PartitionsConfig(schedule="daily", start_date="2006-12-16", end_date="2007-01-20")
+    partitions_def = time_window_partitions(config)
+    assert partitions_def is not None
+    mapping = aggregates_partition_mapping(config)
+
+    partitions = []
+    for partition_key in partitions_def.get_partition_keys():
+        upstream = mapping.get_upstream_mapped_partitions_result_for_partitions(
+            partitions_def.subset_with_partition_keys([partition_key]), partitions_def
+        )
+        upstream_windows = [
+            naive_window(partitions_def.time_window_for_partition_key(key))
+            for key in upstream.partitions_subset.get_partition_keys()
+        ]
+        # The cleaned partitions the partition reads
+        df = measurements.filter(
+            pl.col("Datetime").is_between(upstream_windows[0][0], upstream_windows[-1][1], closed="left")
+        )
+        window = naive_window(partitions_def.time_window_for_partition_key(partition_key))
+        partitions.append(tumbling_aggregates(df, window))
+
+    pyramid = tumbling_aggregates(measurements)
+    end = datetime(2007, 1, 20)
+    for level, every in PYRAMID_LEVELS.items():
+        expected = pyramid[level].filter(pl.col("Datetime").dt.offset_by(every) <= end)
+        assert pl.concat([partition[level] for partition in partitions]).frame_equal(expected)
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.data.cache import RawSnapshotCache
+
+READ_KWARGS = {"separator": ";", "null_values": ["?"]}
+
+
+@pytest.fixture
+def raw_csv(tmp_path: Path) -> Path:
+    path = tmp_path / "raw.txt"
+    path.write_text("Date;Time;Voltage\n16/12/2006;17:24:00;234.84\n16/12/2006;17:25:00;?\n")
+    return path
+
+
+def test_cache_snapshots_and_hits(raw_csv: Path, tmp_path: Path):
+    cache = RawSnapshotCache(tmp_path / "cache")
+    df = cache.load(raw_csv, READ_KWARGS)
+    assert len(cache.entries()) == 1
+
+    cached = cache.load(raw_csv, READ_KWARGS)
+    assert cached.frame_equal(df)
+    assert isinstance(cache.load(raw_csv, READ_KWARGS, lazy=True), pl.LazyFrame)
+    assert len(cache.entries()) == 1
+
+
+def test_cache_streaming_snapshot(raw_csv: Path, tmp_path: Path):
+    cache = RawSnapshotCache(tmp_path / "cache")
+    df = cache.load(raw_csv, READ_KWARGS)
+    streamed = cache.load(raw_csv, READ_KWARGS, streaming=True)
+    assert isinstance(streamed, pl.LazyFrame)
+    assert streamed.collect().frame_equal(df)
+    assert sorted(entry.path.suffix for entry in cache.entries()) == [".arrow", ".parquet"]
+
+
+def test_cache_key_changes_with_content_and_kwargs(raw_csv: Path, tmp_path: Path):
+    cache = RawSnapshotCache(tmp_path / "cache")
+    key = cache.key(raw_csv, READ_KWARGS)
+    assert cache.key(raw_csv, {**READ_KWARGS, "null_values": ["NA"]}) != key
+
+    raw_csv.write_text("Date;Time;Voltage\n16/12/2006;17:24:00;230.00\n")
+    assert cache.key(raw_csv, READ_KWARGS) != key
+
+
+def test_cache_evicts_least_recently_used(raw_csv: Path, tmp_path: Path):
+    cache = RawSnapshotCache(tmp_path / "cache")
+    cache.load(raw_csv, READ_KWARGS)
+    cache.load(raw_csv, {**READ_KWARGS, "null_values": ["NA"]})
+    newest = cache.entries()[0]
+
+    cache.max_bytes = newest.size
+    cache.evict()
+    assert [entry.key for entry in cache.entries()] == [newest.key]
+
+    cache.purge()
+    assert cache.entries() == []
+
+
+def test_cache_memoizes_values_per_key(raw_csv: Path, tmp_path: Path):
+    cache = RawSnapshotCache(tmp_path / "cache")
+    key = cache.key(raw_csv, READ_KWARGS)
+    calls = []
+
+    def compute():
+        calls.append(key)
+        return {"2006-12-01": "fingerprint"}
+
+    assert cache.memo(key, "fingerprints", compute) == {"2006-12-01": "fingerprint"}
+    assert cache.memo(key, "fingerprints", compute) == {"2006-12-01": "fingerprint"}
+    assert len(calls) == 1
+
+    cache.purge()
+    cache.memo(key, "fingerprints", compute)
+    assert len(calls) == 2
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from ml_cookie_cutter.data.catalog import DatasetCatalog, DatasetEntry
+from ml_cookie_cutter.projects import Project
+
+
+def entry(path: str, asset_key: str, partition_key: str, row_count: int = 10) -> DatasetEntry:
+    return DatasetEntry(
+        path=path,
+        asset_key=asset_key,
+        partition_key=partition_key,
+        schema={"Datetime": "Datetime(time_unit='us', time_zone=None)"},
+        row_count=row_count,
+        byte_size=100,
+    )
+
+
+def test_catalog_records_and_replaces(tmp_path: Path):
+    catalog = DatasetCatalog(tmp_path / "catalog.sqlite")
+    assert not catalog.exists() and catalog.datasets() == []
+
+    catalog.record(entry("a/2006-12-01.parquet", "timeseries/dataset/a", "2006-12-01"))
+    catalog.record(entry("a/2006-12-01.parquet", "timeseries/dataset/a", "2006-12-01", row_count=20))
+    catalog.record(entry("b.parquet", "timeseries/b", "2006-12-01"))
+
+    (recorded,) = catalog.datasets("timeseries/dataset")
+    assert recorded.row_count == 20
+    assert recorded.schema == {"Datetime": "Datetime(time_unit='us', time_zone=None)"}
+    assert len(catalog.datasets("timeseries")) == 2
+    assert catalog.datasets("timeseries/dat") == []
+
+    catalog.remove("b.parquet")
+    assert len(catalog.datasets()) == 1
+
+
+def test_project_datasets_from_catalog(tmp_path: Path):
+    catalog = DatasetCatalog(tmp_path / "catalog.sqlite")
+    catalog.record(entry("missing/2006-12-01.parquet", "timeseries/dataset/a", "2006-12-01"))
+    catalog.record(entry("other.parquet", "other/dataset/a", "2006-12-01"))
+    assert Project("timeseries").get_datasets(catalog) == [Path("missing/2006-12-01.parquet")]
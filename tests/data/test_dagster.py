@@ -1,24 +1,54 @@
 import shutil
+from datetime import datetime
 from pathlib import Path
-from typing import Iterator, Tuple
+from typing import Iterator, List, Tuple
 
 import duckdb
 import polars as pl
+import pyarrow.parquet as pq
 import pytest
-from dagster import materialize
+from dagster import MonthlyPartitionsDefinition, build_input_context, build_output_context, materialize
 from dagster_duckdb_polars import DuckDBPolarsIOManager
+from upath import UPath
 
+from ml_cookie_cutter.data.aggregation import PYRAMID_LEVELS, IncrementalRollingAggregation, tumbling_pyramid
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES
+from ml_cookie_cutter.data.catalog import DatasetCatalog, DatasetEntry
+from ml_cookie_cutter.data.constants import CATALOG_NAME
+from ml_cookie_cutter.data.dtypes import polars_schema
+from ml_cookie_cutter.data.synthetic import write_household_power
+from ml_cookie_cutter.orchestration import duckdb_io_managers
+from ml_cookie_cutter.orchestration.duckdb_io_managers import DuckDBPolarsArrowIOManager
 from ml_cookie_cutter.orchestration.io_managers import (
+    LocalPolarsIPCIOManager,
     LocalPolarsParquetIOManager,
+    PolarsParquetIOManager,
+    PolarsUPathIOManager,
     SourceAssetPolarsIOManager,
 )
+from ml_cookie_cutter.orchestration.materialize import TIMESERIES_ASSETS
+from ml_cookie_cutter.orchestration.partitions import (
+    missing_or_stale_partition_keys,
+    partition_data_versions,
+    partition_fingerprints,
+)
 from ml_cookie_cutter.orchestration.timeseries_example import (
+    MEASUREMENT_COLUMNS,
+    average_global_active_power_per_temporal_unit,
+    rolling_state_path,
+    timeseries_aggregates,
+    timeseries_average_per_day,
+    timeseries_calendar_features,
     timeseries_example_asset,
     timeseries_example_cleaned,
+    timeseries_example_dataset,
     timeseries_example_df,
+    timeseries_partitions_def,
+    timeseries_window,
 )
 
 PERSIST_TEST_DATA = True
+PARTITION_KEY = "2006-12-01"
 
 
 @pytest.fixture
@@ -50,7 +80,26 @@ class TestTimeseriesMaterialization:
             [timeseries_example_asset, timeseries_example_df],
             resources={"source_asset_polars_io_manager": SourceAssetPolarsIOManager()},
         )
-        assert isinstance(result.asset_value(timeseries_example_df.key), pl.DataFrame)
+        df = result.asset_value(timeseries_example_df.key)
+        assert isinstance(df, pl.DataFrame)
+        assert df.schema["Voltage"] == pl.Float32
+
+        (materialization,) = result.asset_materializations_for_node(timeseries_example_df.node_def.name)
+        assert materialization.metadata["memory_saved_mb"].value > 0
+
+    def test_lazy_df_materialization(self):
+        result = materialize(
+            [timeseries_example_asset, timeseries_example_df],
+            resources={"source_asset_polars_io_manager": SourceAssetPolarsIOManager(lazy=True)},
+        )
+        assert isinstance(result.asset_value(timeseries_example_df.key), pl.LazyFrame)
+
+    def test_downcast_df_materialization(self):
+        result = materialize(
+            [timeseries_example_asset, timeseries_example_df],
+            resources={"source_asset_polars_io_manager": SourceAssetPolarsIOManager(lazy=True, downcast=True)},
+        )
+        assert pl.Float64 not in result.asset_value(timeseries_example_df.key).schema.values()
 
     def test_duckdb_materialization(self, duckdb_persisted_db: Tuple[str, duckdb.DuckDBPyConnection]):
         db, conn = duckdb_persisted_db
@@ -62,20 +111,321 @@ class TestTimeseriesMaterialization:
                 "local_polars_parquet_io_manager": duckdb_resource,
                 # overwrite default io manager of timeseries_example_cleaned to be a duckdb resource
             },
+            partition_key=PARTITION_KEY,
         )
 
         df = conn.sql("SELECT * FROM timeseries.timeseries_example_cleaned").pl()
         assert isinstance(df, pl.DataFrame)
 
+    def test_duckdb_arrow_materialization(
+        self, duckdb_persisted_db: Tuple[str, duckdb.DuckDBPyConnection], monkeypatch: pytest.MonkeyPatch
+    ):
+        db, conn = duckdb_persisted_db
+        connections = []
+        duckdb_connect = duckdb.connect
+
+        def connect(*args, **kwargs):
+            connections.append(duckdb_connect(*args, **kwargs))
+            return connections[-1]
+
+        monkeypatch.setattr(duckdb_io_managers.duckdb, "connect", connect)
+        materialize(
+            [
+                timeseries_example_asset,
+                timeseries_example_df,
+                timeseries_example_cleaned,
+                timeseries_calendar_features,
+                timeseries_average_per_day,
+            ],
+            resources={
+                "source_asset_polars_io_manager": SourceAssetPolarsIOManager(),
+                "local_polars_parquet_io_manager": DuckDBPolarsArrowIOManager(database=db),
+            },
+            partition_key=PARTITION_KEY,
+        )
+
+        assert len(connections) == 1
+        cleaned = conn.sql("SELECT * FROM timeseries.timeseries_example_cleaned").pl()
+        average = conn.sql("SELECT * FROM dataset.timeseries_average_per_day").pl()
+        assert average.height == cleaned.height > 0
+
     def test_local_parquet_materialization(
         self, local_parquet_persisted_io_manager: Tuple[LocalPolarsParquetIOManager, Path]
     ):
         io_manager, folder = local_parquet_persisted_io_manager
-        materialize(
+        result = materialize(
             [timeseries_example_asset, timeseries_example_df, timeseries_example_cleaned],
             resources={
                 "source_asset_polars_io_manager": SourceAssetPolarsIOManager(),
                 "local_polars_parquet_io_manager": io_manager,
             },
+            partition_key=PARTITION_KEY,
+        )
+        assert (folder / "timeseries" / "timeseries_example_cleaned" / f"{PARTITION_KEY}.parquet").exists()
+
+        (materialization,) = result.asset_materializations_for_node(timeseries_example_cleaned.node_def.name)
+        for key in ["rows_in", "rows_out", "compute_wall_seconds", "handle_output_cpu_seconds", "bytes_written"]:
+            assert key in materialization.metadata
+
+        checks = {evaluation.check_name: evaluation.passed for evaluation in result.get_asset_check_evaluations()}
+        assert checks == {
+            "has_no_nulls": True,
+            "index_is_monotonic": True,
+            "index_has_no_duplicates": True,
+            "values_in_range": True,
+            # Gaps are measured before the cleaning drops readings with missing values
+            "index_has_no_gaps": True,
+        }
+
+    def test_lazy_local_parquet_materialization(
+        self, local_parquet_persisted_io_manager: Tuple[LocalPolarsParquetIOManager, Path]
+    ):
+        io_manager, folder = local_parquet_persisted_io_manager
+        assets = [timeseries_example_asset, timeseries_example_df, timeseries_example_cleaned]
+        materialize(
+            assets,
+            resources={
+                "source_asset_polars_io_manager": SourceAssetPolarsIOManager(),
+                "local_polars_parquet_io_manager": io_manager,
+            },
+            partition_key=PARTITION_KEY,
+        )
+        eager = pl.read_parquet(folder / "timeseries" / "timeseries_example_cleaned" / f"{PARTITION_KEY}.parquet")
+        materialize(
+            assets,
+            resources={
+                "source_asset_polars_io_manager": SourceAssetPolarsIOManager(lazy=True),
+                "local_polars_parquet_io_manager": io_manager,
+            },
+            partition_key=PARTITION_KEY,
+        )
+        lazy = pl.read_parquet(folder / "timeseries" / "timeseries_example_cleaned" / f"{PARTITION_KEY}.parquet")
+        assert lazy.frame_equal(eager)
+
+    def test_streaming_local_parquet_materialization(self, test_fixture_output: Path, tmp_path: Path):
+        assets = [timeseries_example_asset, timeseries_example_df, timeseries_example_cleaned]
+        path = test_fixture_output / "timeseries" / "timeseries_example_cleaned" / f"{PARTITION_KEY}.parquet"
+        materialize(
+            assets,
+            resources={
+                "source_asset_polars_io_manager": SourceAssetPolarsIOManager(),
+                "local_polars_parquet_io_manager": LocalPolarsParquetIOManager(base_path=str(test_fixture_output)),
+            },
+            partition_key=PARTITION_KEY,
+        )
+        eager = pl.read_parquet(path)
+        result = materialize(
+            assets,
+            resources={
+                "source_asset_polars_io_manager": SourceAssetPolarsIOManager(
+                    use_raw_cache=True, raw_cache_directory=str(tmp_path), streaming=True
+                ),
+                "local_polars_parquet_io_manager": LocalPolarsParquetIOManager(
+                    base_path=str(test_fixture_output), streaming=True
+                ),
+            },
+            partition_key=PARTITION_KEY,
+            run_config={"ops": {timeseries_example_cleaned.node_def.name: {"config": {"streaming": True}}}},
+        )
+        assert isinstance(result.asset_value(timeseries_example_df.key), pl.LazyFrame)
+        assert list(tmp_path.glob("*.parquet"))
+        assert pl.read_parquet(path).frame_equal(eager)
+
+        (materialization,) = result.asset_materializations_for_node(timeseries_example_cleaned.node_def.name)
+        assert materialization.metadata["rows_after_clean"].value == eager.height
+        (entry,) = DatasetCatalog(test_fixture_output / CATALOG_NAME).datasets("timeseries/timeseries_example_cleaned")
+        assert entry.row_count == eager.height
+
+    def test_partitioned_materialization(
+        self, local_parquet_persisted_io_manager: Tuple[LocalPolarsParquetIOManager, Path]
+    ):
+        io_manager, folder = local_parquet_persisted_io_manager
+        assert timeseries_partitions_def is not None
+        partition_keys = timeseries_partitions_def.get_partition_keys()[:2]
+        asset_keys = [timeseries_example_cleaned.key, timeseries_average_per_day.key]
+        assert missing_or_stale_partition_keys(timeseries_partitions_def, folder, asset_keys)[:2] == partition_keys
+
+        assets = [
+            timeseries_example_asset,
+            timeseries_example_df,
+            timeseries_example_cleaned,
+            timeseries_calendar_features,
+            timeseries_average_per_day,
+            timeseries_aggregates,
+        ]
+        for partition_key in partition_keys:
+            materialize(
+                assets,
+                resources={
+                    "source_asset_polars_io_manager": SourceAssetPolarsIOManager(),
+                    "local_polars_parquet_io_manager": io_manager,
+                },
+                partition_key=partition_key,
+            )
+
+        cleaned = pl.read_parquet(folder / "timeseries" / "timeseries_example_cleaned" / "*.parquet")
+        average = pl.read_parquet(folder / "timeseries" / "dataset" / "timeseries_average_per_day" / "*.parquet")
+        expected = average_global_active_power_per_temporal_unit(cleaned, "1d")
+        assert average.select(expected.columns).frame_equal(expected)
+        features = pl.read_parquet(folder / "timeseries" / "features" / "timeseries_calendar_features" / "*.parquet")
+        assert features.columns == ["Datetime", *CALENDAR_FEATURES] and features["Datetime"].is_sorted()
+        assert average.select(features.columns).frame_equal(features)
+
+        # Windows ending in the materialized partitions, each stored once
+        pyramid = tumbling_pyramid(cleaned, "Datetime", MEASUREMENT_COLUMNS)
+        end = datetime.fromisoformat(timeseries_partitions_def.get_partition_keys()[2])
+        for level, every in PYRAMID_LEVELS.items():
+            aggregate = pl.read_parquet(
+                folder / "timeseries" / "dataset" / f"timeseries_aggregate_{level}" / "*.parquet"
+            )
+            assert aggregate.frame_equal(pyramid[level].filter(pl.col("Datetime").dt.offset_by(every) <= end))
+        assert partition_keys[0] not in missing_or_stale_partition_keys(timeseries_partitions_def, folder, asset_keys)
+
+        entries = DatasetCatalog(folder / CATALOG_NAME).datasets("timeseries/dataset/timeseries_average_per_day")
+        assert {entry.asset_key for entry in entries} == {"timeseries/dataset/timeseries_average_per_day"}
+        assert [entry.partition_key for entry in entries] == partition_keys
+        assert sum(entry.row_count for entry in entries) == average.height
+        assert entries[0].schema["Datetime"].startswith("Datetime")
+        assert entries[0].min_timestamp < entries[0].max_timestamp < entries[1].min_timestamp
+
+        catalog = DatasetCatalog(folder / CATALOG_NAME)
+        all_partition_keys = timeseries_partitions_def.get_partition_keys()
+        data_versions = {key: {partition_key: "v1" for partition_key in all_partition_keys} for key in asset_keys}
+        for key in asset_keys:
+            for partition_key in partition_keys:
+                catalog.set_data_version("/".join(key.path), partition_key, "v1")
+        stale = missing_or_stale_partition_keys(
+            timeseries_partitions_def, folder, asset_keys, data_versions=data_versions
+        )
+        assert stale == timeseries_partitions_def.get_partition_keys()[2:]
+        data_versions[timeseries_average_per_day.key] = {key: "v2" for key in partition_keys}
+        stale = missing_or_stale_partition_keys(
+            timeseries_partitions_def, folder, asset_keys, data_versions=data_versions
         )
-        assert (folder / "timeseries" / "timeseries_example_cleaned.parquet").exists()
+        assert stale[:2] == partition_keys
+
+    def test_appended_readings_only_stale_their_partition(self, synthetic_raw_data: Path, tmp_path: Path):
+        partitions_def = MonthlyPartitionsDefinition(start_date="2006-12-01", end_date="2007-03-01")
+        read_kwargs = {
+            **timeseries_example_dataset.pl_read_kwargs,
+            "dtypes": polars_schema(timeseries_example_dataset.dtypes),
+        }
+        readings = timeseries_window(pl.scan_csv(synthetic_raw_data, **read_kwargs))
+        asset_keys = [key for asset in TIMESERIES_ASSETS if asset.partitions_def is not None for key in asset.keys]
+
+        def data_versions(rows: int):
+            fingerprints = partition_fingerprints(readings.head(rows), partitions_def)
+            return partition_data_versions(
+                TIMESERIES_ASSETS, partitions_def, {timeseries_example_asset.key: dict(fingerprints)}
+            )
+
+        # Readings until 2007-02-01 22:43, every partition written with its version
+        written = data_versions(68_000)
+        catalog = DatasetCatalog(tmp_path / CATALOG_NAME)
+        for key in asset_keys:
+            for partition_key in partitions_def.get_partition_keys():
+                path = tmp_path.joinpath(*key.path) / f"{partition_key}.parquet"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+                catalog.record(DatasetEntry(str(path), "/".join(key.path), partition_key))
+                catalog.set_data_version("/".join(key.path), partition_key, written[key][partition_key])
+        assert missing_or_stale_partition_keys(partitions_def, tmp_path, asset_keys, data_versions=written) == []
+
+        # A week of readings appended to the last month
+        appended = data_versions(78_000)
+        stale = missing_or_stale_partition_keys(partitions_def, tmp_path, asset_keys, data_versions=appended)
+        assert stale == ["2007-02-01"]
+
+    def test_incremental_average_refresh_matches_full_recompute(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        assets = [
+            timeseries_example_asset,
+            timeseries_example_df,
+            timeseries_example_cleaned,
+            timeseries_calendar_features,
+            timeseries_average_per_day,
+        ]
+        resources = {
+            "source_asset_polars_io_manager": SourceAssetPolarsIOManager(),
+            "local_polars_parquet_io_manager": LocalPolarsParquetIOManager(base_path=str(tmp_path)),
+        }
+        config = {"incremental": True, "state_directory": str(tmp_path)}
+        run_config = {"ops": {timeseries_average_per_day.node_def.name: {"config": config}}}
+        raw_path = tmp_path / "raw" / timeseries_example_dataset.config.asset
+
+        def materialize_readings(rows: int, partition_keys: List[str]):
+            # Equal chunks, so the readings of the shorter file are a prefix of the longer one
+            write_household_power(raw_path, rows, chunk_rows=2_000)
+            monkeypatch.setitem(timeseries_example_asset.raw_metadata, "asset_path", raw_path)
+            for partition_key in partition_keys:
+                materialize(assets, resources=resources, partition_key=partition_key, run_config=run_config)
+
+        # Readings until 2007-02-01 22:43, then a week of readings appended to the last month
+        materialize_readings(68_000, ["2006-12-01", "2007-01-01", "2007-02-01"])
+        materialize_readings(78_000, ["2007-02-01"])
+
+        state_path = rolling_state_path(tmp_path, timeseries_average_per_day.key, "2007-02-01")
+        assert IncrementalRollingAggregation(state_path, "Datetime", "1d", []).committed_parts() == 2
+        average = pl.read_parquet(tmp_path.joinpath(*timeseries_average_per_day.key.path) / "2007-02-01.parquet")
+        cleaned = pl.read_parquet(tmp_path / "timeseries" / "timeseries_example_cleaned" / "*.parquet")
+        expected = average_global_active_power_per_temporal_unit(cleaned, "1d").filter(
+            pl.col("Datetime") >= datetime(2007, 2, 1)
+        )
+        assert average.height > 0 and average.select(expected.columns).frame_equal(expected)
+
+    def test_local_ipc_materialization(self, test_fixture_output: Path):
+        assets = [timeseries_example_asset, timeseries_example_df, timeseries_example_cleaned]
+        resources = {"source_asset_polars_io_manager": SourceAssetPolarsIOManager()}
+        parquet = LocalPolarsParquetIOManager(base_path=str(test_fixture_output / "parquet"))
+        materialize(
+            assets, resources={**resources, "local_polars_parquet_io_manager": parquet}, partition_key=PARTITION_KEY
+        )
+        path = Path("timeseries") / "timeseries_example_cleaned" / PARTITION_KEY
+        expected = pl.read_parquet(test_fixture_output / "parquet" / path.with_suffix(".parquet"))
+
+        for compression in ["uncompressed", "lz4"]:
+            ipc = LocalPolarsIPCIOManager(base_path=str(test_fixture_output / compression), compression=compression)
+            materialize(
+                assets, resources={**resources, "local_polars_parquet_io_manager": ipc}, partition_key=PARTITION_KEY
+            )
+            assert pl.read_ipc(test_fixture_output / compression / path.with_suffix(".arrow")).frame_equal(expected)
+
+
+class TestPolarsParquetIOManager:
+    @pytest.fixture
+    def parquet_path(self, tmp_path: Path) -> Path:
+        df = pl.DataFrame(
+            {
+                "Datetime": pl.datetime_range(datetime(2007, 1, 1), datetime(2007, 1, 10), "1h", eager=True),
+                "Voltage": range(217),
+                "Date": "01/01/2007",
+            }
+        )
+        io_manager = PolarsParquetIOManager(base_path=UPath(tmp_path), row_group_size=24)
+        io_manager.dump_to_path(build_output_context(), df, UPath(tmp_path / "asset.parquet"))
+        return tmp_path / "asset.parquet"
+
+    def test_load_with_projection_and_filters(self, parquet_path: Path):
+        io_manager = PolarsParquetIOManager(base_path=UPath(parquet_path.parent))
+        context = build_input_context(
+            metadata={
+                "columns": ["Datetime", "Voltage"],
+                "filters": [("Datetime", ">=", "2007-01-09 00:00:00"), ("Voltage", "not in", [200])],
+            }
+        )
+        df = io_manager.load_from_path(context, UPath(parquet_path))
+        assert df.columns == ["Datetime", "Voltage"]
+        assert df.height == 24
+        assert df["Datetime"].min() == datetime(2007, 1, 9)
+
+    def test_written_row_groups_have_statistics(self, parquet_path: Path):
+        metadata = pq.ParquetFile(parquet_path).metadata
+        assert metadata.num_row_groups > 1
+        assert metadata.row_group(0).column(0).statistics is not None
+
+    def test_subclass_without_writers_fails_at_construction(self, tmp_path: Path):
+        class WithoutWriters(PolarsUPathIOManager):
+            def load_from_path(self, context, path):
+                return pl.read_parquet(str(path))
+
+        with pytest.raises(TypeError, match="scan, sink_frame, write_frame"):
+            WithoutWriters(base_path=UPath(tmp_path))
@@ -0,0 +1,25 @@
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.data.dtypes import downcast, memory_metadata, polars_schema
+
+
+def test_polars_schema():
+    assert polars_schema({"a": "Float32", "b": "Int16", "c": "Categorical"}) == {
+        "a": pl.Float32,
+        "b": pl.Int16,
+        "c": pl.Categorical,
+    }
+    with pytest.raises(ValueError):
+        polars_schema({"a": "Float16"})
+
+
+def test_downcast_and_memory_saved():
+    df = pl.DataFrame({"a": list(range(1000)), "b": [1.5] * 1000, "c": ["x", "y"] * 500})
+    compact = downcast(df)
+    assert compact.schema == {"a": pl.Int16, "b": pl.Float32, "c": pl.Utf8}
+    assert downcast(df.lazy()).schema == {"a": pl.Int64, "b": pl.Float32, "c": pl.Utf8}
+
+    assert memory_metadata(df)["memory_saved_mb"] == 0
+    assert memory_metadata(compact)["estimated_size_mb"] < memory_metadata(df)["estimated_size_mb"]
+    assert memory_metadata(compact)["memory_saved_mb"] > 0
@@ -0,0 +1,71 @@
+import polars as pl
+from dagster import Output
+
+from ml_cookie_cutter.orchestration.instrumentation import (
+    AssetMeasurement,
+    Measurement,
+    instrumented,
+    measure,
+    rank_hot_paths,
+    record_load,
+)
+
+
+def test_measure():
+    with measure() as measurement:
+        sum(range(100_000))
+    assert measurement.wall_seconds > 0
+    assert measurement.cpu_seconds > 0
+    assert measurement.peak_rss_delta_mb >= 0
+
+
+def test_instrumented_attaches_loads_and_rows():
+    @instrumented
+    def double(df: pl.DataFrame):
+        return Output(pl.concat([df, df]), metadata={"kept": True})
+
+    record_load(Measurement(wall_seconds=1.0, cpu_seconds=0.5), bytes_read=100)
+    output = double(pl.DataFrame({"a": [1, 2, 3]}))
+    metadata = {key: value.value for key, value in output.metadata.items()}
+    assert metadata["kept"] is True
+    assert metadata["rows_in"] == 3
+    assert metadata["rows_out"] == 6
+    assert metadata["load_input_wall_seconds"] == 1.0
+    assert metadata["bytes_read"] == 100
+    assert metadata["compute_wall_seconds"] > 0
+
+    # Loads are attached to the compute that follows them only
+    metadata = double(pl.DataFrame({"a": [1]})).metadata
+    assert "load_input_wall_seconds" not in metadata
+
+
+def test_instrumented_generator_attaches_loads_to_first_output():
+    @instrumented
+    def split(df: pl.DataFrame):
+        yield Output(df.head(1), output_name="head")
+        yield Output(df.tail(2), output_name="tail")
+
+    record_load(Measurement(wall_seconds=1.0), bytes_read=100)
+    head, tail = split(pl.DataFrame({"a": [1, 2, 3]}))
+    assert head.output_name == "head"
+    assert head.metadata["bytes_read"].value == 100
+    assert "bytes_read" not in tail.metadata
+    assert tail.metadata["rows_out"].value == 2
+    assert "compute_cpu_seconds" in tail.metadata
+
+
+def test_rank_hot_paths():
+    measurements = [
+        AssetMeasurement("cleaned", "2006-12-01", "compute", 1.0, 1.0, 10.0, rows=100),
+        AssetMeasurement("cleaned", "2007-01-01", "compute", 2.0, 1.5, 20.0, rows=200),
+        AssetMeasurement("cleaned", "2007-01-01", "handle_output", 4.0, 0.5, 0.0, bytes=1000),
+    ]
+    first, second = rank_hot_paths(measurements)
+    assert (first.phase, first.wall_seconds, first.bytes, first.rows) == ("handle_output", 4.0, 1000, None)
+    assert (second.phase, second.runs, second.wall_seconds, second.peak_rss_delta_mb, second.rows) == (
+        "compute",
+        2,
+        3.0,
+        20.0,
+        300,
+    )
@@ -1,7 +1,7 @@
 import polars as pl
 import pytest
 
-from ml_cookie_cutter.orchestration.timeseries_example import TrainTestConfig
+from ml_cookie_cutter.orchestration.timeseries_example import TrainTestConfig, date_time_to_datetime
 
 
 @pytest.fixture
@@ -20,3 +20,12 @@ def test_apply_split_timeseries(timeseries_example_df: pl.DataFrame):
     train, test = cfg.apply_split(df_sorted)
     assert train.height == 8
     assert test.height == 2
+
+
+def test_date_time_to_datetime_matches_concatenated_parse():
+    df = pl.DataFrame({"Date": ["16/12/2006", "1/1/2007", "31/12/2007"], "Time": ["17:24:00", "00:00:00", "23:59:59"]})
+    expected = df.select((pl.col("Date") + " " + pl.col("Time")).str.to_datetime(format="%d/%m/%Y %H:%M:%S"))
+    assert df.select(date_time_to_datetime(df.schema).alias("Date")).frame_equal(expected)
+
+    typed = df.select(pl.col("Date").str.to_date("%d/%m/%Y"), pl.col("Time").str.to_time("%H:%M:%S"))
+    assert typed.select(date_time_to_datetime(typed.schema).alias("Date")).frame_equal(expected)
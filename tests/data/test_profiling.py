@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import polars as pl
+
+from ml_cookie_cutter.data.profiling import profile, profile_check_names
+from ml_cookie_cutter.data.raw import ProfileConfig
+
+CONFIG = ProfileConfig(index_column="Datetime", ranges={"Voltage": (200, 260)}, max_gap_seconds=60)
+
+
+def frame(minutes, voltages) -> pl.DataFrame:
+    start = datetime(2006, 12, 16, 17, 24)
+    return pl.DataFrame(
+        {"Datetime": [start + timedelta(minutes=minute) for minute in minutes], "Voltage": voltages},
+        schema={"Datetime": pl.Datetime("us"), "Voltage": pl.Float32},
+    )
+
+
+def outcomes(df: pl.DataFrame) -> dict:
+    return {check.name: check.passed for check in profile(df, CONFIG).checks}
+
+
+def test_clean_frame_passes_all_checks():
+    df = frame(range(100), [230.0 + minute % 10 for minute in range(100)])
+    dataset_profile = profile(df.lazy(), CONFIG)
+    assert [check.name for check in dataset_profile.checks] == profile_check_names(CONFIG)
+    assert all(check.passed for check in dataset_profile.checks)
+    assert dataset_profile.rows == 100
+    assert dataset_profile.ranges["Voltage"] == (230.0, 239.0)
+    assert dataset_profile.quantiles["Voltage"]["p50"] in (234.0, 235.0)
+
+
+def test_failing_checks():
+    assert outcomes(frame([0, 1, 2], [230.0, None, 230.0]))["has_no_nulls"] is False
+    assert outcomes(frame([0, 2, 1], [230.0] * 3))["index_is_monotonic"] is False
+    assert outcomes(frame([0, 1, 1], [230.0] * 3))["index_has_no_duplicates"] is False
+    assert outcomes(frame([0, 1, 2], [230.0, 270.0, 230.0]))["values_in_range"] is False
+
+    gaps = profile(frame([0, 1, 5, 6, 9], [230.0] * 5), CONFIG).checks[-1]
+    assert gaps.name == "index_has_no_gaps" and not gaps.passed and gaps.warn_only
+    assert gaps.metadata["gaps"] == 2
+
+
+def test_checks_follow_config():
+    assert profile_check_names(ProfileConfig(index_column="Datetime")) == [
+        "has_no_nulls",
+        "index_is_monotonic",
+        "index_has_no_duplicates",
+    ]
+
+
+def test_index_checks_on_index_frame():
+    raw = frame(range(5), [230.0, None, None, 230.0, 230.0])
+    cleaned = raw.drop_nulls()
+    assert outcomes(cleaned)["index_has_no_gaps"] is False
+
+    dataset_profile = profile(cleaned, CONFIG, index_df=raw.lazy())
+    assert all(check.passed for check in dataset_profile.checks)
+    assert dataset_profile.rows == 3
@@ -0,0 +1,28 @@
+import hashlib
+from pathlib import Path
+
+from ml_cookie_cutter.data.cache import RawSnapshotCache
+from ml_cookie_cutter.data.raw import RawDataset, lfs_pointer_oid
+
+OID = "4259c9d7ece5dbee9ab8d53682baac68d791c864f0f64a52b4043cb3b90894b7"
+
+
+def test_lfs_pointer_oid(tmp_path: Path):
+    pointer = tmp_path / "pointer.txt"
+    pointer.write_text(f"version https://git-lfs.github.com/spec/v1\noid sha256:{OID}\nsize 132960755\n")
+    assert lfs_pointer_oid(pointer) == OID
+
+    content = tmp_path / "content.txt"
+    content.write_text("Date;Time;Voltage\n16/12/2006;17:24:00;234.84\n")
+    assert lfs_pointer_oid(content) is None
+
+
+def test_data_version_is_content_hash(tmp_path: Path):
+    dataset = RawDataset("timeseries-example")
+    cache = RawSnapshotCache(tmp_path / "cache")
+    data_version = dataset.data_version(cache)
+    assert data_version == dataset.data_version(cache)
+    assert data_version in (
+        lfs_pointer_oid(dataset.asset_path),
+        hashlib.sha256(dataset.asset_path.read_bytes()).hexdigest(),
+    )
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import polars as pl
+
+from ml_cookie_cutter.data.raw import RawDataset
+from ml_cookie_cutter.data.synthetic import write_household_power
+from ml_cookie_cutter.orchestration.timeseries_example import clean_timeseries
+
+
+def test_write_household_power_matches_raw_format(tmp_path: Path):
+    dataset = RawDataset("timeseries-example")
+    path = write_household_power(tmp_path / "raw.txt", rows=25_000, chunk_rows=10_000, null_fraction=0.1)
+
+    header, first = path.read_text().splitlines()[:2]
+    assert header == (
+        "Date;Time;Global_active_power;Global_reactive_power;Voltage;Global_intensity;"
+        "Sub_metering_1;Sub_metering_2;Sub_metering_3"
+    )
+    assert first.startswith("16/12/2006;17:24:00;")
+
+    df = pl.read_csv(path, **dataset.pl_read_kwargs)
+    assert df.height == 25_000
+    assert 0.05 < df["Voltage"].null_count() / df.height < 0.15
+    # Measurements of a reading are missing together
+    assert df.null_count().select(pl.exclude("Date", "Time")).row(0) == (df["Voltage"].null_count(),) * 7
+
+    cleaned, rows_before_clean = clean_timeseries(df)
+    assert rows_before_clean == 25_000
+    assert cleaned.height == 25_000 - df["Voltage"].null_count()
+    assert cleaned["Datetime"].is_sorted()
+    assert cleaned["Datetime"].n_unique() == cleaned.height
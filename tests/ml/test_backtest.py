@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.ml.backtest import aggregate_folds, run_backtest
+from ml_cookie_cutter.ml.datasets import dataset_directory
+from ml_cookie_cutter.ml.experiment import parse_overrides
+from ml_cookie_cutter.orchestration.timeseries_example import BacktestConfig, Fold, TrainTestConfig
+
+
+def write_dataset(datalake: Path, rows: int = 400):
+    directory = dataset_directory("timeseries", "daily", datalake)
+    directory.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    x = rng.random(rows)
+    pl.DataFrame(
+        {
+            "Datetime": pl.Series(np.arange(rows) * 86_400_000_000).cast(pl.Datetime("us")),
+            "x": x,
+            "noise": rng.random(rows),
+            "y": 3 * x + rng.normal(0, 0.01, rows),
+        }
+    ).write_parquet(directory / "0000.parquet")
+
+
+def test_backtest_folds():
+    config = BacktestConfig(train_rows=10, horizon=3, gap=1)
+    assert config.folds(21) == [
+        Fold(0, slice(0, 10), slice(11, 14)),
+        Fold(1, slice(0, 13), slice(14, 17)),
+        Fold(2, slice(0, 16), slice(17, 20)),
+    ]
+    sliding = BacktestConfig(window="sliding", train_rows=10, horizon=3, step=5, max_folds=1)
+    assert sliding.folds(21) == [Fold(0, slice(5, 15), slice(15, 18))]
+    assert TrainTestConfig().folds(10) == [Fold(0, slice(0, 8), slice(8, 10))]
+
+    # Folds are slices of the frame
+    df = pl.DataFrame({"x": range(21)})
+    (train, test), *_ = config.apply_folds(df)
+    assert train["x"].to_list() == list(range(10)) and test["x"].to_list() == [11, 12, 13]
+
+    with pytest.raises(ValueError, match="too few"):
+        config.folds(13)
+    with pytest.raises(ValueError, match="positive"):
+        BacktestConfig(train_rows=10, horizon=0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_backtest(tmp_path: Path, workers: int):
+    write_dataset(tmp_path)
+    spec = parse_overrides(["dataset=daily", "features=x,noise", "target=y", "model=ridge"])
+    config = BacktestConfig(train_rows=100, horizon=50, gap=10)
+    finished = []
+    results = run_backtest(
+        "timeseries",
+        spec,
+        config,
+        workers=workers,
+        on_result=lambda result, done, total: finished.append((done, total)),
+        datalake=tmp_path,
+    )
+    assert sorted(finished) == [(done, 5) for done in range(1, 6)]
+    assert [result.fold for result in results] == list(range(5))
+    assert [(result.train_stop, result.test_start) for result in results[:2]] == [(100, 110), (150, 160)]
+    aggregates = aggregate_folds(results)
+    assert aggregates["mae_mean"] < 0.05 and aggregates["mae_max"] >= aggregates["mae_mean"]
+
+    with pytest.raises(ValueError, match="single model configuration"):
+        run_backtest("timeseries", parse_overrides(["model=ridge", "alpha=1,2"]), config, datalake=tmp_path)
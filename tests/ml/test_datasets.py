@@ -0,0 +1,120 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.data.catalog import DatasetCatalog, DatasetEntry
+from ml_cookie_cutter.ml.datasets import dataset_directory, dataset_paths, load_training_arrays
+from ml_cookie_cutter.orchestration.timeseries_example import TrainTestConfig
+
+FEATURES = ["Voltage", "Global_intensity"]
+TARGET = "Global_active_power"
+
+
+def write_partitions(datalake: Path) -> Path:
+    directory = dataset_directory("timeseries", "daily", datalake)
+    directory.mkdir(parents=True)
+    for day in [2, 1]:
+        pl.DataFrame(
+            {
+                "Datetime": pl.datetime_range(datetime(2006, 12, day), datetime(2006, 12, day, 4), "1h", eager=True),
+                "Voltage": [float(day * 10 + hour) for hour in range(5)],
+                "Global_intensity": [float(hour) for hour in range(5)],
+                "Global_active_power": [float(day * 100 + hour) for hour in range(5)],
+                "Sub_metering_1": [0.0] * 5,
+            }
+        ).write_parquet(directory / f"2006-12-0{day}.parquet")
+    return directory
+
+
+def test_load_training_arrays_from_datalake_layout(tmp_path: Path):
+    write_partitions(tmp_path)
+    arrays = load_training_arrays("timeseries", "daily", FEATURES, TARGET, datalake=tmp_path)
+
+    assert len(arrays) == 10
+    assert arrays.features.dtype == np.float32 and arrays.features.flags.c_contiguous
+    assert arrays.features.shape == (10, 2)
+    assert arrays.target.dtype == np.float64
+    # Rows are in Datetime order across partitions
+    assert arrays.target.tolist() == [100, 101, 102, 103, 104, 200, 201, 202, 203, 204]
+    assert arrays.features[5].tolist() == [20, 0]
+
+
+def test_dataset_paths_from_catalog(tmp_path: Path):
+    directory = write_partitions(tmp_path)
+    catalog = DatasetCatalog(tmp_path / "catalog.sqlite")
+    catalog.record(
+        DatasetEntry(
+            path=str(directory / "2006-12-02.parquet"),
+            asset_key="timeseries/dataset/daily",
+            partition_key="2006-12-02",
+            schema={},
+            row_count=5,
+            byte_size=100,
+        )
+    )
+    assert dataset_paths("timeseries", "daily", catalog, tmp_path) == [directory / "2006-12-02.parquet"]
+    arrays = load_training_arrays("timeseries", "daily", FEATURES, TARGET, catalog=catalog, datalake=tmp_path)
+    assert len(arrays) == 5
+
+    with pytest.raises(FileNotFoundError):
+        dataset_paths("timeseries", "hourly", datalake=tmp_path)
+
+
+def test_dataset_paths_resolve_one_file_per_partition(tmp_path: Path):
+    directory = write_partitions(tmp_path)
+    # Materialized with both the parquet and the IPC io manager
+    pl.read_parquet(directory / "2006-12-01.parquet").write_ipc(directory / "2006-12-01.arrow")
+    os.utime(directory / "2006-12-01.parquet", (0, 0))
+    # A catalog without entries of the dataset falls back to the datalake layout
+    DatasetCatalog(tmp_path / "catalog.sqlite").record(DatasetEntry(path="other.parquet", asset_key="timeseries/other"))
+
+    assert dataset_paths("timeseries", "daily", datalake=tmp_path) == [
+        directory / "2006-12-01.arrow",
+        directory / "2006-12-02.parquet",
+    ]
+    assert dataset_paths("timeseries", "daily", datalake=tmp_path, suffix=".parquet") == [
+        directory / "2006-12-01.parquet",
+        directory / "2006-12-02.parquet",
+    ]
+    assert len(load_training_arrays("timeseries", "daily", FEATURES, TARGET, datalake=tmp_path)) == 10
+
+
+def test_split_and_batches_are_views(tmp_path: Path):
+    write_partitions(tmp_path)
+    arrays = load_training_arrays("timeseries", "daily", FEATURES, TARGET, datalake=tmp_path)
+
+    train, test = arrays.split(TrainTestConfig(train=0.8, test=0.2))
+    assert (len(train), len(test)) == (8, 2)
+    assert np.shares_memory(train.features, arrays.features) and np.shares_memory(test.target, arrays.target)
+
+    batches = list(train.batches(3))
+    assert [len(target) for _, target in batches] == [3, 3, 2]
+    assert all(np.shares_memory(features, arrays.features) for features, _ in batches)
+    assert [len(target) for _, target in train.batches(3, drop_last=True)] == [3, 3]
+
+    shuffled = list(train.batches(3, shuffle=True, seed=0))
+    assert sorted(np.concatenate([target for _, target in shuffled]).tolist()) == sorted(train.target.tolist())
+    # Shuffled rows keep their features and target together
+    for features, target in shuffled:
+        assert np.array_equal(features[:, 1], target % 100)
+
+
+def test_load_training_arrays_reorders_unsorted_rows(tmp_path: Path):
+    directory = dataset_directory("timeseries", "daily", tmp_path)
+    directory.mkdir(parents=True)
+    pl.DataFrame(
+        {
+            "Datetime": [datetime(2006, 12, 1, hour) for hour in [2, 0, 1]],
+            "Voltage": [2.0, 0.0, 1.0],
+            "Global_intensity": [20.0, 0.0, 10.0],
+            "Global_active_power": [200.0, 0.0, 100.0],
+        }
+    ).write_ipc(directory / "2006-12-01.arrow")
+    arrays = load_training_arrays("timeseries", "daily", FEATURES, TARGET, datalake=tmp_path)
+    assert arrays.features.tolist() == [[0, 0], [1, 10], [2, 20]]
+    assert arrays.target.tolist() == [0, 100, 200]
+    assert arrays.features.flags.c_contiguous
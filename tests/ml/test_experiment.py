@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.ml.datasets import dataset_directory, load_training_arrays
+from ml_cookie_cutter.ml.experiment import (
+    ExperimentSpec,
+    grid_trials,
+    map_arrays,
+    parse_overrides,
+    random_trials,
+    run_experiment,
+    save_trial_model,
+)
+from ml_cookie_cutter.ml.serving import ModelCache
+
+
+def write_dataset(datalake: Path, rows: int = 400):
+    directory = dataset_directory("timeseries", "daily", datalake)
+    directory.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    x = rng.random(rows)
+    pl.DataFrame(
+        {
+            "Datetime": pl.Series(np.arange(rows) * 86_400_000_000).cast(pl.Datetime("us")),
+            "x": x,
+            "noise": rng.random(rows),
+            "y": 3 * x + rng.normal(0, 0.01, rows),
+        }
+    ).write_parquet(directory / "0000.parquet")
+
+
+def test_parse_overrides():
+    spec = parse_overrides(["dataset=daily", "model=random_forest,extra_trees", "max_depth=2,none", "n_estimators=5"])
+    assert spec.dataset == "daily" and spec.models == ["random_forest", "extra_trees"]
+    assert spec.search_space == {"max_depth": [2, None], "n_estimators": [5]}
+
+    with pytest.raises(ValueError, match="key=value"):
+        parse_overrides(["max_depth"])
+    with pytest.raises(ValueError, match="not supported"):
+        parse_overrides(["model=transformer"])
+    with pytest.raises(ValueError, match="no hyperparameters"):
+        parse_overrides(["model=ridge", "max_depth=2"])
+
+
+def test_grid_and_random_trials():
+    spec = ExperimentSpec(models=["random_forest", "ridge"], search_space={})
+    assert [(trial.model, trial.params) for trial in grid_trials(spec)] == [
+        ("random_forest", {"n_estimators": 20, "max_depth": 10}),
+        ("ridge", {}),
+    ]
+
+    spec = ExperimentSpec(search_space={"max_depth": [2, 4, 8], "n_estimators": [5, 10]})
+    grid = grid_trials(spec)
+    assert len(grid) == 6 and grid[-1].params == {"n_estimators": 10, "max_depth": 8}
+    trials = random_trials(spec, 4, seed=1)
+    assert [trial.index for trial in trials] == [0, 1, 2, 3]
+    assert len({tuple(trial.params.items()) for trial in trials}) == 4
+    assert len(random_trials(spec, 10)) == 6
+
+
+def test_mapped_arrays_are_read_only_maps(tmp_path: Path):
+    write_dataset(tmp_path)
+    arrays = load_training_arrays("timeseries", "daily", ["x", "noise"], "y", datalake=tmp_path)
+    mapped = map_arrays(arrays, tmp_path).open()
+    assert isinstance(mapped.features, np.memmap) and not mapped.features.flags.writeable
+    assert np.array_equal(mapped.features, arrays.features) and np.array_equal(mapped.target, arrays.target)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_experiment(tmp_path: Path, workers: int):
+    write_dataset(tmp_path)
+    spec = parse_overrides(["dataset=daily", "features=x,noise", "target=y", "model=random_forest", "max_depth=1,6"])
+    finished = []
+    results = run_experiment(
+        "timeseries",
+        spec,
+        workers=workers,
+        on_result=lambda result, done, total: finished.append((done, total)),
+        datalake=tmp_path,
+    )
+    assert sorted(finished) == [(1, 2), (2, 2)]
+    # Sorted best first, a depth 6 forest fits the linear target better than a stump
+    assert [result.params["max_depth"] for result in results] == [6, 1]
+    assert results[0].mae < results[1].mae < 1
+
+
+def test_save_trial_model(tmp_path: Path):
+    write_dataset(tmp_path)
+    spec = parse_overrides(["dataset=daily", "features=x,noise", "target=y", "model=ridge", "alpha=0.1"])
+    (result,) = run_experiment("timeseries", spec, datalake=tmp_path)
+    save_trial_model("timeseries", spec, result, "best", datalake=tmp_path, directory=tmp_path / "models")
+
+    served = ModelCache(tmp_path / "models").get("best")
+    assert served.features == ["x", "noise"] and served.target == "y"
+    assert served.model.alpha == 0.1 and served.model.coef_[0] > 2.5
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pytest
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES, calendar_features
+from ml_cookie_cutter.ml.datasets import dataset_directory
+from ml_cookie_cutter.ml.feature_store import (
+    FeatureIndex,
+    feature_table,
+    load_feature_index,
+    load_feature_table,
+    point_in_time_join,
+)
+from ml_cookie_cutter.ml.serving import ServedModel, request_features
+
+START = datetime(2006, 12, 16)
+
+
+def timestamps(minutes: list) -> pl.Series:
+    return pl.Series("Datetime", [START + timedelta(minutes=minute) for minute in minutes]).cast(pl.Datetime("us"))
+
+
+def features() -> pl.DataFrame:
+    # Known at minutes 0, 10 and 20
+    return pl.DataFrame([timestamps([0, 10, 20]), pl.Series("x", [1.0, 2.0, 3.0])])
+
+
+def test_point_in_time_join():
+    labels = pl.DataFrame([timestamps([25, 5, 10, -5]), pl.Series("y", [4, 1, 2, 0])])
+    joined = point_in_time_join(labels, features())
+    # Every label sees the latest features at or before it, labels before the first features see none
+    assert joined["y"].to_list() == [0, 1, 2, 4]
+    assert joined["x"].to_list() == [None, 1.0, 2.0, 3.0]
+
+    joined = point_in_time_join(labels, features(), tolerance=timedelta(minutes=2))
+    assert joined["x"].to_list() == [None, None, 2.0, None]
+
+
+def test_feature_index_matches_point_in_time_join():
+    index = FeatureIndex.from_frame(features())
+    assert len(index) == 3 and "x" in index
+
+    minutes = [0, 5, 10, 19, 20, 100]
+    joined = point_in_time_join(pl.DataFrame(timestamps(minutes)), features())
+    assert index.as_of(timestamps(minutes))[:, 0].tolist() == joined["x"].to_list()
+    assert index.lookup("2006-12-16 00:15:00").tolist() == [2.0]
+    assert index.lookup(START + timedelta(minutes=10), ["x"]).tolist() == [2.0]
+
+    stamps, values = index.range(START + timedelta(minutes=10), START + timedelta(minutes=20))
+    assert stamps.tolist() == [index.timestamps[1]] and values.tolist() == [[2.0]]
+    assert np.shares_memory(values, index.values)
+
+    with pytest.raises(ValueError, match="before the first row"):
+        index.lookup(START - timedelta(minutes=1))
+    with pytest.raises(ValueError, match="preceding"):
+        index.as_of(timestamps([15]), tolerance=timedelta(minutes=1))
+    with pytest.raises(ValueError, match="not in the feature index"):
+        index.lookup(START, ["y"])
+
+
+def test_load_feature_table(tmp_path: Path):
+    directory = dataset_directory("timeseries", "calendar", tmp_path, prefix="features")
+    directory.mkdir(parents=True)
+    readings = pl.DataFrame(timestamps(list(range(0, 3000, 30))))
+    # Partitions written out of order
+    for partition, df in enumerate([readings[50:], readings[:50]]):
+        feature_table(df.reverse(), calendar_features()).write_parquet(directory / f"{partition}.parquet")
+
+    table = load_feature_table("timeseries", "calendar", ["hour"], datalake=tmp_path)
+    assert table.columns == ["Datetime", "hour"] and table["Datetime"].is_sorted()
+    assert table.height == readings.height
+
+    window = (START + timedelta(hours=1), START + timedelta(hours=2))
+    index = load_feature_index("timeseries", "calendar", window=window, datalake=tmp_path)
+    assert index.features == CALENDAR_FEATURES and len(index) == 2
+    assert index.values[:, CALENDAR_FEATURES.index("hour")].tolist() == [1, 1]
+
+
+def test_request_features_looks_up_feature_index():
+    # Features of the index are looked up, calendar features it does not hold are derived from the timestamps
+    index = FeatureIndex.from_frame(features().with_columns(hour=pl.lit(21)))
+    served = ServedModel(None, ["x", "hour", "weekday"], "y")
+    rows = request_features(served, {"datetimes": ["2006-12-16T00:10:00", "2006-12-16T00:20:00"]}, index)
+    assert rows.dtype == np.float32 and rows.tolist() == [[2, 21, 6], [3, 21, 6]]
+
+    # Feature rows must match the timestamps, or be at most the tolerance older
+    with pytest.raises(ValueError, match="preceding"):
+        request_features(served, {"datetimes": ["2006-12-16T00:12:00"]}, index)
+    rows = request_features(served, {"datetimes": ["2006-12-16T00:12:00"]}, index, timedelta(minutes=5))
+    assert rows.tolist() == [[2, 21, 6]]
+    with pytest.raises(ValueError, match="can not be derived"):
+        request_features(served, {"datetimes": ["2006-12-16T00:12:00"]})
@@ -0,0 +1,64 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from ml_cookie_cutter.ml import forest as forest_module
+from ml_cookie_cutter.ml.forest import compile_forest, round_down_to_float32
+
+
+def data(rows: int, outputs: int = 1):
+    rng = np.random.default_rng(0)
+    # Few distinct values, so many rows fall exactly on split points
+    X = rng.integers(0, 20, (rows, 4)) + rng.choice([0, 1e-8, 0.5], (rows, 4))
+    y = X @ rng.random((4, outputs)) + rng.normal(0, 0.5, (rows, outputs))
+    return X, y[:, 0] if outputs == 1 else y
+
+
+@pytest.mark.parametrize(
+    "forest",
+    [
+        RandomForestRegressor(n_estimators=20, max_depth=10, random_state=0),
+        RandomForestRegressor(n_estimators=5, random_state=0),
+        ExtraTreesRegressor(n_estimators=10, max_depth=6, random_state=0),
+    ],
+)
+def test_compiled_forest_predicts_bit_identically(forest, monkeypatch: pytest.MonkeyPatch):
+    X, y = data(2000)
+    forest.fit(X, y)
+    compiled = compile_forest(forest)
+    X_test, _ = data(3000)
+    X_test[:10] = forest.estimators_[0].tree_.threshold[:10, np.newaxis]
+    assert np.array_equal(compiled.predict(X_test), forest.predict(X_test))
+
+    # Across chunks of rows
+    monkeypatch.setattr(forest_module, "TRAVERSAL_CHUNK_NODES", 7 * compiled.n_trees)
+    assert np.array_equal(compiled.predict(X_test), forest.predict(X_test))
+
+
+def test_compiled_forest_multi_output_and_memory_mapped(tmp_path):
+    X, y = data(500, outputs=2)
+    forest = RandomForestRegressor(n_estimators=4, max_depth=5, random_state=0).fit(X, y)
+    joblib.dump(compile_forest(forest), tmp_path / "forest.joblib")
+    compiled = joblib.load(tmp_path / "forest.joblib", mmap_mode="r")
+    assert isinstance(compiled.children, np.memmap)
+    assert np.array_equal(compiled.predict(X), forest.predict(X))
+
+
+def test_compile_forest_validation():
+    X, y = data(100)
+    with pytest.raises(TypeError):
+        compile_forest(Ridge().fit(X, y))
+    compiled = compile_forest(RandomForestRegressor(n_estimators=2).fit(X, y))
+    with pytest.raises(ValueError, match="4 features"):
+        compiled.predict(X[:, :3])
+    with pytest.raises(ValueError, match="NaN"):
+        compiled.predict(np.full((1, 4), np.nan))
+
+
+def test_round_down_to_float32():
+    values = np.array([0.1, 0.5, -0.1, 1e-40, 3.0000001])
+    rounded = round_down_to_float32(values)
+    assert rounded.dtype == np.float32 and np.all(rounded.astype(np.float64) <= values)
+    assert np.all(np.nextafter(rounded, np.float32(np.inf)).astype(np.float64) > values)
@@ -0,0 +1,141 @@
+import http.client
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from ml_cookie_cutter.data.calendar import CALENDAR_FEATURES
+from ml_cookie_cutter.ml.forest import CompiledForest
+from ml_cookie_cutter.ml.serving import (
+    MicroBatcher,
+    ModelCache,
+    ServedModel,
+    prediction_server,
+    request_features,
+    save_model,
+)
+
+
+def fit_model(coefficient: float) -> LinearRegression:
+    features = np.random.default_rng(0).random((20, len(CALENDAR_FEATURES)))
+    return LinearRegression().fit(features, coefficient * features[:, 0])
+
+
+def test_model_cache_evicts_least_recently_used(tmp_path: Path):
+    for name in ["a", "b", "c"]:
+        save_model(fit_model(1), CALENDAR_FEATURES, "y", name, tmp_path)
+    cache = ModelCache(tmp_path, capacity=2)
+    cache.get("a"), cache.get("b"), cache.get("a"), cache.get("c")
+    assert cache.loaded() == ["a", "c"] and cache.loads == 3
+
+    # Arrays of a loaded model are read-only maps of its file
+    assert isinstance(cache.get("a").model.coef_, np.memmap)
+
+    path = save_model(fit_model(2), CALENDAR_FEATURES, "y", "a", tmp_path)
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+    assert cache.get("a").model.coef_[0] == pytest.approx(2) and cache.loads == 4
+
+    with pytest.raises(FileNotFoundError):
+        cache.get("missing")
+
+
+def test_micro_batcher_predicts_concurrent_requests_at_once(tmp_path: Path):
+    save_model(fit_model(1), CALENDAR_FEATURES, "y", "a", tmp_path)
+    save_model(fit_model(2), CALENDAR_FEATURES, "y", "b", tmp_path)
+    batcher = MicroBatcher(ModelCache(tmp_path), max_wait_seconds=0.5)
+    rows = [np.full((count, len(CALENDAR_FEATURES)), count, dtype=np.float32) for count in [1, 2, 3]]
+    futures = [batcher.submit("a", rows[0]), batcher.submit("b", rows[1]), batcher.submit("a", rows[2])]
+    predictions = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    assert batcher.batches == 2 and batcher.rows == 6
+    assert [len(prediction) for prediction in predictions] == [1, 2, 3]
+    assert np.concatenate(predictions) == pytest.approx([1, 4, 4, 3, 3, 3])
+
+
+def test_request_features():
+    served = ServedModel(None, ["hour", "weekday"], "y")
+    features = request_features(served, {"datetimes": ["2006-12-16T17:24:00", "2006-12-18 05:00:00"]})
+    assert features.dtype == np.float32 and features.tolist() == [[17, 6], [5, 1]]
+    assert request_features(served, {"features": [[1, 2]]}).tolist() == [[1, 2]]
+
+    with pytest.raises(ValueError, match="rows of 2 values"):
+        request_features(served, {"features": [1, 2]})
+    with pytest.raises(ValueError, match="can not be derived"):
+        request_features(ServedModel(None, ["Voltage"], "y"), {"datetimes": ["2006-12-16T17:24:00"]})
+
+
+@pytest.mark.parametrize("batching", [False, True])
+def test_prediction_server(tmp_path: Path, batching: bool):
+    save_model(fit_model(1), CALENDAR_FEATURES, "y", "model", tmp_path)
+    server = prediction_server(port=0, directory=tmp_path, batching=batching)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    def post(path: str, body: dict) -> dict:
+        request = urllib.request.Request(f"{url}{path}", data=json.dumps(body).encode(), method="POST")
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    try:
+        response = post("/predict/model", {"datetimes": ["2006-12-16T17:24:00"]})
+        assert response["predictions"] == pytest.approx([6])
+        with urllib.request.urlopen(f"{url}/models") as models:
+            assert json.loads(models.read()) == {"available": ["model"], "loaded": ["model"]}
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post("/predict/missing", {"features": [[0] * len(CALENDAR_FEATURES)]})
+        assert error.value.code == 404
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post("/predict/model", {})
+        assert error.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post("/predict/model", {"datetimes": ["yesterday"]})
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_prediction_server_only_loads_models_of_its_directory(tmp_path: Path):
+    save_model(fit_model(1), CALENDAR_FEATURES, "y", "outside", tmp_path)
+    save_model(fit_model(1), CALENDAR_FEATURES, "y", "model", tmp_path / "models")
+    server = prediction_server(port=0, directory=tmp_path / "models")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    body = json.dumps({"features": [[0] * len(CALENDAR_FEATURES)]}).encode()
+
+    try:
+        for path in ["/predict/../outside", "/predict/..%2Foutside", "/predict/model/../../outside"]:
+            connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+            connection.request("POST", path, body)
+            assert connection.getresponse().status == 404, path
+            connection.close()
+        assert server.cache.loaded() == []
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    cache = ModelCache(tmp_path / "models")
+    for name in ["../outside", str(tmp_path / "outside"), "model/../../outside"]:
+        with pytest.raises(FileNotFoundError):
+            cache.get(name)
+
+
+def test_save_model_compiles_forests(tmp_path: Path):
+    features = np.random.default_rng(0).random((50, len(CALENDAR_FEATURES)))
+    forest = RandomForestRegressor(n_estimators=3, random_state=0).fit(features, features[:, 0])
+    save_model(forest, CALENDAR_FEATURES, "y", "forest", tmp_path)
+    save_model(forest, CALENDAR_FEATURES, "y", "sklearn", tmp_path, compile_forests=False)
+
+    cache = ModelCache(tmp_path)
+    assert isinstance(cache.get("forest").model, CompiledForest)
+    assert isinstance(cache.get("sklearn").model, RandomForestRegressor)
+    assert np.array_equal(cache.get("forest").model.predict(features), forest.predict(features))
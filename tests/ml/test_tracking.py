@@ -0,0 +1,95 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from ml_cookie_cutter.ml.tracking import Tracker, TrackingStore
+
+
+def test_tracker_writes_batches(tmp_path: Path):
+    tracker = Tracker(tmp_path, flush_interval=60)
+    with tracker.start_run("train", project="timeseries") as run:
+        run.log_params({"model": "random_forest", "features": ["hour", "minute"], "max_depth": None})
+        for step in range(1000):
+            run.log_metric("loss", 1 / (step + 1))
+        run.log_metric("mae", 0.5, step=10)
+    # Nothing is written until the batch is full, flushed or the flush interval passed
+    assert tracker.events == 0
+    tracker.flush()
+    assert tracker.batches == 1 and tracker.events == 1006
+
+    store = TrackingStore(tmp_path)
+    (entry,) = store.runs("timeseries")
+    assert (entry.run_id, entry.name, entry.status) == (run.run_id, "train", "finished")
+    assert entry.finished_at >= entry.started_at
+    assert store.params(run.run_id) == {"features": ["hour", "minute"], "max_depth": None, "model": "random_forest"}
+    metrics = store.metrics(run.run_id)
+    assert [step for step, _, _ in metrics["loss"]] == list(range(1000))
+    assert metrics["loss"][-1][1] == pytest.approx(1e-3) and metrics["mae"][0][:2] == (10, 0.5)
+
+    with pytest.raises(ValueError):
+        with tracker.start_run("broken") as failed:
+            raise ValueError
+    tracker.close()
+    assert store.run(failed.run_id).status == "failed"
+    with pytest.raises(RuntimeError, match="closed"):
+        tracker.start_run("late")
+
+
+def test_tracker_copies_artifacts(tmp_path: Path):
+    artifact = tmp_path / "predictions.csv"
+    artifact.write_text("1,2,3")
+    tracker = Tracker(tmp_path / "tracking", max_batch=2)
+    run = tracker.start_run("train")
+    run.log_artifact(artifact)
+    run.log_artifact(tmp_path / "missing.csv")
+    run.log_metric("mae", 1.0)
+    # The missing artifact fails its batch, the other events are still written
+    with pytest.raises(FileNotFoundError):
+        tracker.flush()
+    tracker.close()
+
+    store = TrackingStore(tmp_path / "tracking")
+    artifacts = store.artifacts(run.run_id)
+    assert list(artifacts) == ["predictions.csv"] and artifacts["predictions.csv"].read_text() == "1,2,3"
+    assert artifacts["predictions.csv"].parent == store.artifact_directory(run.run_id)
+    assert list(store.metrics(run.run_id)) == ["mae"]
+
+
+def test_reused_run_id_keeps_its_batch(tmp_path: Path):
+    tracker = Tracker(tmp_path, flush_interval=60)
+    with tracker.start_run("train", run_id="run") as run:
+        run.log_metric("mae", 1.0)
+    tracker.flush()
+    # The second start of the run is ignored, the params and metrics queued with it are written
+    with tracker.start_run("retrain", run_id="run") as run:
+        run.log_param("max_depth", 10)
+        run.log_metric("mae", 0.5)
+    tracker.close()
+
+    store = TrackingStore(tmp_path)
+    (entry,) = store.runs()
+    assert (entry.name, entry.status) == ("train", "finished")
+    assert store.params("run") == {"max_depth": 10}
+    assert [value for _, value, _ in store.metrics("run")["mae"]] == [1.0, 0.5]
+
+
+def test_logging_does_not_block_on_the_store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    release = threading.Event()
+    write = TrackingStore.write
+
+    def blocked_write(self, events):
+        release.wait()
+        write(self, events)
+
+    monkeypatch.setattr(TrackingStore, "write", blocked_write)
+    tracker = Tracker(tmp_path, flush_interval=0, max_batch=100)
+    run = tracker.start_run("train")
+    # Logging returns while the writer thread is stuck writing the first batch
+    for step in range(10_000):
+        run.log_metric("loss", step)
+    assert tracker.events == 0
+    release.set()
+    tracker.close()
+    assert tracker.events == 10_001 and tracker.batches < 10_001
+    assert len(TrackingStore(tmp_path).metrics(run.run_id)["loss"]) == 10_000
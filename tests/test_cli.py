@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+import pytest
+from typer.testing import CliRunner
+
+from ml_cookie_cutter.cli import app
+
+HEAVY_MODULES = {"dagster", "duckdb", "polars", "pyarrow", "sklearn"}
+
+# Import time budgets in seconds, dominated by typer and rich
+IMPORT_TIME_BUDGETS = {
+    ("list",): 0.75,
+    ("datasets", "timeseries"): 0.75,
+    ("cache", "list"): 0.75,
+    ("runs", "list"): 0.75,
+    ("materialize-project", "--help"): 0.75,
+    ("profile", "--help"): 0.75,
+    ("experiment", "--help"): 0.75,
+    ("backtest", "--help"): 0.75,
+    ("serve", "--help"): 0.75,
+}
+
+SCRIPT = """
+import sys
+from ml_cookie_cutter.cli import app
+# Without standalone mode typer returns the code of `typer.Exit`, an exception raised by a command fails the script
+try:
+    app({args!r}, standalone_mode=False)
+except SystemExit:
+    pass
+print("imported:" + ",".join(sorted({{name.split(".")[0] for name in sys.modules}} & {heavy!r})))
+"""
+
+
+def run_with_importtime(args: tuple) -> tuple[float, set[str]]:
+    """Run a CLI command in a fresh interpreter, returning its import time and the heavy modules it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT.format(args=list(args), heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+    )
+    errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+    assert result.returncode == 0, f"`ml {' '.join(args)}` failed:\n" + "\n".join(errors)
+    microseconds = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Only count top level imports, nested imports are included in their cumulative time
+        if not name.startswith("  "):
+            microseconds += int(cumulative)
+    imported = set(filter(None, result.stdout.strip().splitlines()[-1].removeprefix("imported:").split(",")))
+    return microseconds / 1e6, imported
+
+
+@pytest.mark.parametrize("args", list(IMPORT_TIME_BUDGETS))
+def test_cli_command_startup(args: tuple):
+    seconds, imported = run_with_importtime(args)
+    assert not imported, f"`ml {' '.join(args)}` imported {imported}"
+    assert seconds < IMPORT_TIME_BUDGETS[args], f"`ml {' '.join(args)}` spent {seconds:.3f}s importing"
+
+
+@pytest.mark.parametrize(
+    "options, unsupported",
+    [(["--workers", "2"], "--workers > 1"), (["--missing"], "--missing"), (["--streaming"], "--streaming")],
+)
+def test_materialize_rejects_unsupported_duckdb_options(options: list, unsupported: str):
+    result = CliRunner().invoke(app, ["materialize-project", "timeseries", "--materialization", "duckdb", *options])
+    assert result.exit_code == 1
+    assert f"duckdb does not support {unsupported}" in result.output
+    assert "Materializing" not in result.output